@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import asyncio
+import logging
+
+from ..database import get_db
+from ..schemas import DefectCount, EquipmentSummary, TimeSeriesPoint
+from ..services import analytics_store
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/analytics/top-defects", response_model=List[DefectCount])
+async def get_top_defects(
+    days: int = Query(90, ge=1, le=3660),
+    equipment: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100)
+):
+    """
+    기간 내 불량명 상위 N개
+    
+    Args:
+        days: 최근 일수
+        equipment: 설비명 (지정 시 해당 설비의 불량만 집계)
+        limit: 조회할 불량명 수
+    """
+    return await asyncio.to_thread(analytics_store.top_defects, days, equipment, limit)
+
+
+@router.get("/analytics/equipment", response_model=List[EquipmentSummary])
+async def get_equipment_summary(
+    days: int = Query(90, ge=1, le=3660),
+    limit: int = Query(20, ge=1, le=200),
+    top_n: int = Query(3, ge=1, le=20)
+):
+    """
+    기간 내 설비명별 건수와 설비별 상위 불량명
+    
+    Args:
+        days: 최근 일수
+        limit: 조회할 설비 수
+        top_n: 설비별 상위 불량명 수
+    """
+    return await asyncio.to_thread(analytics_store.equipment_summary, days, limit, top_n)
+
+
+@router.get("/analytics/timeseries", response_model=List[TimeSeriesPoint])
+async def get_time_series(
+    days: int = Query(90, ge=1, le=3660),
+    defect: Optional[str] = None,
+    equipment: Optional[str] = None
+):
+    """
+    기간 내 일자별 건수
+    
+    Args:
+        days: 최근 일수
+        defect: 불량명 필터
+        equipment: 설비명 필터
+    """
+    return await asyncio.to_thread(analytics_store.defect_time_series, days, defect, equipment)
+
+
+@router.post("/analytics/rebuild")
+def rebuild_analytics(db: Session = Depends(get_db)):
+    """
+    완료된 모든 분류 작업으로 분석 저장소 재구성
+    
+    저장소 도입 이전 작업을 반영하거나 파일이 손상되었을 때 사용
+    """
+    try:
+        count = analytics_store.rebuild_analytics(db)
+    except Exception as e:
+        logger.error(f"분석 저장소 재구성 실패: {e}")
+        raise HTTPException(status_code=500, detail=f"분석 저장소 재구성 중 오류가 발생했습니다: {str(e)}")
+    
+    return {"message": f"{count}개 작업을 분석 저장소에 반영했습니다.", "histories": count}
@@ -1,63 +1,260 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pathlib import Path
 from datetime import datetime
 import logging
 import json
 import asyncio
+import uuid
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import quote
 
-from ..database import get_db
-from ..models import ClassificationHistory, UserSettings
-from ..schemas import ClassificationRequest, ClassificationResponse
+from ..database import get_async_db
+from ..models import Artifact, ClassificationHistory, ClassificationRow, UserSettings
+from ..schemas import (
+    ClassificationRequest,
+    ClassificationResponse,
+    BatchClassificationRequest,
+    BatchClassificationResponse,
+    JobSubmitResponse,
+)
+from ..core.preprocessor import DATA_START_ROW
 from ..services.excel_handler import ExcelHandler
 from ..services.llm_classifier import LLMClassifier
+from ..services.issue_normalizer import IssueNormalizer
+from ..services.classification_runner import (
+    classify_issue_values,
+    build_result_path,
+    empty_result,
+    write_result_file,
+    expand_group_results,
+    ClassificationPipeline,
+)
+from ..services.result_writers import (
+    EXPORT_FORMATS,
+    RowExporter,
+    export_suffix,
+    parse_export_formats,
+)
+from ..services.incremental import find_baseline_history, plan_incremental
+from ..services.row_store import row_to_result, save_classification_rows
+from ..services.job_queue import enqueue_job
+from ..services.analytics_store import write_history_rows
+from ..services.progress import JobChannel, ProgressRecorder, progress_broker
+from ..services.metrics import JOBS_IN_FLIGHT, stage_timer, track_job
+from ..services.tracing import JobTrace, record_event, save_trace, start_trace
+from ..services.profiling import tag_profile
+from ..services.http_cache import etag_matches, not_modified, ranged_file_response
+from ..services.structured_log import bind_log_context, job_extra, row_extra
+from ..services.artifact_store import (
+    hash_file,
+    is_artifact_path,
+    iter_file_bytes,
+    is_compressed_file,
+    register_history_artifacts,
+)
 from ..config import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-@router.post("/classify", response_model=ClassificationResponse)
-async def classify_file(
-    request: ClassificationRequest,
-    db: Session = Depends(get_db)
-):
+async def resolve_baseline(db: AsyncSession, request: ClassificationRequest):
     """
-    파일 분류 실행
+    증분 분류 기준 작업 조회
     
-    엑셀 파일을 읽어서 각 row의 Issue 컬럼을 LLM으로 분류하고
-    불량명, 설비명, 조치내용 컬럼을 추가한 결과 파일 생성
+    baseline_history_id를 지정했는데 사용할 수 없으면 404,
+    지정하지 않았는데 기준 작업이 없으면 None (전체 분류)
     """
-    # 파일 존재 확인
-    file_path = Path(request.file_path)
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+    if not request.incremental:
+        return None
     
-    # 사용자 설정 조회
-    user_settings = db.query(UserSettings).first()
+    baseline = await db.run_sync(
+        lambda session: find_baseline_history(
+            session,
+            sheet_name=request.sheet_name,
+            column_name=request.column_name,
+            baseline_history_id=request.baseline_history_id
+        )
+    )
+    if request.baseline_history_id is not None and baseline is None:
+        raise HTTPException(status_code=404, detail="증분 분류 기준 이력을 찾을 수 없습니다.")
+    return baseline
+
+
+async def require_user_settings(db: AsyncSession) -> UserSettings:
+    """사용자 설정 조회 (API 키가 없으면 400)"""
+    result = await db.execute(select(UserSettings).limit(1))
+    user_settings = result.scalars().first()
     if not user_settings or not user_settings.openai_api_key:
         raise HTTPException(
             status_code=400,
             detail="OpenAI API 키가 설정되지 않았습니다. 설정 메뉴에서 API 키를 입력해주세요."
         )
-    
-    # 이력 생성
-    history = ClassificationHistory(
-        filename=file_path.name,
-        file_path=str(file_path),
-        sheet_name=request.sheet_name,
-        column_name=request.column_name,
-        status="processing"
+    return user_settings
+
+
+async def append_to_analytics(db: AsyncSession, history: ClassificationHistory) -> None:
+    """완료된 작업을 분석 저장소에 반영 (실패해도 분류 결과에는 영향 없음)"""
+    try:
+        result = await db.execute(
+            select(ClassificationRow)
+            .where(ClassificationRow.history_id == history.id)
+            .order_by(ClassificationRow.row_index)
+        )
+        await asyncio.to_thread(write_history_rows, history, result.scalars().all())
+    except Exception as e:
+        logger.warning(f"분석 저장소 반영 실패 (history_id={history.id}): {e}")
+
+
+async def store_artifacts(db: AsyncSession, history: ClassificationHistory) -> None:
+    """완료된 작업의 원본/결과 파일을 아티팩트 저장소에 등록 (실패하면 기존 경로 유지)"""
+    try:
+        source_digest = None
+        if not is_artifact_path(history.file_path):
+            source_digest = await asyncio.to_thread(hash_file, Path(history.file_path))
+        result_digest = await asyncio.to_thread(hash_file, Path(history.result_path))
+        await db.run_sync(
+            lambda session: register_history_artifacts(session, history, source_digest, result_digest)
+        )
+        await db.commit()
+    except Exception as e:
+        logger.warning(f"아티팩트 저장소 등록 실패 (history_id={history.id}): {e}")
+        await db.rollback()
+        await db.refresh(history)
+
+
+def open_row_exporter(column_name: str) -> RowExporter:
+    """설정된 포맷(result_export_formats)의 행 단위 결과 파일 writer 열기"""
+    return RowExporter(settings.results_dir, column_name, parse_export_formats(settings.result_export_formats))
+
+
+async def finish_row_exports(history: ClassificationHistory, exporter: RowExporter) -> None:
+    """행 단위 결과 파일을 최종 결과 파일 stem으로 확정 (실패하면 다운로드 시 변환으로 대체)"""
+    try:
+        await asyncio.to_thread(exporter.finish, Path(history.result_path).stem)
+    except Exception as e:
+        logger.warning(f"행 단위 결과 파일 저장 실패 (history_id={history.id}): {e}")
+        exporter.abort()
+
+
+async def export_history_rows(db: AsyncSession, history: ClassificationHistory, export_format: str, stem: str) -> Path:
+    """
+    저장된 행 단위 결과(ClassificationRow)로 RowExporter와 같은 구성의 파일 생성
+    (작업 중 만들지 않은 포맷, 이전 작업의 다운로드용)
+    """
+    exporter = RowExporter(settings.results_dir, history.column_name or settings.default_column_name, [export_format])
+    try:
+        result = await db.execute(
+            select(ClassificationRow)
+            .where(ClassificationRow.history_id == history.id)
+            .order_by(ClassificationRow.row_index)
+        )
+        for row in result.scalars():
+            exporter.write_row(row.row_index, row.issue_text, row_to_result(row), row.status)
+        paths = await asyncio.to_thread(exporter.finish, stem)
+    finally:
+        exporter.abort()
+    if not paths:
+        raise RuntimeError(f"{export_format} writer를 만들 수 없습니다.")
+    return paths[0]
+
+
+async def persist_trace(db: AsyncSession, trace: Optional[JobTrace], *histories: ClassificationHistory) -> None:
+    """작업 트레이스 저장 (실패해도 분류 결과에는 영향 없음), 프로파일링 중이면 이력 id 연결"""
+    tag_profile(*(history.id for history in histories))
+    if trace is None:
+        return
+    trace.finish()
+    try:
+        for history in histories:
+            await db.run_sync(save_trace, history.id, trace)
+        await db.commit()
+    except Exception as e:
+        logger.warning(f"작업 트레이스 저장 실패: {e}")
+        await db.rollback()
+
+
+def record_model_usage(
+    history: ClassificationHistory,
+    classifier: LLMClassifier,
+    keys: Optional[Iterable[str]] = None
+) -> None:
+    """
+    모델 캐스케이드 사용량(에스컬레이션 행 수, 모델별 호출/비용, 절감 비용)을 이력에 기록
+
+    Args:
+        keys: 여러 파일이 분류기를 공유할 때 이 파일의 Issue 내용 (None이면 전체)
+    """
+    summary = classifier.usage.summary(keys)
+    history.escalated_rows = summary["escalated_rows"]
+    history.model_usage = json.dumps(summary, ensure_ascii=False)
+
+
+def record_token_savings(
+    history: ClassificationHistory,
+    normalizer: IssueNormalizer,
+    issue_values: Iterable[Any]
+) -> None:
+    """Issue 텍스트 정리/중복 제거로 줄인 추정 프롬프트 토큰 수를 이력과 작업 트레이스에 기록"""
+    stats = normalizer.token_stats(issue_values)
+    history.issue_tokens_saved = stats["tokens_saved"]
+    record_event("normalize", "cache", **stats)
+
+
+def log_job_summary(history: ClassificationHistory, **fields) -> None:
+    """작업 단위 요약 로그 (행 단위 로그와 달리 샘플링하지 않음)"""
+    duration = None
+    if history.created_at and history.completed_at:
+        duration = round((history.completed_at - history.created_at).total_seconds(), 3)
+    logger.info(
+        "분류 작업 종료",
+        extra=job_extra(
+            history_id=history.id,
+            status=history.status,
+            total_rows=history.total_rows,
+            processed_rows=history.processed_rows,
+            failed_rows=history.failed_rows,
+            escalated_rows=history.escalated_rows,
+            issue_tokens_saved=history.issue_tokens_saved,
+            duration_s=duration,
+            **fields
+        )
     )
-    db.add(history)
-    db.commit()
-    db.refresh(history)
+
+
+async def run_classification(
+    db: AsyncSession,
+    history: ClassificationHistory,
+    request: ClassificationRequest,
+    user_settings: UserSettings,
+    baseline: Optional[ClassificationHistory] = None,
+    trace: Optional[JobTrace] = None,
+    channel: Optional[JobChannel] = None,
+    concurrency: int = 1
+) -> ClassificationResponse:
+    """
+    이력 하나의 파일 분류 실행 (API 요청, SSE 스트리밍, 워커 프로세스, CLI에서 공용)
+    
+    실패하면 이력을 failed로 기록한 뒤 예외를 다시 발생시키며,
+    끝나면 성공/실패와 관계없이 작업 트레이스를 저장
     
+    Args:
+        channel: SSE 진행상황 채널 (있으면 start → progress(행 결과 묶음) → complete/error 이벤트 기록)
+        concurrency: 동시 LLM 호출 수 (앞선 행의 호출을 미리 시작하고, 결과는 행 순서대로 기록)
+    """
+    file_path = Path(history.file_path)
+    tasks: Dict[str, asyncio.Task] = {}
+    exporter: Optional[RowExporter] = None
     try:
         # Excel 읽기
         excel_handler = ExcelHandler()
-        df = excel_handler.read_excel(str(file_path), request.sheet_name)
+        df = await asyncio.to_thread(excel_handler.read_excel, str(file_path), request.sheet_name)
+        
+        # 증분 분류: 기준 작업과 해시 조인하여 재사용할 행 계산
+        reused = await asyncio.to_thread(plan_incremental, df, request.column_name, baseline) if baseline else {}
         
         # LLM Classifier 초기화
         classifier = LLMClassifier(
@@ -71,61 +268,124 @@ async def classify_file(
         issue_values = excel_handler.get_column_values(df, request.column_name)
         total_rows = len(issue_values)
         classifications = []
+        row_statuses = []
         processed_count = 0
         failed_count = 0
+        classified_count = 0
         
-        for idx, issue_value in enumerate(issue_values):
-            # 빈 값이면 skip
-            if excel_handler.is_empty_value(issue_value):
-                classifications.append({
-                    "불량명": "",
-                    "설비명": "",
-                    "조치내용": ""
-                })
-                logger.info(f"Row {idx + 1}: Issue 값이 비어있어 건너뜁니다.")
-                continue
-            
-            # LLM 분류
-            result, success = classifier.classify(
-                issue_content=str(issue_value),
-                prompt=request.prompt,
-                few_shot_examples=user_settings.few_shot_examples,
-                max_retries=3
-            )
-            
-            if success and result:
-                classifications.append(result)
+        # 정리된 Issue 텍스트 → 분류 task (같은 내용은 한 번만 호출)
+        normalizer = IssueNormalizer()
+        contents = [normalizer.normalize(value) for value in issue_values]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def classify_content(content: str):
+            async with semaphore:
+                return await asyncio.to_thread(
+                    classifier.classify,
+                    issue_content=content,
+                    prompt=request.prompt,
+                    few_shot_examples=user_settings.few_shot_examples,
+                    max_retries=3
+                )
+        
+        for idx, content in enumerate(contents):
+            if content and idx not in reused and content not in tasks:
+                tasks[content] = asyncio.create_task(classify_content(content))
+        
+        # 진행상황은 N행 / T밀리초마다 모아서 기록
+        history.total_rows = total_rows
+        progress = ProgressRecorder(db, history)
+        
+        # 행 단위 결과 파일(csv/jsonl/parquet)은 행 결과가 나오는 대로 기록
+        exporter = open_row_exporter(request.column_name)
+        
+        if channel is not None:
+            # 시작 이벤트 (재연결에 쓸 history_id 포함)
+            channel.publish({'type': 'start', 'history_id': history.id, 'total': total_rows, 'reused': len(reused)})
+        
+        for idx, content in enumerate(contents):
+            if not content:
+                # 빈 값(정리 후 남는 내용이 없는 경우 포함)이면 skip
+                result = empty_result()
+                status = "empty"
+                logger.info("Issue 값이 비어있어 건너뜁니다.", extra=row_extra(idx + 1))
+            elif idx in reused:
+                # 기준 작업과 같은 행은 결과 재사용
+                result = reused[idx]
+                status = "reused"
                 processed_count += 1
-                logger.info(f"Row {idx + 1}: 분류 성공 - {result}")
             else:
-                classifications.append({
-                    "불량명": "",
-                    "설비명": "",
-                    "조치내용": ""
-                })
-                failed_count += 1
-                logger.warning(f"Row {idx + 1}: 분류 실패")
-        
-        # 결과 파일 저장 (기존 파일에 컬럼 추가)
-        result_filename = f"classified_{file_path.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        result_path = Path(settings.results_dir) / result_filename
+                # LLM 분류 (정리 결과가 앞 행과 같으면 같은 호출 결과 사용)
+                classified_count += 1
+                llm_result, success = await tasks[content]
+                
+                if success and llm_result:
+                    result = llm_result
+                    status = "success"
+                    processed_count += 1
+                    logger.info("분류 성공", extra=row_extra(idx + 1, defect=result.get("불량명")))
+                else:
+                    result = empty_result()
+                    status = "failed"
+                    failed_count += 1
+                    logger.warning("분류 실패", extra=row_extra(idx + 1))
+            
+            classifications.append(result)
+            row_statuses.append(status)
+            exporter.write_row(idx, issue_values[idx], result, status)
+            await progress.update(processed_count, failed_count)
+            
+            if channel is not None:
+                # 행 결과는 stream_event_interval_ms 단위로 묶어서 progress 이벤트로 전송
+                channel.add_row(
+                    {'row': idx, 'status': status, **result},
+                    current=idx + 1,
+                    total=total_rows,
+                    processed_rows=processed_count,
+                    failed_rows=failed_count
+                )
         
-        # append_results_to_file 사용 (merged cells 유지)
-        excel_handler.append_results_to_file(
+        # 결과 파일 저장 (설정된 writer 사용, 기본: openpyxl, merged cells 유지)
+        result_path = build_result_path(file_path)
+        await asyncio.to_thread(
+            write_result_file,
             original_file_path=str(file_path),
             output_file_path=str(result_path),
             classifications=classifications,
             sheet_name=request.sheet_name
         )
         
+        # 행 단위 결과 저장
+        await db.run_sync(
+            save_classification_rows,
+            history.id,
+            zip(range(total_rows), issue_values, classifications, row_statuses)
+        )
+        
         # 이력 업데이트
         history.status = "completed"
         history.result_path = str(result_path)
         history.total_rows = total_rows
         history.processed_rows = processed_count
         history.failed_rows = failed_count
+        history.reused_rows = len(reused)
+        record_model_usage(history, classifier)
+        record_token_savings(
+            history, normalizer, (value for idx, value in enumerate(issue_values) if idx not in reused)
+        )
         history.completed_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
+        await store_artifacts(db, history)
+        await finish_row_exports(history, exporter)
+        await append_to_analytics(db, history)
+        log_job_summary(history, reused_rows=len(reused), classified_rows=classified_count)
+        
+        if channel is not None:
+            channel.close(stream_complete_event(history, classified_count))
+        
+        message = f"분류가 완료되었습니다. (성공: {processed_count}, 실패: {failed_count})"
+        if baseline:
+            message += f" - 재사용: {len(reused)}, 신규 분류: {classified_count}"
         
         return ClassificationResponse(
             history_id=history.id,
@@ -134,32 +394,209 @@ async def classify_file(
             total_rows=total_rows,
             processed_rows=processed_count,
             failed_rows=failed_count,
-            result_path=str(result_path),
-            message=f"분류가 완료되었습니다. (성공: {processed_count}, 실패: {failed_count})"
+            result_path=history.result_path,
+            baseline_history_id=history.baseline_history_id,
+            reused_rows=len(reused),
+            classified_rows=classified_count,
+            message=message
         )
         
     except Exception as e:
         # 이력 업데이트 (실패)
         history.status = "failed"
         history.error_message = str(e)
-        db.commit()
+        history.completed_at = datetime.utcnow()
+        await db.commit()
         
-        logger.error(f"분류 중 오류 발생: {e}")
+        logger.error("분류 중 오류 발생: %s", e)
+        if channel is not None:
+            channel.close({'type': 'error', 'history_id': history.id, 'message': str(e)})
+        raise
+    finally:
+        # 실패/취소 시 아직 남은 LLM 호출 취소, 확정되지 않은 행 단위 결과 파일 삭제
+        for task in tasks.values():
+            task.cancel()
+        if exporter is not None:
+            exporter.abort()
+        # WebSocket 구독자에게 최종 상태 전달
+        progress_broker.publish(history)
+        await persist_trace(db, trace, history)
+
+
+@router.post("/classify", response_model=ClassificationResponse)
+@track_job("classify")
+async def classify_file(
+    request: ClassificationRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    파일 분류 실행
+    
+    엑셀 파일을 읽어서 각 row의 Issue 컬럼을 LLM으로 분류하고
+    불량명, 설비명, 조치내용 컬럼을 추가한 결과 파일 생성
+    """
+    trace = start_trace("classify")
+    # 파일 존재 확인
+    file_path = Path(request.file_path)
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+    
+    # 사용자 설정 조회
+    user_settings = await require_user_settings(db)
+    
+    baseline = await resolve_baseline(db, request)
+    
+    # 이력 생성
+    history = ClassificationHistory(
+        filename=file_path.name,
+        file_path=str(file_path),
+        sheet_name=request.sheet_name,
+        column_name=request.column_name,
+        baseline_history_id=baseline.id if baseline else None,
+        status="processing"
+    )
+    db.add(history)
+    await db.commit()
+    await db.refresh(history)
+    bind_log_context(history_id=history.id, job="classify")
+    
+    try:
+        return await run_classification(db, history, request, user_settings, baseline, trace)
+    except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"분류 중 오류가 발생했습니다: {str(e)}"
         )
 
 
+@router.post("/classify/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_classification_job(
+    request: ClassificationRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    파일 분류 작업 등록 (워커 프로세스에서 실행)
+    
+    작업은 python -m app.worker로 실행한 워커가 가져가서 처리하며,
+    진행상황과 결과는 /history/{id}로 조회
+    """
+    file_path = Path(request.file_path)
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+    
+    await require_user_settings(db)
+    baseline = await resolve_baseline(db, request)
+    
+    history = ClassificationHistory(
+        filename=file_path.name,
+        file_path=str(file_path),
+        sheet_name=request.sheet_name,
+        column_name=request.column_name,
+        baseline_history_id=baseline.id if baseline else None,
+        status="queued"
+    )
+    db.add(history)
+    await db.commit()
+    await db.refresh(history)
+    await db.run_sync(lambda session: enqueue_job(session, history, request.model_dump()))
+    await db.commit()
+    
+    return JobSubmitResponse(
+        history_id=history.id,
+        filename=history.filename,
+        status=history.status,
+        message="분류 작업이 등록되었습니다."
+    )
+
+
+def stream_complete_event(history: ClassificationHistory, classified_rows: Optional[int] = None) -> dict:
+    """SSE complete 이벤트 (실행 중 작업 / DB 이력 조회 공통)"""
+    message = f"분류가 완료되었습니다. (성공: {history.processed_rows}, 실패: {history.failed_rows})"
+    if history.baseline_history_id and classified_rows is not None:
+        message += f" - 재사용: {history.reused_rows}, 신규 분류: {classified_rows}"
+    return {
+        'type': 'complete',
+        'history_id': history.id,
+        'filename': history.filename,
+        'status': history.status,
+        'total_rows': history.total_rows,
+        'processed_rows': history.processed_rows,
+        'failed_rows': history.failed_rows,
+        'result_path': history.result_path,
+        'baseline_history_id': history.baseline_history_id,
+        'reused_rows': history.reused_rows,
+        'classified_rows': classified_rows,
+        'message': message
+    }
+
+
+async def channel_event_stream(channel: JobChannel, last_event_id: int = 0):
+    """JobChannel 이벤트를 SSE 형식으로 전송 (id 포함, 이벤트가 없으면 연결 유지 주석)"""
+    async for item in channel.subscribe(last_event_id):
+        if item is None:
+            yield ": keep-alive\n\n"
+            continue
+        event_id, data = item
+        yield f"id: {event_id}\ndata: {data}\n\n"
+
+
+async def history_event_stream(bind, history_id: int, poll_interval: float = 1.0):
+    """
+    이 프로세스에 채널이 없는 작업 (다른 프로세스에서 실행 / 보관 시간 경과)의 진행상황을
+    DB 이력으로 전송: 바뀔 때마다 snapshot, 끝나면 complete/error
+    """
+    last_snapshot = None
+    idle = 0.0
+    while True:
+        async with AsyncSession(bind=bind, expire_on_commit=False) as session:
+            history = await session.get(ClassificationHistory, history_id)
+        if history is None:
+            yield f"data: {json.dumps({'type': 'error', 'message': '이력을 찾을 수 없습니다.'}, ensure_ascii=False)}\n\n"
+            return
+        if history.status == "completed":
+            yield f"data: {json.dumps(stream_complete_event(history), ensure_ascii=False)}\n\n"
+            return
+        if history.status == "failed":
+            event = {'type': 'error', 'history_id': history.id, 'message': history.error_message or "분류 작업이 실패했습니다."}
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            return
+        
+        snapshot = {
+            'type': 'snapshot',
+            'history_id': history.id,
+            'status': history.status,
+            'total': history.total_rows,
+            'processed_rows': history.processed_rows,
+            'failed_rows': history.failed_rows
+        }
+        if snapshot != last_snapshot:
+            last_snapshot = snapshot
+            idle = 0.0
+            yield f"data: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+        elif idle >= settings.stream_heartbeat_seconds:
+            idle = 0.0
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(poll_interval)
+        idle += poll_interval
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+}
+
+
 @router.post("/classify/stream")
 async def classify_file_stream(
     request: ClassificationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     파일 분류 실행 (SSE 스트리밍)
     
-    분류 진행상황을 Server-Sent Events로 실시간 전송
+    분류는 요청과 분리된 태스크에서 실행하고 진행상황을 Server-Sent Events로 전송.
+    연결이 끊기면 GET /classify/stream/{history_id}에 Last-Event-ID를 보내
+    작업을 다시 시작하지 않고 이어서 받을 수 있음
     """
     # 파일 존재 확인
     file_path = Path(request.file_path)
@@ -167,16 +604,253 @@ async def classify_file_stream(
         raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
     
     # 사용자 설정 조회
-    user_settings = db.query(UserSettings).first()
-    if not user_settings or not user_settings.openai_api_key:
+    user_settings = await require_user_settings(db)
+    
+    baseline = await resolve_baseline(db, request)
+    
+    # 이력 생성
+    history = ClassificationHistory(
+        filename=file_path.name,
+        file_path=str(file_path),
+        sheet_name=request.sheet_name,
+        column_name=request.column_name,
+        baseline_history_id=baseline.id if baseline else None,
+        status="processing"
+    )
+    db.add(history)
+    await db.commit()
+    
+    # 작업은 응답 스트림이 끝나도 계속되므로 요청 세션과 별도 세션 사용
+    job_db = AsyncSession(bind=db.bind, autoflush=False, expire_on_commit=False)
+    job_history = await job_db.get(ClassificationHistory, history.id)
+    channel = progress_broker.open(history.id)
+    
+    async def stream_job():
+        # /classify와 같은 작업 본문을 요청과 분리된 태스크에서 실행 (진행상황은 channel로 전달)
+        trace = start_trace("stream")
+        bind_log_context(history_id=job_history.id, job="stream")
+        JOBS_IN_FLIGHT.labels("stream").inc()
+        try:
+            job_baseline = (
+                await job_db.get(ClassificationHistory, job_history.baseline_history_id)
+                if job_history.baseline_history_id else None
+            )
+            await run_classification(job_db, job_history, request, user_settings, job_baseline, trace, channel)
+        except Exception as e:
+            # 작업 실패는 run_classification이 이력과 채널에 기록함
+            if not channel.closed:
+                channel.close({'type': 'error', 'history_id': job_history.id, 'message': str(e)})
+        finally:
+            JOBS_IN_FLIGHT.labels("stream").dec()
+            await job_db.close()
+    
+    progress_broker.run(channel, stream_job())
+    
+    return StreamingResponse(
+        channel_event_stream(channel),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.get("/classify/stream/{history_id}")
+async def resume_classification_stream(
+    http_request: Request,
+    history_id: int,
+    last_event_id: Optional[int] = Query(None, description="Last-Event-ID 헤더를 보낼 수 없는 클라이언트용"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    SSE 진행상황 재연결
+    
+    Last-Event-ID(헤더 또는 쿼리) 다음 이벤트부터 전송하며, 작업이 이미 끝났으면
+    남은 이벤트와 complete 이벤트를 바로 보냄. 이 프로세스에 이벤트 기록이 없으면
+    (다른 프로세스에서 실행 / 보관 시간 경과) DB 이력의 현재 상태를 전송
+    """
+    if last_event_id is None:
+        try:
+            last_event_id = int(http_request.headers.get("last-event-id", 0))
+        except ValueError:
+            last_event_id = 0
+    
+    channel = progress_broker.get(history_id)
+    if channel is not None:
+        stream = channel_event_stream(channel, last_event_id)
+    else:
+        if await db.get(ClassificationHistory, history_id) is None:
+            raise HTTPException(status_code=404, detail="이력을 찾을 수 없습니다.")
+        stream = history_event_stream(db.bind, history_id)
+    
+    return StreamingResponse(stream, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/classify/pipeline", response_model=ClassificationResponse)
+@track_job("pipeline")
+async def classify_file_pipelined(
+    request: ClassificationRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    파일 분류 실행 (파이프라인)
+    
+    전처리되지 않은 원본 파일(/upload 에서 preprocess=false)을 받아
+    시트 전처리와 LLM 분류를 동시에 진행하고, 메모리의 워크북에
+    결과 컬럼을 바로 추가하여 저장 (중간 파일 저장/재로드 없음)
+    """
+    trace = start_trace("pipeline")
+    # 파일 존재 확인
+    file_path = Path(request.file_path)
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
+    
+    # 사용자 설정 조회
+    user_settings = await require_user_settings(db)
+    
+    # 이력 생성
+    history = ClassificationHistory(
+        filename=file_path.name,
+        file_path=str(file_path),
+        sheet_name=request.sheet_name,
+        column_name=request.column_name,
+        status="processing"
+    )
+    db.add(history)
+    await db.commit()
+    await db.refresh(history)
+    bind_log_context(history_id=history.id, job="pipeline")
+    
+    exporter: Optional[RowExporter] = None
+    try:
+        classifier = LLMClassifier(
+            api_key=user_settings.openai_api_key,
+            base_url=user_settings.openai_base_url,
+            model=user_settings.model_name,
+            mock_mode=settings.mock_llm
+        )
+        pipeline = ClassificationPipeline(
+            classifier,
+            prompt=request.prompt,
+            few_shot_examples=user_settings.few_shot_examples
+        )
+        
+        group_results = []
+        group_statuses = []
+        processed_count = 0
+        failed_count = 0
+        progress = ProgressRecorder(db, history)
+        # 행 단위 결과 파일은 그룹 결과가 나오는 대로 기록 (병합된 그룹은 첫 행 기준)
+        exporter = open_row_exporter(request.column_name)
+        async for group, result, status in pipeline.run(file_path, request.sheet_name, request.column_name):
+            group_results.append((group, result))
+            group_statuses.append(status)
+            exporter.write_row(group["start_row"] - DATA_START_ROW, group["text"], result, status)
+            if status == "success":
+                processed_count += 1
+            elif status == "failed":
+                failed_count += 1
+            await progress.update(processed_count, failed_count)
+        
+        classifications = expand_group_results(group_results)
+        total_rows = len(classifications)
+        
+        # 결과 파일 저장 (전처리된 워크북에 바로 컬럼 추가)
+        result_path = build_result_path(file_path)
+        
+        @stage_timer("write_result")
+        def save_result():
+            excel_handler = ExcelHandler()
+            excel_handler.append_results_to_workbook(pipeline.workbook, classifications, request.sheet_name)
+            pipeline.workbook.save(str(result_path))
+            pipeline.workbook.close()
+        
+        await asyncio.to_thread(save_result)
+        
+        # 행 단위 결과 저장 (병합된 그룹은 첫 행에 결과 기록)
+        await db.run_sync(
+            save_classification_rows,
+            history.id,
+            (
+                (group["start_row"] - DATA_START_ROW, group["text"], result, status)
+                for (group, result), status in zip(group_results, group_statuses)
+            )
+        )
+        
+        # 이력 업데이트
+        history.status = "completed"
+        history.result_path = str(result_path)
+        history.total_rows = total_rows
+        history.processed_rows = processed_count
+        history.failed_rows = failed_count
+        record_model_usage(history, classifier)
+        record_token_savings(history, pipeline.normalizer, (group["text"] for group, _ in group_results))
+        history.completed_at = datetime.utcnow()
+        await db.commit()
+        await store_artifacts(db, history)
+        await finish_row_exports(history, exporter)
+        await append_to_analytics(db, history)
+        log_job_summary(history)
+        
+        return ClassificationResponse(
+            history_id=history.id,
+            filename=history.filename,
+            status=history.status,
+            total_rows=total_rows,
+            processed_rows=processed_count,
+            failed_rows=failed_count,
+            result_path=history.result_path,
+            message=f"분류가 완료되었습니다. (성공: {processed_count}, 실패: {failed_count})"
+        )
+        
+    except Exception as e:
+        # 이력 업데이트 (실패)
+        history.status = "failed"
+        history.error_message = str(e)
+        await db.commit()
+        
+        logger.error("분류 중 오류 발생: %s", e)
         raise HTTPException(
-            status_code=400,
-            detail="OpenAI API 키가 설정되지 않았습니다. 설정 메뉴에서 API 키를 입력해주세요."
+            status_code=500,
+            detail=f"분류 중 오류가 발생했습니다: {str(e)}"
         )
+    finally:
+        if exporter is not None:
+            exporter.abort()
+        # WebSocket 구독자에게 최종 상태 전달
+        progress_broker.publish(history)
+        await persist_trace(db, trace, history)
 
-    async def generate():
-        # 이력 생성
+
+@router.post("/classify/batch", response_model=BatchClassificationResponse)
+@track_job("batch")
+async def classify_files_batch(
+    request: BatchClassificationRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    배치 파일 분류 실행
+    
+    여러 파일의 Issue 값을 하나의 작업으로 모아 동시에 LLM 분류를 수행하고
+    파일별로 결과 파일을 생성
+    """
+    trace = start_trace("batch")
+    if not request.file_paths:
+        raise HTTPException(status_code=400, detail="분류할 파일이 없습니다.")
+    
+    file_paths = [Path(p) for p in request.file_paths]
+    missing = [p.name for p in file_paths if not p.exists()]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"파일을 찾을 수 없습니다: {', '.join(missing)}")
+    
+    # 사용자 설정 조회
+    user_settings = await require_user_settings(db)
+    
+    # 파일별 이력 생성 (같은 batch_id로 묶음)
+    batch_id = uuid.uuid4().hex
+    bind_log_context(batch_id=batch_id, job="batch")
+    histories = []
+    for file_path in file_paths:
         history = ClassificationHistory(
+            batch_id=batch_id,
             filename=file_path.name,
             file_path=str(file_path),
             sheet_name=request.sheet_name,
@@ -184,132 +858,155 @@ async def classify_file_stream(
             status="processing"
         )
         db.add(history)
-        db.commit()
-        db.refresh(history)
-        
+        histories.append(history)
+    await db.commit()
+    
+    excel_handler = ExcelHandler()
+    
+    # 파일별 Issue 값 수집
+    file_values = []
+    for history, file_path in zip(histories, file_paths):
         try:
-            # Excel 읽기
-            excel_handler = ExcelHandler()
-            df = excel_handler.read_excel(str(file_path), request.sheet_name)
-            
-            # LLM Classifier 초기화
-            classifier = LLMClassifier(
-                api_key=user_settings.openai_api_key,
-                base_url=user_settings.openai_base_url,
-                model=user_settings.model_name,
-                mock_mode=settings.mock_llm
-            )
-            
-            # 각 row 처리
-            issue_values = excel_handler.get_column_values(df, request.column_name)
-            total_rows = len(issue_values)
-            classifications = []
-            processed_count = 0
-            failed_count = 0
-            
-            # 시작 이벤트 전송
-            yield f"data: {json.dumps({'type': 'start', 'total': total_rows})}\n\n"
-            
-            for idx, issue_value in enumerate(issue_values):
-                # 빈 값이면 skip
-                if excel_handler.is_empty_value(issue_value):
-                    classifications.append({
-                        "불량명": "",
-                        "설비명": "",
-                        "조치내용": ""
-                    })
-                else:
-                    # LLM 분류
-                    result, success = classifier.classify(
-                        issue_content=str(issue_value),
-                        prompt=request.prompt,
-                        few_shot_examples=user_settings.few_shot_examples,
-                        max_retries=3
-                    )
-                    
-                    if success and result:
-                        classifications.append(result)
-                        processed_count += 1
-                    else:
-                        classifications.append({
-                            "불량명": "",
-                            "설비명": "",
-                            "조치내용": ""
-                        })
-                        failed_count += 1
-                
-                # 진행상황 이벤트 전송
-                yield f"data: {json.dumps({'type': 'progress', 'current': idx + 1, 'total': total_rows})}\n\n"
-                await asyncio.sleep(0)  # Allow other tasks to run
-            
-            # 결과 파일 저장
-            result_filename = f"classified_{file_path.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            result_path = Path(settings.results_dir) / result_filename
-            
-            excel_handler.append_results_to_file(
-                original_file_path=str(file_path),
-                output_file_path=str(result_path),
-                classifications=classifications,
-                sheet_name=request.sheet_name
-            )
-            
-            # 이력 업데이트
-            history.status = "completed"
-            history.result_path = str(result_path)
-            history.total_rows = total_rows
-            history.processed_rows = processed_count
-            history.failed_rows = failed_count
-            history.completed_at = datetime.utcnow()
-            db.commit()
-            
-            # 완료 이벤트 전송
-            result = {
-                'type': 'complete',
-                'history_id': history.id,
-                'filename': history.filename,
-                'status': history.status,
-                'total_rows': total_rows,
-                'processed_rows': processed_count,
-                'failed_rows': failed_count,
-                'result_path': str(result_path),
-                'message': f"분류가 완료되었습니다. (성공: {processed_count}, 실패: {failed_count})"
-            }
-            yield f"data: {json.dumps(result)}\n\n"
-            
+            df = await asyncio.to_thread(excel_handler.read_excel, str(file_path), request.sheet_name)
+            file_values.append(excel_handler.get_column_values(df, request.column_name))
         except Exception as e:
-            # 이력 업데이트 (실패)
             history.status = "failed"
             history.error_message = str(e)
-            db.commit()
-            
-            logger.error(f"분류 중 오류 발생: {e}")
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            file_values.append([])
+            logger.error("배치 파일 읽기 실패 (%s): %s", file_path.name, e)
+    await db.commit()
     
-    return StreamingResponse(
-        generate(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        }
+    # 모든 파일의 row를 한 번에 스케줄링하여 LLM 동시 호출 유지
+    classifier = LLMClassifier(
+        api_key=user_settings.openai_api_key,
+        base_url=user_settings.openai_base_url,
+        model=user_settings.model_name,
+        mock_mode=settings.mock_llm
+    )
+    normalizer = IssueNormalizer()
+    all_values = [value for values in file_values for value in values]
+    outcomes = await classify_issue_values(
+        classifier,
+        all_values,
+        prompt=request.prompt,
+        few_shot_examples=user_settings.few_shot_examples,
+        normalizer=normalizer
+    )
+    
+    # 파일별로 결과 분리 및 저장
+    results = []
+    offset = 0
+    for history, file_path, values in zip(histories, file_paths, file_values):
+        file_outcomes = outcomes[offset:offset + len(values)]
+        offset += len(values)
+        exporter = None
+        
+        if history.status != "failed":
+            try:
+                classifications = [result for result, _ in file_outcomes]
+                result_path = build_result_path(file_path)
+                await asyncio.to_thread(
+                    write_result_file,
+                    original_file_path=str(file_path),
+                    output_file_path=str(result_path),
+                    classifications=classifications,
+                    sheet_name=request.sheet_name
+                )
+                
+                rows = [
+                    (idx, value, result, status)
+                    for idx, (value, (result, status)) in enumerate(zip(values, file_outcomes))
+                ]
+                await db.run_sync(save_classification_rows, history.id, rows)
+                
+                # 행 단위 결과 파일 (파일들의 분류가 한 번에 끝나므로 메모리의 결과로 기록)
+                exporter = open_row_exporter(request.column_name)
+                for row in rows:
+                    exporter.write_row(*row)
+                
+                history.status = "completed"
+                history.result_path = str(result_path)
+                history.total_rows = len(values)
+                history.processed_rows = sum(1 for _, status in file_outcomes if status == "success")
+                history.failed_rows = sum(1 for _, status in file_outcomes if status == "failed")
+                # 같은 Issue는 파일 간에 한 번만 호출하므로 이 파일의 Issue 내용 기준으로 집계
+                record_model_usage(history, classifier, keys=map(normalizer.normalize, values))
+                record_token_savings(history, normalizer, values)
+                history.completed_at = datetime.utcnow()
+            except Exception as e:
+                history.status = "failed"
+                history.error_message = str(e)
+                logger.error("배치 결과 저장 실패 (%s): %s", file_path.name, e)
+        await db.commit()
+        if history.status == "completed":
+            await store_artifacts(db, history)
+            await finish_row_exports(history, exporter)
+            await append_to_analytics(db, history)
+        elif exporter is not None:
+            exporter.abort()
+        log_job_summary(history, batch_id=batch_id)
+        progress_broker.publish(history)
+        
+        results.append(ClassificationResponse(
+            history_id=history.id,
+            filename=history.filename,
+            status=history.status,
+            total_rows=history.total_rows or 0,
+            processed_rows=history.processed_rows or 0,
+            failed_rows=history.failed_rows or 0,
+            result_path=history.result_path,
+            message=history.error_message or f"분류가 완료되었습니다. (성공: {history.processed_rows}, 실패: {history.failed_rows})"
+        ))
+    
+    # 파일들이 LLM 호출을 함께 하므로 배치 전체 트레이스를 각 이력에 저장
+    await persist_trace(db, trace, *histories)
+    
+    completed = [r for r in results if r.status == "completed"]
+    processed_rows = sum(r.processed_rows for r in results)
+    failed_rows = sum(r.failed_rows for r in results)
+    
+    return BatchClassificationResponse(
+        batch_id=batch_id,
+        status="completed" if len(completed) == len(results) else "partial" if completed else "failed",
+        total_rows=sum(r.total_rows for r in results),
+        processed_rows=processed_rows,
+        failed_rows=failed_rows,
+        results=results,
+        message=f"{len(completed)}/{len(results)}개 파일 분류 완료 (성공: {processed_rows}, 실패: {failed_rows})"
     )
 
 
 @router.get("/classify/{history_id}/download")
 async def download_result(
+    request: Request,
     history_id: int,
-    db: Session = Depends(get_db)
+    format: str = Query("xlsx", description="xlsx (원본 서식), xlsx_flat, csv, jsonl, parquet"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     분류 결과 파일 다운로드
+    
+    format이 xlsx가 아니면 분류 중 기록한 행 단위 결과 파일(result_export_formats)을 그대로 반환.
+    해당 파일이 없는 이전 작업이나 설정에 없는 포맷은 저장된 행 단위 결과로 같은 구성의
+    파일을 만들어 결과 디렉토리에 캐시 (결과 xlsx는 다시 읽지 않음)
+    
+    결과 파일 해시로 만든 strong ETag를 붙이며, If-None-Match가 같으면 304,
+    Range 요청이면 206으로 일부만 전송 (이어받기)
     """
-    history = db.query(ClassificationHistory)\
-        .filter(ClassificationHistory.id == history_id)\
-        .first()
+    if format != "xlsx" and format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"지원하지 않는 포맷입니다: {format} (지원 포맷: xlsx, {', '.join(EXPORT_FORMATS)})"
+        )
+    
+    history = await db.get(ClassificationHistory, history_id)
     
     if not history:
         raise HTTPException(status_code=404, detail="이력을 찾을 수 없습니다.")
     
+    if history.expired_at and not history.result_path:
+        raise HTTPException(status_code=410, detail="보관 기간이 지나 결과 파일이 삭제되었습니다.")
+    
     if not history.result_path or history.status != "completed":
         raise HTTPException(status_code=400, detail="다운로드할 수 있는 결과 파일이 없습니다.")
     
@@ -317,8 +1014,52 @@ async def download_result(
     if not result_path.exists():
         raise HTTPException(status_code=404, detail="결과 파일을 찾을 수 없습니다.")
     
-    return FileResponse(
-        path=str(result_path),
-        filename=result_path.name,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    # 용량 한도 초과 시 오래 사용하지 않은 결과부터 정리하기 위해 기록
+    now = datetime.utcnow()
+    history.last_accessed_at = now
+    artifact = await db.get(Artifact, history.result_artifact_id) if history.result_artifact_id else None
+    if artifact is not None:
+        artifact.last_accessed_at = now
+    await db.commit()
+    
+    # 저장소 파일명은 내용 해시이므로 원본 파일명 기준으로 다운로드 이름 지정
+    download_stem = f"classified_{Path(history.filename).stem}" if artifact is not None else result_path.stem
+    
+    # 결과 파일 내용 해시 (아티팩트로 등록된 결과는 저장된 해시 사용)
+    if artifact is not None:
+        result_digest = artifact.sha256
+    else:
+        result_digest, _ = await asyncio.to_thread(hash_file, result_path)
+    # 변환 결과는 결과 파일과 포맷으로 결정되므로 포맷별로 구분
+    etag = f'"{result_digest}"' if format == "xlsx" else f'"{result_digest}-{format}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    
+    if format == "xlsx":
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        if await asyncio.to_thread(is_compressed_file, result_path):
+            # 압축된 결과는 풀어서 스트리밍 (임시 파일 없음, Range 미지원)
+            headers = {
+                "Content-Disposition": f"attachment; filename*=UTF-8''{quote(download_stem)}.xlsx",
+                "ETag": etag,
+                "Accept-Ranges": "none",
+            }
+            if artifact is not None:
+                headers["Content-Length"] = str(artifact.size)
+            return StreamingResponse(iter_file_bytes(result_path), media_type=media_type, headers=headers)
+        return ranged_file_response(request, result_path, etag, f"{download_stem}.xlsx", media_type)
+    
+    writer_cls = EXPORT_FORMATS[format]
+    suffix = export_suffix(format)
+    export_path = Path(settings.results_dir) / f"{result_path.stem}{suffix}"
+    
+    # 아티팩트 파일명은 내용 해시라서 결과가 바뀌지 않으므로 (압축 시 수정시각만 바뀜) 존재 여부만 확인
+    stale = export_path.exists() and artifact is None and export_path.stat().st_mtime < result_path.stat().st_mtime
+    if not export_path.exists() or stale:
+        try:
+            await export_history_rows(db, history, format, result_path.stem)
+        except Exception as e:
+            logger.error(f"결과 파일 변환 실패: {e}")
+            raise HTTPException(status_code=500, detail=f"결과 파일 변환 중 오류가 발생했습니다: {str(e)}")
+    
+    return ranged_file_response(request, export_path, etag, f"{download_stem}{suffix}", writer_cls.media_type)
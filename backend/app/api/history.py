@@ -1,48 +1,184 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
-from ..models import ClassificationHistory
-from ..schemas import HistoryResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from datetime import datetime
+import base64
+from ..database import get_async_db
+from ..models import ClassificationHistory, ClassificationRow, ClassificationTrace
+from ..schemas import HistoryResponse, ClassificationRowPage, ClassificationRowResponse
+from ..services.http_cache import cached_json
+from ..services.row_store import row_to_result
+from ..services.tracing import load_trace, to_chrome_trace
 
 router = APIRouter()
 
 
+def encode_cursor(history: ClassificationHistory) -> str:
+    """(created_at, id)를 페이지 커서 문자열로 변환"""
+    raw = f"{history.created_at.isoformat()}|{history.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """페이지 커서 문자열을 (created_at, id)로 변환"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, history_id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(history_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="잘못된 페이지 커서입니다.")
+
+
 @router.get("/history", response_model=List[HistoryResponse])
-def get_history(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+async def get_history(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    batch_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     분류 작업 이력 조회
     
+    최신순 정렬이며, 다음 페이지가 있으면 응답 헤더 X-Next-Cursor에
+    커서를 담아 반환 (keyset 페이지네이션, 이력이 많아져도 일정한 속도)
+    
+    응답에 weak ETag를 붙이며, 폴링 시 If-None-Match가 같으면 304 반환
+    
     Args:
-        skip: 건너뛸 레코드 수
+        skip: 건너뛸 레코드 수 (cursor가 없을 때만 사용, 하위 호환용)
         limit: 조회할 최대 레코드 수
+        cursor: 이전 응답의 X-Next-Cursor 값
+        batch_id: 배치 분류 작업 ID (지정 시 해당 배치의 이력만 조회)
     """
-    histories = db.query(ClassificationHistory)\
-        .order_by(ClassificationHistory.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    query = select(ClassificationHistory)
+    if batch_id:
+        query = query.where(ClassificationHistory.batch_id == batch_id)
+    
+    if cursor:
+        created_at, history_id = decode_cursor(cursor)
+        query = query.where(or_(
+            ClassificationHistory.created_at < created_at,
+            and_(
+                ClassificationHistory.created_at == created_at,
+                ClassificationHistory.id < history_id
+            )
+        ))
+    elif skip:
+        query = query.offset(skip)
+    
+    result = await db.execute(
+        query
+        .order_by(ClassificationHistory.created_at.desc(), ClassificationHistory.id.desc())
+        .limit(limit)
+    )
+    histories = result.scalars().all()
     
-    return histories
+    headers = {}
+    if limit and len(histories) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(histories[-1])
+    
+    return cached_json(request, [HistoryResponse.model_validate(h) for h in histories], headers)
 
 
 @router.get("/history/{history_id}", response_model=HistoryResponse)
-def get_history_by_id(
+async def get_history_by_id(
+    request: Request,
     history_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    특정 분류 작업 이력 조회
+    특정 분류 작업 이력 조회 (weak ETag, If-None-Match가 같으면 304)
     """
-    history = db.query(ClassificationHistory)\
-        .filter(ClassificationHistory.id == history_id)\
-        .first()
+    history = await db.get(ClassificationHistory, history_id)
     
     if not history:
         raise HTTPException(status_code=404, detail="이력을 찾을 수 없습니다.")
     
-    return history
+    return cached_json(request, HistoryResponse.model_validate(history))
+
+
+@router.get("/history/{history_id}/rows", response_model=ClassificationRowPage)
+async def get_history_rows(
+    history_id: int,
+    status: Optional[str] = None,
+    q: Optional[str] = None,
+    after: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    분류 작업의 행 단위 결과 조회
+    
+    row_index 순으로 정렬하며, 다음 페이지가 있으면 next_cursor에
+    마지막 row_index를 담아 반환 (다음 요청의 after로 사용)
+    
+    Args:
+        status: 행 상태 필터 (success, failed, empty, reused)
+        q: Issue 텍스트/분류 결과 검색어 (부분 일치)
+        after: 이 row_index 이후의 행부터 조회
+        limit: 조회할 최대 행 수
+    """
+    history = await db.get(ClassificationHistory, history_id)
+    
+    if not history:
+        raise HTTPException(status_code=404, detail="이력을 찾을 수 없습니다.")
+    
+    query = select(ClassificationRow).where(ClassificationRow.history_id == history_id)
+    if status:
+        query = query.where(ClassificationRow.status == status)
+    if q:
+        pattern = f"%{q}%"
+        query = query.where(or_(
+            ClassificationRow.issue_text.like(pattern),
+            ClassificationRow.defect_name.like(pattern),
+            ClassificationRow.equipment_name.like(pattern),
+            ClassificationRow.action_taken.like(pattern)
+        ))
+    
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    
+    if after is not None:
+        query = query.where(ClassificationRow.row_index > after)
+    result = await db.execute(query.order_by(ClassificationRow.row_index).limit(limit))
+    rows = result.scalars().all()
+    
+    items = [
+        ClassificationRowResponse(
+            row_index=row.row_index,
+            issue_hash=row.issue_hash,
+            issue_text=row.issue_text,
+            status=row.status,
+            **row_to_result(row)
+        )
+        for row in rows
+    ]
+    
+    return ClassificationRowPage(
+        items=items,
+        total=total,
+        next_cursor=rows[-1].row_index if len(rows) == limit else None
+    )
+
+
+@router.get("/history/{history_id}/trace")
+async def get_history_trace(
+    history_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    작업 트레이스 조회 (Chrome trace event 포맷)
+
+    응답을 파일로 저장하여 chrome://tracing 또는 ui.perfetto.dev에서 열 수 있음
+    """
+    history = await db.get(ClassificationHistory, history_id)
+    if not history:
+        raise HTTPException(status_code=404, detail="이력을 찾을 수 없습니다.")
+    
+    record = await db.get(ClassificationTrace, history_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="이 작업의 트레이스가 없습니다.")
+    
+    return to_chrome_trace(history_id, load_trace(record))
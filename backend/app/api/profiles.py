@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import Optional
+import asyncio
+
+from ..services.profiling import list_profiles, profile_path, render_profile_text
+
+router = APIRouter()
+
+
+@router.get("/profiles")
+async def get_profiles(history_id: Optional[int] = None):
+    """
+    저장된 요청 프로파일 목록 (최신순)
+    
+    Args:
+        history_id: 지정하면 해당 작업을 처리한 요청의 프로파일만 조회
+    """
+    return await asyncio.to_thread(list_profiles, history_id)
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: str = Query("prof", description="prof (pstats 파일), text (누적 시간순 요약)")
+):
+    """
+    프로파일 다운로드
+    
+    prof는 python -m pstats 또는 snakeviz로 열 수 있음
+    """
+    if format not in ("prof", "text"):
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 포맷입니다: {format} (지원 포맷: prof, text)")
+    
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="프로파일을 찾을 수 없습니다.")
+    
+    if format == "text":
+        return PlainTextResponse(await asyncio.to_thread(render_profile_text, path))
+    return FileResponse(path=str(path), filename=path.name, media_type="application/octet-stream")
@@ -0,0 +1,141 @@
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List
+import asyncio
+import json
+import logging
+
+from ..database import get_async_db
+from ..models import ClassificationHistory
+from ..services.progress import TERMINAL_STATUSES, history_update, progress_broker
+from ..config import settings
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# 더 이상 바뀌지 않는 상태 (DB 확인 대상에서 제외)
+FINAL_STATUSES = TERMINAL_STATUSES + ("missing",)
+
+
+async def load_updates(bind, history_ids: Iterable[int]) -> Dict[int, dict]:
+    """DB 이력의 현재 상태 (없는 ID는 status=missing)"""
+    history_ids = list(history_ids)
+    async with AsyncSession(bind=bind, expire_on_commit=False) as session:
+        result = await session.execute(
+            select(ClassificationHistory).where(ClassificationHistory.id.in_(history_ids))
+        )
+        updates = {history.id: history_update(history) for history in result.scalars()}
+    for history_id in history_ids:
+        updates.setdefault(history_id, {"id": history_id, "status": "missing"})
+    return updates
+
+
+def parse_ids(message: dict) -> List[int]:
+    ids = message.get("ids")
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise ValueError("ids는 정수 목록이어야 합니다.")
+    return ids
+
+
+@router.websocket("/progress/ws")
+async def progress_websocket(websocket: WebSocket, db: AsyncSession = Depends(get_async_db)):
+    """
+    여러 작업의 진행상황을 연결 하나로 받는 WebSocket
+
+    클라이언트 → 서버:
+        {"action": "subscribe", "ids": [1, 2, 3]}
+        {"action": "unsubscribe", "ids": [2]}
+
+    서버 → 클라이언트 (ws_update_interval_ms 동안 모은 변경을 한 메시지로, 이력당 최신 상태 하나):
+        {"type": "updates", "updates": [{"id": 1, "status": "processing", "total": 120, "processed": 40, "failed": 1}, ...]}
+        {"type": "error", "message": "..."}
+
+    구독하면 DB의 현재 상태를 바로 보내고, 이후에는 이 프로세스의 작업 실행 코드가
+    발행한 상태를 전달함. 다른 프로세스(워커)에서 실행 중인 작업은 ws_poll_seconds마다
+    DB에서 확인하여 진행이 있을 때만 보냄
+    """
+    await websocket.accept()
+    bind = db.bind
+    # 연결 동안 요청 세션을 잡아두지 않음 (조회마다 짧은 세션 사용)
+    await db.close()
+
+    subscriber = progress_broker.subscribe()
+    # 이력별 마지막으로 보낸 상태 (DB 조회 결과가 더 오래된 경우 보내지 않기 위해)
+    sent: Dict[int, dict] = {}
+
+    def is_newer(update: dict) -> bool:
+        previous = sent.get(update["id"])
+        if previous is None or previous["status"] in FINAL_STATUSES:
+            return previous != update
+        if update["status"] != previous["status"]:
+            return True
+        return update.get("processed", 0) + update.get("failed", 0) > previous["processed"] + previous["failed"]
+
+    async def receive_commands():
+        while True:
+            text = await websocket.receive_text()
+            try:
+                try:
+                    message = json.loads(text)
+                except json.JSONDecodeError:
+                    raise ValueError("JSON 형식이 아닙니다.")
+                action = message.get("action") if isinstance(message, dict) else None
+                if action not in ("subscribe", "unsubscribe"):
+                    raise ValueError(f"알 수 없는 요청입니다: {action}")
+                ids = parse_ids(message)
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "message": str(e)})
+                continue
+
+            if action == "unsubscribe":
+                subscriber.ids.difference_update(ids)
+                for history_id in ids:
+                    subscriber.pending.pop(history_id, None)
+                    sent.pop(history_id, None)
+                continue
+
+            new_ids = [i for i in ids if i not in subscriber.ids]
+            if len(subscriber.ids) + len(new_ids) > settings.ws_max_subscriptions:
+                await websocket.send_json({
+                    "type": "error",
+                    "message": f"연결당 최대 {settings.ws_max_subscriptions}개 작업까지 구독할 수 있습니다."
+                })
+                continue
+            subscriber.ids.update(new_ids)
+            if new_ids:
+                for update in (await load_updates(bind, new_ids)).values():
+                    subscriber.push(update)
+
+    async def poll_database():
+        while True:
+            await asyncio.sleep(settings.ws_poll_seconds)
+            active = [i for i in subscriber.ids if sent.get(i, {}).get("status") not in FINAL_STATUSES]
+            if not active:
+                continue
+            for update in (await load_updates(bind, active)).values():
+                if is_newer(update):
+                    subscriber.push(update)
+
+    async def send_updates():
+        interval = settings.ws_update_interval_ms / 1000
+        while True:
+            batch = [u for u in await subscriber.next_batch(interval) if u["id"] in subscriber.ids]
+            batch = [u for u in batch if u["id"] not in sent or is_newer(u)]
+            if not batch:
+                continue
+            for update in batch:
+                sent[update["id"]] = update
+            await websocket.send_json({"type": "updates", "updates": batch})
+
+    tasks = [asyncio.create_task(coro) for coro in (receive_commands(), poll_database(), send_updates())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.warning("진행상황 WebSocket 오류: %s", error)
+    finally:
+        for task in tasks:
+            task.cancel()
+        progress_broker.unsubscribe(subscriber)
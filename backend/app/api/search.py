@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from ..database import get_db
+from ..schemas import SearchResponse
+from ..services.search import search_rows
+
+router = APIRouter()
+
+
+@router.get("/search", response_model=SearchResponse)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    history_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    과거 Issue 및 분류 결과 전문 검색
+    
+    Issue 내용, 불량명, 설비명, 조치내용에서 검색어를 모두 포함하는 행을
+    관련도순으로 반환. 각 결과의 history_id, row_index로
+    /history/{history_id}/rows 에서 해당 행을 찾을 수 있음
+    
+    Args:
+        q: 검색어 (공백으로 구분된 여러 단어는 모두 포함)
+        page: 페이지 번호 (1부터)
+        limit: 페이지당 결과 수
+        history_id: 특정 작업 내에서만 검색
+    """
+    total, items = search_rows(db, q, limit=limit, offset=(page - 1) * limit, history_id=history_id)
+    return SearchResponse(items=items, total=total, page=page, limit=limit)
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models import UserSettings
 from ..schemas import SettingsUpdate, SettingsResponse
 from ..config import settings as app_settings
-import requests
+from ..services.http_cache import cached_json
 
 router = APIRouter()
 
@@ -17,6 +17,8 @@ async def check_available_models(
     """
     제공된 Base URL과 API Key로 모델 목록을 조회합니다.
     """
+    import requests
+    
     try:
         # 마지막 슬래시 제거
         if base_url.endswith("/"):
@@ -40,9 +42,9 @@ async def check_available_models(
 
 
 @router.get("/settings", response_model=SettingsResponse)
-def get_settings(db: Session = Depends(get_db)):
+def get_settings(request: Request, db: Session = Depends(get_db)):
     """
-    현재 사용자 설정 조회
+    현재 사용자 설정 조회 (weak ETag, If-None-Match가 같으면 304)
     """
     # 첫 번째 설정 레코드 조회 (단일 사용자 가정)
     user_settings = db.query(UserSettings).first()
@@ -62,7 +64,7 @@ def get_settings(db: Session = Depends(get_db)):
         db.commit()
         db.refresh(user_settings)
     
-    return user_settings
+    return cached_json(request, SettingsResponse.model_validate(user_settings))
 
 
 @router.put("/settings", response_model=SettingsResponse)
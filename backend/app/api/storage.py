@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+import logging
+
+from ..database import get_db
+from ..services.storage import run_storage_sweep, storage_usage
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/storage")
+def get_storage_usage(db: Session = Depends(get_db)):
+    """
+    업로드/결과 디렉토리 사용량과 보관 정책 조회
+    """
+    return storage_usage(db)
+
+
+@router.post("/storage/sweep")
+def sweep_storage(dry_run: bool = False, db: Session = Depends(get_db)):
+    """
+    저장소 정리 즉시 실행
+    
+    Args:
+        dry_run: True면 삭제하지 않고 정리 대상만 계산
+    """
+    try:
+        return run_storage_sweep(db, dry_run=dry_run)
+    except Exception as e:
+        logger.error(f"저장소 정리 실패: {e}")
+        raise HTTPException(status_code=500, detail=f"저장소 정리 중 오류가 발생했습니다: {str(e)}")
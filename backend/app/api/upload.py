@@ -1,27 +1,58 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, FastAPI, Request
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import List
+import asyncio
 from ..config import settings
-from ..schemas import FileUploadResponse
+from ..schemas import FileUploadResponse, BatchUploadResponse, BatchUploadError
 from ..services.file_processor import (
     is_allowed_file,
+    is_archive_file,
     save_upload_file,
     create_unique_filename,
+    extract_archive,
+    UploadTooLargeError,
 )
 from ..core.preprocessor import run_preprocessing_pipeline
+from ..services.metrics import stage_timer
 
 router = APIRouter()
 
 
+def create_preprocess_pool() -> ProcessPoolExecutor:
+    """전처리 프로세스 풀 (프로세스는 작업이 들어올 때 최대 preprocess_workers개까지 생성)"""
+    return ProcessPoolExecutor(max_workers=max(1, settings.preprocess_workers))
+
+
+def get_preprocess_pool(app: FastAPI) -> ProcessPoolExecutor:
+    """
+    앱 공용 전처리 프로세스 풀 (lifespan에서 생성/종료)
+
+    동시 배치 업로드도 같은 풀을 쓰므로 워커 프로세스 수는 preprocess_workers로 제한됨.
+    lifespan 없이 실행한 앱(테스트 등)은 처음 사용할 때 만들고,
+    워커 프로세스가 죽어 풀이 깨지면 새로 만듦
+    """
+    pool = getattr(app.state, "preprocess_pool", None)
+    if pool is None or getattr(pool, "_broken", False):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        pool = app.state.preprocess_pool = create_preprocess_pool()
+    return pool
+
+
 @router.post("/upload", response_model=FileUploadResponse)
 async def upload_file(
     file: UploadFile = File(...),
     sheet_name: str = Form(None),
     column_name: str = Form(None),
+    preprocess: bool = Form(True),
 ):
     """
     파일 업로드 엔드포인트
 
     엑셀 또는 PPTX 파일을 업로드하여 임시 저장
+    preprocess=false 이면 전처리 없이 원본만 저장 (/classify/pipeline 에서 전처리와 분류를 함께 수행)
     """
     # 파일 확장자 검증
     if not is_allowed_file(file.filename):
@@ -36,7 +67,15 @@ async def upload_file(
 
     try:
         # 파일 저장
-        await save_upload_file(file, file_path)
+        with stage_timer("upload"):
+            await save_upload_file(file, file_path, max_size=settings.max_upload_size)
+
+        if not preprocess:
+            return FileUploadResponse(
+                filename=file.filename,
+                file_path=str(file_path),
+                message="파일이 성공적으로 업로드되었습니다.",
+            )
 
         # 전처리 파이프라인 실행
         # settings값 대신 request param 사용
@@ -49,7 +88,107 @@ async def upload_file(
             file_path=str(processed_path),  # 처리된 파일 경로 반환
             message="파일이 성공적으로 업로드 및 전처리되었습니다.",
         )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"파일 업로드 중 오류가 발생했습니다: {str(e)}"
         )
+
+
+@router.post("/upload/batch", response_model=BatchUploadResponse)
+async def upload_files_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    sheet_name: str = Form(None),
+    column_name: str = Form(None),
+):
+    """
+    배치 업로드 엔드포인트
+
+    여러 엑셀 파일 또는 ZIP 파일을 업로드하여
+    전처리 파이프라인을 앱 공용 프로세스 풀에서 병렬로 실행
+    (파일 하나와 ZIP 압축 해제 결과는 max_upload_size, ZIP 항목 수는 max_archive_members로 제한)
+    """
+    for file in files:
+        if not (is_allowed_file(file.filename) or is_archive_file(file.filename)):
+            raise HTTPException(
+                status_code=400,
+                detail=f"허용되지 않는 파일 형식입니다: {file.filename} (허용 형식: .xlsx, .xls, .pptx, .xlsb, .zip)",
+            )
+
+    upload_dir = Path(settings.upload_dir)
+    saved = []  # (원본 파일명, 저장 경로)
+
+    try:
+        for file in files:
+            file_path = create_unique_filename(file.filename, upload_dir)
+            with stage_timer("upload"):
+                await save_upload_file(file, file_path, max_size=settings.max_upload_size)
+
+            if is_archive_file(file.filename):
+                # ZIP 내부의 엑셀 파일만 추출 (한도를 넘으면 추출 전에 거부)
+                try:
+                    saved.extend(
+                        extract_archive(
+                            file_path,
+                            upload_dir,
+                            max_total_size=settings.max_upload_size,
+                            max_members=settings.max_archive_members,
+                        )
+                    )
+                finally:
+                    file_path.unlink(missing_ok=True)
+            else:
+                saved.append((file.filename, file_path))
+    except Exception as e:
+        # 이미 저장한 파일은 전처리하지 않으므로 정리
+        for _, path in saved:
+            path.unlink(missing_ok=True)
+        if isinstance(e, UploadTooLargeError):
+            raise HTTPException(status_code=413, detail=str(e))
+        raise HTTPException(
+            status_code=500, detail=f"파일 업로드 중 오류가 발생했습니다: {str(e)}"
+        )
+
+    if not saved:
+        raise HTTPException(status_code=400, detail="처리할 엑셀 파일이 없습니다.")
+
+    # 전처리 파이프라인 병렬 실행 (CPU 작업이므로 앱 공용 프로세스 풀 사용)
+    loop = asyncio.get_running_loop()
+    pool = get_preprocess_pool(request.app)
+    outcomes = await asyncio.gather(
+        *[
+            loop.run_in_executor(
+                pool,
+                partial(
+                    run_preprocessing_pipeline,
+                    file_path,
+                    sheet_name=sheet_name,
+                    column_name=column_name,
+                ),
+            )
+            for _, file_path in saved
+        ],
+        return_exceptions=True,
+    )
+
+    uploaded = []
+    errors = []
+    for (filename, _), outcome in zip(saved, outcomes):
+        if isinstance(outcome, Exception):
+            errors.append(BatchUploadError(filename=filename, message=str(outcome)))
+        else:
+            uploaded.append(
+                FileUploadResponse(
+                    filename=filename,
+                    file_path=str(outcome),
+                    message="파일이 성공적으로 업로드 및 전처리되었습니다.",
+                )
+            )
+
+    return BatchUploadResponse(
+        files=uploaded,
+        errors=errors,
+        message=f"{len(uploaded)}개 파일 전처리 완료, {len(errors)}개 실패",
+    )
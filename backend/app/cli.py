@@ -0,0 +1,283 @@
+"""
+명령줄 도구
+
+디렉토리의 엑셀 파일을 HTTP API 없이 일괄 분류합니다 (과거 일보 백필용).
+API와 같은 전처리 → 분류 → 결과 파일/행 단위 결과/이력 저장을 수행하므로
+결과는 웹 화면의 이력, 검색, 분석에서 그대로 조회됩니다.
+이미 같은 내용의 파일을 같은 시트/컬럼으로 분류 완료했다면 건너뜁니다.
+
+사용법:
+    python -m app.cli classify /data/reports_2024
+    python -m app.cli classify /data/reports_2024 --recursive --file-concurrency 4 --row-concurrency 16
+    python -m app.cli classify /data/reports_2024 --force          # 완료된 파일도 다시 분류
+    python -m app.cli classify /data/reports_2024 --incremental    # 같은 시트의 최근 작업 결과 재사용
+"""
+
+import argparse
+import asyncio
+import logging
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from .api.classification import require_user_settings, resolve_baseline, run_classification
+from .config import settings, ensure_directories
+from .core.preprocessor import run_preprocessing_pipeline
+from .database import AsyncSessionLocal, init_db
+from .models import ClassificationHistory, UserSettings
+from .schemas import ClassificationRequest
+from .services.artifact_store import hash_file
+from .services.file_processor import create_unique_filename, is_report_workbook
+from .services.structured_log import bind_log_context, configure_logging, shutdown_logging
+from .services.tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+
+def find_workbooks(directory: Path, recursive: bool = False) -> List[Path]:
+    """분류 대상 파일 목록"""
+    paths = directory.rglob("*") if recursive else directory.glob("*")
+    return sorted(path for path in paths if path.is_file() and is_report_workbook(path))
+
+
+class BatchClassifier:
+    """
+    파일 단위 / 행 단위 동시 실행으로 디렉토리 일괄 분류
+
+    - 파일 단위: 최대 file_concurrency개 파일을 동시에 처리 (전처리는 프로세스 풀)
+    - 행 단위: 파일마다 최대 row_concurrency개 LLM 호출을 동시에 실행
+    """
+
+    def __init__(
+        self,
+        user_settings: UserSettings,
+        sheet_name: str,
+        column_name: str,
+        prompt: str,
+        file_concurrency: int,
+        row_concurrency: int,
+        preprocess: bool = True,
+        force: bool = False,
+        incremental: bool = False,
+        session_factory=AsyncSessionLocal
+    ):
+        self.user_settings = user_settings
+        self.sheet_name = sheet_name
+        self.column_name = column_name
+        self.prompt = prompt
+        self.file_concurrency = max(1, file_concurrency)
+        self.row_concurrency = max(1, row_concurrency)
+        self.preprocess = preprocess
+        self.force = force
+        self.incremental = incremental
+        self.session_factory = session_factory
+        self.stats = {"files": 0, "completed": 0, "skipped": 0, "failed": 0, "rows": 0, "classified_rows": 0, "failed_rows": 0}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def is_done(self, digest: str) -> bool:
+        """같은 내용의 파일을 같은 시트/컬럼으로 분류 완료한 이력이 있는지"""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(ClassificationHistory.id)
+                .where(
+                    ClassificationHistory.source_sha256 == digest,
+                    ClassificationHistory.sheet_name == self.sheet_name,
+                    ClassificationHistory.column_name == self.column_name,
+                    ClassificationHistory.status == "completed",
+                )
+                .limit(1)
+            )
+            return result.first() is not None
+
+    async def prepare(self, source: Path) -> Path:
+        """업로드 디렉토리로 복사 후 전처리 (원본 디렉토리에는 파일을 만들지 않음)"""
+        upload_path = create_unique_filename(source.name, Path(settings.upload_dir))
+        await asyncio.to_thread(shutil.copyfile, source, upload_path)
+        if not self.preprocess:
+            return upload_path
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool,
+            partial(run_preprocessing_pipeline, upload_path, sheet_name=self.sheet_name, column_name=self.column_name)
+        )
+
+    async def classify_file(self, source: Path) -> Dict:
+        """
+        파일 하나 분류 (이력을 만든 뒤 API/워커와 같은 run_classification으로 처리)
+
+        Returns:
+            {"status": completed/skipped/failed, "rows": .., "message": ..}
+        """
+        digest, _ = await asyncio.to_thread(hash_file, source)
+        if not self.force and await self.is_done(digest):
+            return {"status": "skipped", "rows": 0, "message": "이미 분류 완료"}
+
+        try:
+            file_path = await self.prepare(source)
+        except Exception as e:
+            return {"status": "failed", "rows": 0, "message": f"전처리 실패: {e}"}
+
+        request = ClassificationRequest(
+            file_path=str(file_path),
+            sheet_name=self.sheet_name,
+            column_name=self.column_name,
+            prompt=self.prompt,
+            incremental=self.incremental
+        )
+        async with self.session_factory() as db:
+            baseline = await resolve_baseline(db, request)
+            history = ClassificationHistory(
+                filename=file_path.name,
+                file_path=str(file_path),
+                sheet_name=self.sheet_name,
+                column_name=self.column_name,
+                baseline_history_id=baseline.id if baseline else None,
+                source_sha256=digest,
+                status="processing"
+            )
+            db.add(history)
+            await db.commit()
+            await db.refresh(history)
+            bind_log_context(history_id=history.id, job="cli")
+
+            # API/워커와 같은 작업 본문 (결과 파일, 행 단위 결과, 이력, 아티팩트, 트레이스)
+            try:
+                response = await run_classification(
+                    db, history, request, self.user_settings, baseline, start_trace("cli"),
+                    concurrency=self.row_concurrency
+                )
+            except Exception as e:
+                return {"status": "failed", "rows": 0, "message": str(e)}
+
+        self.stats["rows"] += response.total_rows
+        self.stats["classified_rows"] += response.processed_rows
+        self.stats["failed_rows"] += response.failed_rows
+        return {
+            "status": "completed",
+            "rows": response.total_rows,
+            "message": f"성공: {response.processed_rows}, 실패: {response.failed_rows}",
+        }
+
+    async def run(self, paths: List[Path], out=sys.stdout) -> Dict:
+        """파일 목록 분류 후 통계 반환 (파일마다 한 줄씩 진행상황 출력)"""
+        semaphore = asyncio.Semaphore(self.file_concurrency)
+        done = 0
+        start = time.perf_counter()
+
+        async def run_one(path: Path) -> None:
+            nonlocal done
+            async with semaphore:
+                file_start = time.perf_counter()
+                outcome = await self.classify_file(path)
+            done += 1
+            self.stats[outcome["status"]] += 1
+            print(
+                f"[{done}/{len(paths)}] {path.name}: {outcome['status']} "
+                f"({outcome['message']}, {time.perf_counter() - file_start:.1f}s)",
+                file=out, flush=True
+            )
+
+        self.stats["files"] = len(paths)
+        workers = self.file_concurrency if self.preprocess else 0
+        self._pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+        try:
+            await asyncio.gather(*(run_one(path) for path in paths))
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+        self.stats["elapsed_seconds"] = round(time.perf_counter() - start, 2)
+        return self.stats
+
+
+def print_summary(stats: Dict, out=sys.stdout) -> None:
+    """처리량 요약 출력"""
+    elapsed = max(stats["elapsed_seconds"], 1e-9)
+    print("", file=out)
+    print(
+        f"파일 {stats['files']}개: 완료 {stats['completed']}, 건너뜀 {stats['skipped']}, 실패 {stats['failed']}",
+        file=out
+    )
+    print(
+        f"행 {stats['rows']}개: 분류 성공 {stats['classified_rows']}, 분류 실패 {stats['failed_rows']}",
+        file=out
+    )
+    print(
+        f"소요 시간 {stats['elapsed_seconds']:.1f}s / 처리량 {stats['rows'] / elapsed:.1f} rows/s, "
+        f"{stats['completed'] * 60 / elapsed:.1f} files/min",
+        file=out
+    )
+
+
+async def classify_directory(args) -> int:
+    directory = Path(args.directory)
+    if not directory.is_dir():
+        print(f"디렉토리를 찾을 수 없습니다: {directory}", file=sys.stderr)
+        return 2
+
+    paths = find_workbooks(directory, recursive=args.recursive)
+    if not paths:
+        print("분류할 엑셀 파일이 없습니다.", file=sys.stderr)
+        return 1
+
+    async with AsyncSessionLocal() as db:
+        try:
+            user_settings = await require_user_settings(db)
+        except HTTPException as e:
+            print(e.detail, file=sys.stderr)
+            return 2
+
+    runner = BatchClassifier(
+        user_settings,
+        sheet_name=args.sheet or user_settings.sheet_name or settings.default_sheet_name,
+        column_name=args.column or user_settings.column_name or settings.default_column_name,
+        prompt=args.prompt or user_settings.prompt or settings.default_prompt,
+        file_concurrency=args.file_concurrency,
+        row_concurrency=args.row_concurrency,
+        preprocess=not args.no_preprocess,
+        force=args.force,
+        incremental=args.incremental
+    )
+    stats = await runner.run(paths)
+    print_summary(stats)
+    return 1 if stats["failed"] else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description='일보 자동 분류 명령줄 도구')
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    classify = subparsers.add_parser("classify", help="디렉토리의 엑셀 파일 일괄 분류")
+    classify.add_argument("directory", help="엑셀 파일(.xlsx, .xlsb)이 있는 디렉토리")
+    classify.add_argument("--recursive", action="store_true", help="하위 디렉토리 포함")
+    classify.add_argument("--sheet", help="시트 이름 (기본값: 사용자 설정)")
+    classify.add_argument("--column", help="Issue 컬럼 이름 (기본값: 사용자 설정)")
+    classify.add_argument("--prompt", help="분류 프롬프트 (기본값: 사용자 설정)")
+    classify.add_argument("--file-concurrency", type=int, default=settings.preprocess_workers,
+                          help=f"동시에 처리할 파일 수 (기본값: {settings.preprocess_workers})")
+    classify.add_argument("--row-concurrency", type=int, default=settings.llm_concurrency,
+                          help=f"파일당 동시 LLM 호출 수 (기본값: {settings.llm_concurrency})")
+    classify.add_argument("--no-preprocess", action="store_true", help="전처리 없이 원본 파일 그대로 분류")
+    classify.add_argument("--force", action="store_true", help="이미 분류 완료한 파일도 다시 분류")
+    classify.add_argument("--incremental", action="store_true",
+                          help="같은 시트/컬럼의 최근 완료 작업과 같은 행은 결과 재사용 (API의 incremental과 동일)")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    ensure_directories()
+    init_db()
+    try:
+        return asyncio.run(classify_directory(args))
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,11 +9,92 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./data/app.db"
+    sqlite_busy_timeout_ms: int = 5000  # 잠금 대기 시간
+    sqlite_cache_size_kb: int = 20000  # 페이지 캐시 크기
+    sqlite_mmap_size: int = 268435456  # 256MB
+    row_insert_batch_size: int = 1000  # 행 단위 결과 executemany 배치 크기
+    progress_commit_rows: int = 50  # 진행상황을 DB에 기록하는 최소 행 간격
+    progress_commit_interval_ms: int = 1000  # 진행상황을 DB에 기록하는 최소 시간 간격
+    stream_event_interval_ms: int = 250  # SSE progress 이벤트로 행 결과를 묶는 시간 간격
+    stream_heartbeat_seconds: float = 15.0  # 이벤트가 없을 때 연결 유지 주석 전송 간격
+    stream_retention_seconds: int = 300  # 끝난 작업의 이벤트를 재연결용으로 보관하는 시간
+    ws_update_interval_ms: int = 250  # WebSocket 진행상황을 모아서 보내는 간격
+    ws_poll_seconds: float = 2.0  # 다른 프로세스(워커)에서 실행 중인 작업의 DB 확인 간격
+    ws_max_subscriptions: int = 500  # WebSocket 연결당 최대 구독 작업 수
+    
+    # Logging (큐 + 백그라운드 리스너 스레드, 한 줄 JSON)
+    log_level: str = "INFO"
+    log_format: str = "json"  # json | text
+    log_row_sample_every: int = 100  # 행 단위 INFO 로그를 N건 중 1건만 기록 (1이면 전체, 0이면 미기록)
+    log_queue_size: int = 10000  # 로그 큐 크기 (가득 차면 버림, 0이면 무제한)
+    
+    # Job trace
+    trace_enabled: bool = True  # 작업별 span 트레이스 저장
+    trace_max_spans: int = 50000  # 작업당 최대 span 수 (초과분은 버림)
+    
+    # Request profiling (X-Profile: 1 헤더 또는 ?profile=1 요청만 측정)
+    profiling_enabled: bool = False  # False면 미들웨어를 추가하지 않음
+    profiles_dir: str = "/app/data/profiles"
+    profile_keep: int = 100  # 보관할 최근 프로파일 수
+    
+    # Response compression (brotli 우선, 없으면 gzip / SSE, xlsx 등 이미 압축된 형식 제외)
+    compression_minimum_size: int = 1024  # 이보다 작은 응답은 압축하지 않음 (bytes)
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4  # 동적 응답용 (높을수록 느림, 최대 11)
     
     # File Upload
     upload_dir: str = "/app/data/uploads"
     results_dir: str = "/app/data/results"
-    max_upload_size: int = 52428800  # 50MB
+    max_upload_size: int = 52428800  # 50MB (업로드 파일 하나, ZIP은 압축 해제 후 전체 크기)
+    max_archive_members: int = 500  # ZIP 하나에 들어있을 수 있는 최대 항목 수
+    analytics_dir: str = "/app/data/analytics"  # 분류 행 Parquet 저장소 (날짜별 파티션)
+    artifacts_dir: str = "/app/data/artifacts"  # 내용 해시 기반 원본/결과 파일 저장소
+    artifact_compress_after_days: int = 7  # 마지막 사용 후 zstd 압축까지 일수 (0이면 미압축)
+    artifact_compression_level: int = 10
+    
+    # Storage lifecycle
+    retention_days: int = 30  # 보관 기간 (0이면 미적용)
+    storage_quota_mb: int = 0  # 업로드/결과 디렉토리 용량 한도 (0이면 미적용)
+    orphan_grace_hours: int = 24  # 이력이 참조하지 않는 파일을 남겨두는 시간
+    storage_sweep_interval_minutes: int = 60  # 앱 내 주기적 정리 간격 (0이면 미실행)
+    storage_sweep_workers: int = 4  # 디렉토리 병렬 스캔 스레드 수
+    
+    # Batch processing
+    preprocess_workers: int = 4  # 전처리 병렬 프로세스 수
+    llm_concurrency: int = 8  # 동시 LLM 호출 수
+    pipeline_queue_size: int = 32  # 전처리 → 분류 파이프라인 큐 크기
+    
+    # Issue text normalization (LLM 호출 전 공백/중복 줄/상용구 정리, 중복 제거/재사용 키)
+    issue_normalize: bool = True
+    issue_boilerplate_pattern: str = ""  # 줄에서 제거할 정규식 (여러 패턴은 | 로 연결)
+    issue_token_budget: int = 512  # Issue 하나의 최대 추정 토큰 수 (넘으면 뒷부분 절단, 0이면 미적용)
+    
+    # Model cascade (저렴한 모델부터 시도, 사용자 설정 모델이 마지막 단계)
+    llm_cascade_models: str = ""  # 먼저 시도할 모델 (쉼표로 구분, 저렴한 순서, 비어있으면 미사용)
+    llm_cascade_confidence: float = 0.7  # 중간 단계 결과를 채택하는 최소 자체 신뢰도 (0~1)
+    llm_model_prices: str = ""  # 모델별 1M 토큰당 단가 USD ("local-7b=0,gpt-4o-mini=0.6", 비용 집계용)
+    
+    # Worker (python -m app.worker)
+    worker_concurrency: int = 2  # 워커 프로세스 하나가 동시에 실행하는 작업 수
+    worker_poll_interval_seconds: float = 2.0  # 대기 작업이 없을 때 조회 간격
+    job_lease_seconds: int = 60  # 임대 만료 시간 (heartbeat가 없으면 다른 워커가 가져감)
+    job_heartbeat_seconds: int = 15  # 임대 연장 간격
+    job_max_attempts: int = 3  # 임대 횟수가 이를 넘으면 실패 처리 (워커가 반복해서 죽는 작업)
+    
+    # Drop folder watcher (python -m app.watcher)
+    watch_dirs: str = ""  # 감시할 폴더 (쉼표로 구분)
+    watch_recursive: bool = False  # 하위 폴더 포함
+    watch_settle_seconds: float = 10.0  # 크기/수정시각이 이 시간 동안 그대로면 쓰기 완료로 판단
+    watch_force_polling: bool = False  # inotify를 쓸 수 없는 경로(네트워크 공유 폴더 등)에서 polling 사용
+    watch_poll_interval_seconds: float = 5.0  # polling 간격
+    
+    # Result file
+    # openpyxl: 서식/병합 유지 (전체 로드), streaming: constant_memory (값만 유지)
+    # xml_patch: 시트 XML만 스트리밍으로 수정 (서식/병합 유지, 전체 로드 없음)
+    result_writer: str = "openpyxl"
+    # 분류 중 행 결과를 바로 기록하는 행 단위 결과 파일 포맷 (쉼표로 구분, csv/jsonl/parquet/xlsx_flat)
+    # 목록에 없는 포맷과 이전 작업은 다운로드 시 결과 파일에서 변환
+    result_export_formats: str = "csv,jsonl,parquet"
     
     # OpenAI defaults (can be overridden by user settings)
     openai_api_key: str = ""
@@ -36,6 +117,13 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
-# Create directories if they don't exist
-Path(settings.upload_dir).mkdir(parents=True, exist_ok=True)
-Path(settings.results_dir).mkdir(parents=True, exist_ok=True)
+
+def ensure_directories() -> None:
+    """
+    데이터 디렉토리 생성 (앱 시작 시 lifespan에서 실행)
+    
+    import 시점에는 파일시스템을 건드리지 않으므로 스크립트/테스트에서
+    설정만 읽을 때는 디렉토리가 만들어지지 않음
+    """
+    for directory in (settings.upload_dir, settings.results_dir, settings.analytics_dir, settings.artifacts_dir):
+        Path(directory).mkdir(parents=True, exist_ok=True)
@@ -1,10 +1,21 @@
-import pandas as pd
-import openpyxl
-from openpyxl.utils import range_boundaries
+import logging
+
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from ..services.metrics import stage_timer
+
+if TYPE_CHECKING:
+    # pandas/openpyxl은 import 비용이 커서 실제로 사용하는 함수 안에서 로드
+    import openpyxl
 
+logger = logging.getLogger(__name__)
 
+# 일보 시트의 데이터 시작 행 (3행 헤더, 4행부터 데이터 / 행 단위 결과의 row_index 0)
+DATA_START_ROW = 4
+
+
+@stage_timer("convert_xlsb_to_xlsx")
 def convert_xlsb_to_xlsx(file_path: Path, sheet_name: Optional[str] = None) -> Path:
     """
     1. xlsb -> xlsx 변환
@@ -18,6 +29,8 @@ def convert_xlsb_to_xlsx(file_path: Path, sheet_name: Optional[str] = None) -> P
     # Read xlsb using pandas (requires pyxlsb)
     # sheet_name이 있으면 해당 시트만 읽음, 없으면 첫번째 시트(0)
     # User requested: "xlsb 상태에서 user에게 받은 sheet_name 추출"
+    import pandas as pd
+
     try:
         if sheet_name:
             df = pd.read_excel(file_path, engine="pyxlsb", sheet_name=sheet_name)
@@ -25,7 +38,7 @@ def convert_xlsb_to_xlsx(file_path: Path, sheet_name: Optional[str] = None) -> P
             df = pd.read_excel(file_path, engine="pyxlsb")
     except Exception as e:
         # 시트 찾기 실패 시 등의 에러 처리
-        print(f"Error reading xlsb: {e}")
+        logger.error("xlsb 읽기 실패 (%s): %s", file_path.name, e)
         # 혹시 시트 이름이 달라서 에러나면 기본값(첫번째)으로 시도할지?
         # User implies extracting 'the sheet'. If it fails, we should probably fail or fallback.
         # Fallback to 0 might be safer if name mismatch, but let's stick to explicit first.
@@ -40,120 +53,123 @@ def convert_xlsb_to_xlsx(file_path: Path, sheet_name: Optional[str] = None) -> P
     return new_path
 
 
+@stage_timer("preprocess_structure")
 def preprocess_structure(
-    file_path: Path, sheet_name: Optional[str] = None
-) -> openpyxl.Workbook:
+    file_path: Path, sheet_name: Optional[str] = None, fill_merged: bool = True
+) -> "openpyxl.Workbook":
     """
     2. 구조 전처리: B4부터 시작, 병합 셀 해제 및 값 채우기 (Forward Fill style)
+
+    fill_merged=False면 워크북만 로드하고, 병합 해제는 iter_preprocessed_groups에서
+    시트를 읽어 내려가면서 행 순서대로 진행 (첫 그룹을 시트 전체 처리 전에 넘길 수 있음)
     """
+    import openpyxl
+
     wb = openpyxl.load_workbook(file_path)
     if sheet_name and sheet_name in wb.sheetnames:
         ws = wb[sheet_name]
     else:
         ws = wb.active
 
-    # Start processing from row 4
-    start_row = 4
+    if not fill_merged:
+        return wb
 
     # 1. Unmerge all cells first to handle them individually
     # We need to collect merged ranges first because unmerging modifies the collection
-    merged_ranges = list(ws.merged_cells.ranges)
+    for ranges in collect_merged_ranges(ws).values():
+        for merged_range in ranges:
+            fill_merged_range(ws, merged_range)
+
+    # 2. Also perform visual Forward Fill for empty cells in hierarchical columns if needed?
+    # The requirement says "병합된 셀이 많아... 병합된 셀의 값을 채워야해".
+    # Unmerging and filling top-left value handles the explicit merged cells.
+    # If there are just empty cells that meant "ditto", that's harder to guess without explicit merge.
+    # Assuming "merged cells" was the main issue.
+
+    return wb
 
-    for merged_range in merged_ranges:
-        # Get boundaries
-        min_col, min_row, max_col, max_row = range_boundaries(str(merged_range))
 
+def collect_merged_ranges(ws, start_row: int = DATA_START_ROW) -> Dict[int, List[str]]:
+    """
+    데이터 영역(start_row 이후)에 걸친 병합 범위를 데이터 영역의 첫 행 기준으로 모음
+    """
+    from openpyxl.utils import range_boundaries
+
+    merged_by_row: Dict[int, List[str]] = {}
+    for merged_range in ws.merged_cells.ranges:
+        _, min_row, _, max_row = range_boundaries(str(merged_range))
         # Only process if it affects our area of interest (Row >= 4)
         if max_row < start_row:
             continue
+        merged_by_row.setdefault(max(min_row, start_row), []).append(str(merged_range))
+    return merged_by_row
 
-        # Get the value of the top-left cell
-        top_left_value = ws.cell(row=min_row, column=min_col).value
 
-        # Unmerge
-        ws.unmerge_cells(str(merged_range))
+def fill_merged_range(ws, merged_range: str, start_row: int = DATA_START_ROW) -> None:
+    """
+    병합 해제 후 데이터 영역의 셀을 왼쪽 위 셀 값으로 채움
+    """
+    from openpyxl.utils import range_boundaries
 
-        # Fill all cells in the range with the top-left value
-        for row in range(min_row, max_row + 1):
-            for col in range(min_col, max_col + 1):
-                if row >= start_row:  # Valid data area
-                    cell = ws.cell(row=row, column=col)
-                    cell.value = top_left_value
+    min_col, min_row, max_col, max_row = range_boundaries(merged_range)
 
-    # 2. Also perform visual Forward Fill for empty cells in hierarchical columns if needed?
-    # The requirement says "병합된 셀이 많아... 병합된 셀의 값을 채워야해".
-    # Unmerging and filling top-left value handles the explicit merged cells.
-    # If there are just empty cells that meant "ditto", that's harder to guess without explicit merge.
-    # Assuming "merged cells" was the main issue.
+    # Get the value of the top-left cell
+    top_left_value = ws.cell(row=min_row, column=min_col).value
 
-    return wb
+    ws.unmerge_cells(merged_range)
 
+    # Fill all cells in the range with the top-left value
+    for row in range(max(min_row, start_row), max_row + 1):
+        for col in range(min_col, max_col + 1):
+            ws.cell(row=row, column=col).value = top_left_value
 
-def consolidate_issue_column(
-    wb: openpyxl.Workbook, sheet_name: Optional[str], issue_col_name: str = "Issue"
-) -> Path:
+
+def find_issue_column(ws, issue_col_name: str = "Issue") -> Optional[int]:
     """
-    3. Issue 컬럼 병합 처리
-    - Issue 컬럼을 찾아서
-    - 여러 행/열에 걸친 텍스트를 병합 (\n, space 구분)
-    - 실제 셀도 병합
+    헤더 행(3행)에서 Issue 컬럼 인덱스 검색
     """
-    if sheet_name and sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-    else:
-        ws = wb.active
-
     # Find Issue column index (assuming row 3 or 4 has headers, let's search in start_row - 1 or start_row)
     # Based on prev requirement "4B에서 테이블이 시작해" -> Row 4, Col 2 is start of data? Or Headers at row 3?
     # Let's assume headers are at row 3 (if data starts row 4).
     header_row = 3
-    issue_col_idx = None
 
     for cell in ws[header_row]:
         if cell.value and str(cell.value).strip() == issue_col_name:
-            issue_col_idx = cell.column
-            break
+            return cell.column
+    return None
 
-    if not issue_col_idx:
-        # Fallback: Search typical "Issue" column or return as is
-        print("Issue column not found")
-        return wb
 
+def iter_issue_groups(
+    ws, issue_col_idx: int, merged_by_row: Optional[Dict[int, List[str]]] = None
+) -> Iterator[dict]:
+    """
+    Issue 그룹을 순서대로 생성 (Generator)
+
+    Issue 컬럼 왼쪽의 키 컬럼(B ~ Issue 직전) 값이 같은 연속 행을 하나의 그룹으로 묶고,
+    그룹이 끝나는 즉시 {"start_row", "end_row", "key", "text"}를 yield.
+    merged_by_row(collect_merged_ranges 결과)가 있으면 각 행을 읽기 직전에
+    그 행에서 시작하는 병합 범위를 해제하고 값을 채움
+    """
     # Logic to identify "groups" of issues.
     # Requirement: "Issue 칸에 있는 여러 셀... 모델 칸과 같은데 실제론 여러 셀... 순서대로 병합"
     # This implies the "Model" column (or the primary key column) drives the grouping.
     # If Model is merged (and we unmerged/filled it in step 2), then we can group by Model.
-
-    # We need to find the "Model" column or a grouping key.
-    # Or, purely look at Issue column?
-    # "눈으로 보면 모델 칸과 같은데" means the visual height of the Issue cell matches the Model cell (which was merged).
     # Since we successfully propagated the Model value in Step 2, standard rows now have the same Model value.
     # So we can group consecutive rows that have the SAME Model value (and same Layer etc).
 
-    # 1. Identify distinct groups based on key columns (Layer, Model etc to the left of Issue).
-    # Assuming columns before Issue are keys.
-
     max_row = ws.max_row
     current_group_key = None
     current_group_rows = []
 
-    # Collect data to process
-    # We will modify sheet in-place, so maybe iterate first to calculate merges, then apply.
-
-    # It's Complex to do in-place while iterating.
-    # Strategy:
-    # 1. Iterate rows 4 to Max.
-    # 2. Build a key from columns 2 to Issue_Col-1.
-    # 3. If key changes, finalize previous group.
-
     # Note: Column 2 (B) is start.
     cols_check = list(range(2, issue_col_idx))  # Columns B to right before Issue
 
-    merged_regions = []  # (start_row, end_row, merged_text)
-
-    for row in range(4, max_row + 2):  # +2 to ensure flush of last group
+    for row in range(DATA_START_ROW, max_row + 2):  # +2 to ensure flush of last group
         # Get Key
         if row <= max_row:
+            if merged_by_row:
+                for merged_range in merged_by_row.pop(row, ()):
+                    fill_merged_range(ws, merged_range)
             key_values = [ws.cell(row=row, column=c).value for c in cols_check]
             key = tuple(key_values)
         else:
@@ -169,17 +185,12 @@ def consolidate_issue_column(
                     if cell_val:
                         text_parts.append(str(cell_val).strip())
 
-                full_text = "\n".join(text_parts)
-
-                # Record merge action
-                if len(current_group_rows) > 0:
-                    merged_regions.append(
-                        {
-                            "start_row": current_group_rows[0],
-                            "end_row": current_group_rows[-1],
-                            "text": full_text,
-                        }
-                    )
+                yield {
+                    "start_row": current_group_rows[0],
+                    "end_row": current_group_rows[-1],
+                    "key": current_group_key,
+                    "text": "\n".join(text_parts),
+                }
 
             # Start new group
             current_group_key = key
@@ -187,31 +198,93 @@ def consolidate_issue_column(
         else:
             current_group_rows.append(row)
 
-    # Apply merges
-    api_alignment = openpyxl.styles.Alignment(wrap_text=True, vertical="center")
+
+def merge_issue_group(ws, issue_col_idx: int, group: dict) -> None:
+    """
+    Issue 그룹의 텍스트를 첫 셀에 쓰고 실제 셀도 병합
+    """
+    from openpyxl.styles import Alignment
+
+    s = group["start_row"]
+    e = group["end_row"]
+
+    # Set text to top-left
+    main_cell = ws.cell(row=s, column=issue_col_idx)
+    main_cell.value = group["text"]
+    main_cell.alignment = Alignment(wrap_text=True, vertical="center")
+
+    # Merge if multiple rows
+    if e > s:
+        ws.merge_cells(
+            start_row=s,
+            start_column=issue_col_idx,
+            end_row=e,
+            end_column=issue_col_idx,
+        )
+
+
+@stage_timer("consolidate_issue_column")
+def consolidate_issue_column(
+    wb: "openpyxl.Workbook", sheet_name: Optional[str], issue_col_name: str = "Issue"
+) -> Path:
+    """
+    3. Issue 컬럼 병합 처리
+    - Issue 컬럼을 찾아서
+    - 여러 행/열에 걸친 텍스트를 병합 (\n, space 구분)
+    - 실제 셀도 병합
+    """
+    if sheet_name and sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+    else:
+        ws = wb.active
+
+    issue_col_idx = find_issue_column(ws, issue_col_name)
+
+    if not issue_col_idx:
+        # Fallback: Search typical "Issue" column or return as is
+        logger.warning("Issue 컬럼을 찾을 수 없습니다: %s", issue_col_name)
+        return wb
+
+    # 그룹을 모두 계산한 뒤 병합 적용 (iterating 중 시트를 바꾸지 않도록)
+    merged_regions = list(iter_issue_groups(ws, issue_col_idx))
 
     for region in merged_regions:
-        s = region["start_row"]
-        e = region["end_row"]
-        txt = region["text"]
-
-        # Set text to top-left
-        main_cell = ws.cell(row=s, column=issue_col_idx)
-        main_cell.value = txt
-        main_cell.alignment = api_alignment
-
-        # Merge if multiple rows
-        if e > s:
-            ws.merge_cells(
-                start_row=s,
-                start_column=issue_col_idx,
-                end_row=e,
-                end_column=issue_col_idx,
-            )
+        merge_issue_group(ws, issue_col_idx, region)
 
     return wb
 
 
+def iter_preprocessed_groups(
+    wb: "openpyxl.Workbook",
+    sheet_name: Optional[str],
+    issue_col_name: str = "Issue",
+    fill_merged: bool = False
+) -> Iterator[dict]:
+    """
+    구조 전처리된 워크북에서 Issue 그룹을 병합하면서 하나씩 yield (Generator)
+
+    consolidate_issue_column과 같은 결과를 만들지만, 전체 시트를 다 처리하기 전에
+    그룹 단위로 후속 단계(LLM 분류)에 넘길 수 있음.
+    fill_merged=True면 preprocess_structure(fill_merged=False)로 로드한 워크북의
+    병합 해제/값 채우기도 시트를 읽어 내려가면서 같이 진행
+    """
+    if sheet_name and sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+    else:
+        ws = wb.active
+
+    issue_col_idx = find_issue_column(ws, issue_col_name)
+    if not issue_col_idx:
+        raise ValueError(f"Column '{issue_col_name}' not found in header row")
+
+    # 그룹이 확정된 뒤에는 해당 행을 다시 읽지 않으므로 즉시 병합해도 안전
+    # (그룹 다음 행까지의 원래 병합 범위는 이미 해제된 상태)
+    merged_by_row = collect_merged_ranges(ws) if fill_merged else None
+    for group in iter_issue_groups(ws, issue_col_idx, merged_by_row):
+        merge_issue_group(ws, issue_col_idx, group)
+        yield group
+
+
 def run_preprocessing_pipeline(
     file_path: Path, sheet_name: Optional[str] = None, column_name: Optional[str] = None
 ) -> Path:
@@ -241,10 +314,10 @@ def run_preprocessing_pipeline(
         wb.save(processed_path)
         wb.close()
 
-        print(f"saved at: {processed_path}")
+        logger.info("전처리 결과 저장: %s", processed_path)
         return processed_path
 
     except Exception as e:
-        print(f"Preprocessing failed: {e}")
+        logger.error("전처리 실패 (%s): %s", file_path.name, e)
         # Return original if fail? Or raise?
         raise e
@@ -1,21 +1,191 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    SQLite 연결마다 PRAGMA 적용
+    
+    - WAL: 읽기와 쓰기가 서로 막지 않음 (진행상황 기록 중에도 이력 조회 가능)
+    - busy_timeout: 다른 연결이 쓰는 중이면 바로 "database is locked"를 내지 않고 대기
+    - synchronous=NORMAL: WAL 모드에서는 안전하면서 fsync 횟수 감소
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.close()
+
+
+def create_db_engine(database_url: str):
+    """DB 엔진 생성 (SQLite면 PRAGMA 튜닝 적용)"""
+    if not database_url.startswith("sqlite"):
+        return create_engine(database_url, pool_pre_ping=True)
+    
+    db_engine = create_engine(
+        database_url,
+        connect_args={
+            "check_same_thread": False,  # Needed for SQLite
+            "timeout": settings.sqlite_busy_timeout_ms / 1000,
+        }
+    )
+    event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+
+def to_async_url(database_url: str) -> str:
+    """동기 DB URL을 asyncio 드라이버 URL로 변환 (sqlite → aiosqlite, postgresql → asyncpg)"""
+    for prefix, async_prefix in (("sqlite://", "sqlite+aiosqlite://"), ("postgresql://", "postgresql+asyncpg://")):
+        if database_url.startswith(prefix):
+            return async_prefix + database_url[len(prefix):]
+    return database_url
+
+
+def create_async_db_engine(database_url: str):
+    """
+    asyncio DB 엔진 생성
+    
+    SQLite는 aiosqlite가 연결마다 별도 스레드에서 쿼리를 실행하므로
+    commit 대기 중에도 이벤트 루프(다른 SSE 스트림)가 멈추지 않음
+    """
+    async_url = to_async_url(database_url)
+    if not async_url.startswith("sqlite"):
+        return create_async_engine(async_url, pool_pre_ping=True)
+    
+    db_engine = create_async_engine(
+        async_url,
+        connect_args={"timeout": settings.sqlite_busy_timeout_ms / 1000}
+    )
+    event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+
 # Create engine
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
-)
+engine = create_db_engine(settings.database_url)
+async_engine = create_async_db_engine(settings.database_url)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# commit 후 속성 접근 시 lazy load(동기 I/O)가 일어나지 않도록 expire_on_commit=False
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Create Base class
 Base = declarative_base()
 
 
+# 행 단위 결과 전문 검색 인덱스 (SQLite FTS5)
+# - trigram 토크나이저: 띄어쓰기/조사와 무관하게 한글 부분 문자열 검색 가능
+# - external content: 텍스트는 classification_rows에만 저장하고 인덱스만 유지
+# - 트리거로 행 INSERT/DELETE 시 인덱스도 함께 갱신 (작업 완료 시 증분 반영)
+SEARCH_INDEX_STATEMENTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS classification_rows_fts USING fts5("
+    "issue_text, defect_name, equipment_name, action_taken, "
+    "content='classification_rows', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS classification_rows_fts_ai AFTER INSERT ON classification_rows BEGIN "
+    "INSERT INTO classification_rows_fts (rowid, issue_text, defect_name, equipment_name, action_taken) "
+    "VALUES (new.id, new.issue_text, new.defect_name, new.equipment_name, new.action_taken); END",
+    "CREATE TRIGGER IF NOT EXISTS classification_rows_fts_ad AFTER DELETE ON classification_rows BEGIN "
+    "INSERT INTO classification_rows_fts (classification_rows_fts, rowid, issue_text, defect_name, equipment_name, action_taken) "
+    "VALUES ('delete', old.id, old.issue_text, old.defect_name, old.equipment_name, old.action_taken); END",
+    "CREATE TRIGGER IF NOT EXISTS classification_rows_fts_au AFTER UPDATE ON classification_rows BEGIN "
+    "INSERT INTO classification_rows_fts (classification_rows_fts, rowid, issue_text, defect_name, equipment_name, action_taken) "
+    "VALUES ('delete', old.id, old.issue_text, old.defect_name, old.equipment_name, old.action_taken); "
+    "INSERT INTO classification_rows_fts (rowid, issue_text, defect_name, equipment_name, action_taken) "
+    "VALUES (new.id, new.issue_text, new.defect_name, new.equipment_name, new.action_taken); END",
+]
+
+
+# 버전별 마이그레이션 (schema_migrations 테이블에 적용 버전 기록, 순서대로 한 번씩 적용)
+# (버전, 적용 대상 dialect (None이면 전체), SQL 목록)
+MIGRATIONS = [
+    (1, None, [
+        # /history 정렬 및 keyset 페이지네이션 (created_at, id)
+        "CREATE INDEX IF NOT EXISTS ix_classification_history_created_at_id "
+        "ON classification_history (created_at, id)",
+        # 상태별 조회 (진행 중 작업, 증분 분류 기준 작업 검색)
+        "CREATE INDEX IF NOT EXISTS ix_classification_history_status_created_at "
+        "ON classification_history (status, created_at)",
+    ]),
+    (2, "sqlite", SEARCH_INDEX_STATEMENTS + [
+        # 기존 행으로 검색 인덱스 채움
+        "INSERT INTO classification_rows_fts (classification_rows_fts) VALUES ('rebuild')",
+    ]),
+]
+
+
+def run_migrations(bind=engine):
+    """아직 적용되지 않은 MIGRATIONS 실행"""
+    with bind.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+        
+        for version, dialect, statements in MIGRATIONS:
+            if version in applied:
+                continue
+            if dialect is None or dialect == bind.dialect.name:
+                for statement in statements:
+                    conn.execute(text(statement))
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {"v": version})
+    
+    if bind.dialect.name == "sqlite":
+        with bind.connect() as conn:
+            conn.execute(text("PRAGMA optimize"))
+
+
+def migrate_schema(bind=engine):
+    """
+    기존 DB에 누락된 컬럼/인덱스 추가 후 버전별 마이그레이션 실행
+    
+    create_all은 새 테이블만 생성하므로, 모델에 추가된 컬럼은
+    ALTER TABLE로 기존 테이블에 보완
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                
+                column_type = column.type.compile(dialect=bind.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if isinstance(default, (int, float)):
+                    ddl += f" DEFAULT {default}"
+                elif isinstance(default, str):
+                    ddl += " DEFAULT '" + default.replace("'", "''") + "'"
+                conn.execute(text(ddl))
+            
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    
+    run_migrations(bind)
+
+
+def init_db(bind=engine):
+    """
+    테이블 생성 후 스키마 마이그레이션 (앱 시작 시 lifespan에서 실행)
+    
+    import 시점에는 DB에 연결하지 않으므로 앱 import가 DB 상태와 무관하게 빠름
+    """
+    from . import models  # 테이블 메타데이터 등록
+    
+    Base.metadata.create_all(bind=bind)
+    migrate_schema(bind)
+
+
 def get_db():
     """Dependency for getting database session"""
     db = SessionLocal()
@@ -23,3 +193,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
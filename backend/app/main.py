@@ -1,16 +1,56 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .api import upload, classification, history, settings
+from .config import settings as app_settings, ensure_directories
+from .database import init_db
+from .api import upload, classification, history, settings, analytics, search, storage, profiles, progress
+from .services.storage import storage_sweep_loop
+from .services.compression import CompressionMiddleware
+from .services.metrics import METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics
+from .services.profiling import ProfilingMiddleware
+from .services.structured_log import configure_logging, shutdown_logging
+
+background_tasks = set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    앱 시작/종료 처리
+    
+    DB 스키마 생성, 디렉토리 생성 등 부수 효과는 import 시점이 아니라 여기서 실행하므로
+    app.main import(테스트 수집, 워커 기동)가 파일시스템/DB 상태와 무관하게 빠름
+    """
+    # 큐 기반 구조화 로깅 시작 (포맷/출력은 백그라운드 리스너 스레드에서)
+    configure_logging()
+    ensure_directories()
+    await asyncio.to_thread(init_db)
+    # 배치 업로드 전처리용 프로세스 풀 (요청마다 만들지 않고 앱 전체에서 공유)
+    app.state.preprocess_pool = upload.create_preprocess_pool()
+    
+    # 저장소 주기적 정리 (STORAGE_SWEEP_INTERVAL_MINUTES=0이면 미실행)
+    if app_settings.storage_sweep_interval_minutes > 0:
+        task = asyncio.create_task(storage_sweep_loop())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+    
+    try:
+        yield
+    finally:
+        for task in list(background_tasks):
+            task.cancel()
+        app.state.preprocess_pool.shutdown(wait=False, cancel_futures=True)
+        # 큐에 남은 로그를 모두 출력한 뒤 리스너 종료
+        shutdown_logging()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="일보 자동 분류 시스템",
     description="LLM을 활용한 일보 자동 분류 API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -20,13 +60,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Content-Range"],
 )
 
+# 응답 압축 (brotli/gzip, 작은 응답과 SSE/xlsx 등은 제외)
+app.add_middleware(CompressionMiddleware)
+
+# 라우트별 HTTP 처리 시간 기록
+app.add_middleware(MetricsMiddleware)
+
+# 요청 단위 프로파일링 (PROFILING_ENABLED일 때만 추가, 꺼져 있으면 부하 없음)
+if app_settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(upload.router, prefix="/api", tags=["Upload"])
 app.include_router(classification.router, prefix="/api", tags=["Classification"])
 app.include_router(history.router, prefix="/api", tags=["History"])
 app.include_router(settings.router, prefix="/api", tags=["Settings"])
+app.include_router(analytics.router, prefix="/api", tags=["Analytics"])
+app.include_router(search.router, prefix="/api", tags=["Search"])
+app.include_router(storage.router, prefix="/api", tags=["Storage"])
+app.include_router(profiles.router, prefix="/api", tags=["Profiles"])
+app.include_router(progress.router, prefix="/api", tags=["Progress"])
 
 
 @app.get("/")
@@ -37,3 +93,9 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 지표 (단계별 소요 시간, HTTP 처리 시간, LLM 호출 수, 작업/큐 게이지)"""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
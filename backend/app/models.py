@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Boolean, Column, Integer, LargeBinary, String, DateTime, Text, ForeignKey, Index, DDL, event
 from datetime import datetime
-from .database import Base
+from .database import Base, SEARCH_INDEX_STATEMENTS
 
 
 class ClassificationHistory(Base):
@@ -8,18 +8,144 @@ class ClassificationHistory(Base):
     __tablename__ = "classification_history"
     
     id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String, nullable=True, index=True)  # 배치 분류 작업 묶음 ID
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     result_path = Column(String, nullable=True)
+    source_artifact_id = Column(Integer, ForeignKey("artifacts.id"), nullable=True)  # 원본 파일 아티팩트
+    result_artifact_id = Column(Integer, ForeignKey("artifacts.id"), nullable=True)  # 결과 파일 아티팩트
     sheet_name = Column(String, nullable=False)
     column_name = Column(String, nullable=False)
-    status = Column(String, default="processing")  # processing, completed, failed
+    status = Column(String, default="processing")  # queued, processing, completed, failed
     total_rows = Column(Integer, default=0)
     processed_rows = Column(Integer, default=0)
     failed_rows = Column(Integer, default=0)
+    baseline_history_id = Column(Integer, nullable=True)  # 증분 분류 기준 작업
+    source_sha256 = Column(String(64), nullable=True, index=True)  # 원본 파일 내용 해시 (CLI 일괄 분류의 중복 실행 방지)
+    reused_rows = Column(Integer, default=0)  # 기준 작업에서 재사용한 행 수
+    issue_tokens_saved = Column(Integer, default=0)  # Issue 텍스트 정리/중복 제거로 줄인 추정 프롬프트 토큰 수
+    escalated_rows = Column(Integer, default=0)  # 모델 캐스케이드에서 다음 모델로 넘긴 행 수
+    model_usage = Column(Text, nullable=True)  # 모델별 호출/토큰/비용 요약 JSON (CascadeUsage.summary)
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
+    last_accessed_at = Column(DateTime, nullable=True)  # 마지막 다운로드 시각 (용량 한도 LRU 기준)
+    expired_at = Column(DateTime, nullable=True)  # 보관 정책으로 파일이 삭제된 시각
+
+
+class Artifact(Base):
+    """내용 해시 기반 파일 저장소 항목 (같은 내용의 파일은 한 번만 저장)"""
+    __tablename__ = "artifacts"
+    
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), nullable=False, unique=True, index=True)
+    extension = Column(String, nullable=False, default="")
+    size = Column(Integer, nullable=False, default=0)  # 원본 크기
+    stored_size = Column(Integer, nullable=False, default=0)  # 디스크 사용 크기 (압축 후)
+    compressed = Column(Boolean, nullable=False, default=False)  # zstd 압축 여부
+    ref_count = Column(Integer, nullable=False, default=0)  # 참조하는 이력 수
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, nullable=True)
+
+
+class ClassificationRow(Base):
+    """행 단위 분류 결과 (결과 파일을 열지 않고 조회하기 위해 저장)"""
+    __tablename__ = "classification_rows"
+    __table_args__ = (
+        Index("ix_classification_rows_history_row", "history_id", "row_index", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    history_id = Column(
+        Integer,
+        ForeignKey("classification_history.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    row_index = Column(Integer, nullable=False)  # 결과 행 순서 (0 = 엑셀 4행)
+    issue_hash = Column(String(40), nullable=True, index=True)  # Issue 텍스트 SHA-1
+    issue_text = Column(Text, nullable=True)
+    defect_name = Column(String, nullable=True)  # 불량명
+    equipment_name = Column(String, nullable=True)  # 설비명
+    action_taken = Column(Text, nullable=True)  # 조치내용
+    status = Column(String, nullable=False)  # success, failed, empty, reused
+
+
+# create_all / drop_all 시 전문 검색 인덱스도 함께 생성/삭제 (SQLite만)
+for _statement in SEARCH_INDEX_STATEMENTS:
+    event.listen(
+        ClassificationRow.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    ClassificationRow.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS classification_rows_fts").execute_if(dialect="sqlite")
+)
+
+
+class ClassificationTrace(Base):
+    """작업별 span 트레이스 (압축된 JSON, /history/{id}/trace에서 Chrome trace 포맷으로 제공)"""
+    __tablename__ = "classification_traces"
+    
+    history_id = Column(
+        Integer,
+        ForeignKey("classification_history.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    span_count = Column(Integer, default=0)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class JobLease(Base):
+    """
+    워커 프로세스가 가져갈 분류 작업 (대기 → 임대 → 완료 시 삭제)
+    
+    임대한 워커는 heartbeat로 expires_at을 연장하며, 워커가 죽어서 만료된 임대는
+    다른 워커가 다시 가져감. lease_token이 바뀌면 이전 워커의 연장/완료는 무시됨
+    """
+    __tablename__ = "job_leases"
+    __table_args__ = (
+        Index("ix_job_leases_status_expires", "status", "expires_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    history_id = Column(
+        Integer,
+        ForeignKey("classification_history.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True
+    )
+    kind = Column(String, nullable=False, default="classify")
+    payload = Column(Text, nullable=False)  # 분류 요청 JSON
+    status = Column(String, nullable=False, default="queued")  # queued, leased
+    worker_id = Column(String, nullable=True)
+    lease_token = Column(String(32), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)  # 임대 횟수 (만료 후 재임대 포함)
+    leased_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class WatchedFile(Base):
+    """
+    감시 폴더(python -m app.watcher)에서 가져간 파일
+    
+    내용 해시가 unique이므로 같은 내용의 파일은 경로/수정시각이 바뀌어도 한 번만
+    작업으로 등록됨. 이력/작업 행과 같은 트랜잭션으로 추가하므로 감시 프로세스가
+    여러 개이거나 중간에 재시작해도 중복 등록되거나 누락되지 않음
+    """
+    __tablename__ = "watched_files"
+    
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), nullable=False, unique=True)
+    path = Column(String, nullable=False)  # 감지된 원본 경로
+    size = Column(Integer, nullable=False)
+    mtime = Column(DateTime, nullable=False)
+    history_id = Column(Integer, ForeignKey("classification_history.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 class UserSettings(Base):
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Optional
+import json
+
+from pydantic import BaseModel, Field, field_validator
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
 
 
 class SettingsBase(BaseModel):
@@ -31,11 +33,25 @@ class FileUploadResponse(BaseModel):
     message: str
 
 
+class BatchUploadError(BaseModel):
+    filename: str
+    message: str
+
+
+class BatchUploadResponse(BaseModel):
+    files: List[FileUploadResponse]
+    errors: List[BatchUploadError] = []
+    message: str
+
+
 class ClassificationRequest(BaseModel):
     file_path: str
     sheet_name: str = "일보_Worst55"
     column_name: str = "Issue"
     prompt: str = "다음 Issue 내용을 분석하여 불량명, 설비명, 조치내용을 JSON 형식으로 추출해주세요."
+    # 증분 분류: 기준 작업과 같은 행(그룹 키 + Issue)은 결과를 재사용
+    incremental: bool = False
+    baseline_history_id: Optional[int] = None  # 없으면 같은 시트의 최근 작업 사용
 
 
 class ClassificationResponse(BaseModel):
@@ -46,11 +62,39 @@ class ClassificationResponse(BaseModel):
     processed_rows: int
     failed_rows: int
     result_path: Optional[str] = None
+    baseline_history_id: Optional[int] = None
+    reused_rows: int = 0  # 기준 작업에서 재사용한 행 수
+    classified_rows: int = 0  # LLM으로 분류한 행 수
+    message: str
+
+
+class JobSubmitResponse(BaseModel):
+    history_id: int
+    filename: str
+    status: str
+    message: str
+
+
+class BatchClassificationRequest(BaseModel):
+    file_paths: List[str]
+    sheet_name: str = "일보_Worst55"
+    column_name: str = "Issue"
+    prompt: str = "다음 Issue 내용을 분석하여 불량명, 설비명, 조치내용을 JSON 형식으로 추출해주세요."
+
+
+class BatchClassificationResponse(BaseModel):
+    batch_id: str
+    status: str
+    total_rows: int
+    processed_rows: int
+    failed_rows: int
+    results: List[ClassificationResponse]
     message: str
 
 
 class HistoryResponse(BaseModel):
     id: int
+    batch_id: Optional[str] = None
     filename: str
     sheet_name: str
     column_name: str
@@ -58,12 +102,79 @@ class HistoryResponse(BaseModel):
     total_rows: int
     processed_rows: int
     failed_rows: int
+    baseline_history_id: Optional[int] = None
+    reused_rows: Optional[int] = None
+    issue_tokens_saved: Optional[int] = None  # Issue 텍스트 정리/중복 제거로 줄인 추정 프롬프트 토큰 수
+    escalated_rows: Optional[int] = None  # 모델 캐스케이드에서 다음 모델로 넘긴 행 수
+    model_usage: Optional[Dict[str, Any]] = None  # 모델별 호출/토큰/비용, 에스컬레이션 비율, 절감 비용
+    source_artifact_id: Optional[int] = None
+    result_artifact_id: Optional[int] = None
     created_at: datetime
     completed_at: Optional[datetime] = None
+    expired_at: Optional[datetime] = None
     error_message: Optional[str] = None
     
+    @field_validator("model_usage", mode="before")
+    @classmethod
+    def parse_model_usage(cls, value):
+        # DB에는 JSON 문자열로 저장됨
+        return json.loads(value) if isinstance(value, str) else value
+    
     class Config:
         from_attributes = True
+        protected_namespaces = ()
+
+
+class ClassificationRowResponse(BaseModel):
+    row_index: int
+    issue_hash: Optional[str] = None
+    issue_text: Optional[str] = None
+    불량명: str = ""
+    설비명: str = ""
+    조치내용: str = ""
+    status: str
+
+
+class ClassificationRowPage(BaseModel):
+    items: List[ClassificationRowResponse]
+    total: int
+    next_cursor: Optional[int] = None  # 다음 페이지 요청 시 after 값
+
+
+class SearchHit(BaseModel):
+    history_id: int
+    filename: str
+    created_at: Optional[datetime] = None
+    row_index: int
+    status: str
+    issue_text: Optional[str] = None
+    불량명: str = ""
+    설비명: str = ""
+    조치내용: str = ""
+    score: Optional[float] = None  # bm25 점수 (낮을수록 관련도 높음, LIKE 검색이면 None)
+
+
+class SearchResponse(BaseModel):
+    items: List[SearchHit]
+    total: int
+    page: int
+    limit: int
+
+
+class DefectCount(BaseModel):
+    defect_name: Optional[str] = None
+    count: int
+
+
+class EquipmentSummary(BaseModel):
+    equipment_name: str
+    count: int
+    top_defects: List[DefectCount]
+
+
+class TimeSeriesPoint(BaseModel):
+    date: date
+    count: int
 
 
 class ClassificationResult(BaseModel):
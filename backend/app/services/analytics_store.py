@@ -0,0 +1,321 @@
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import threading
+import uuid
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import ClassificationHistory, ClassificationRow
+
+if TYPE_CHECKING:
+    # polars는 import 비용이 커서 실제로 집계/저장할 때 로드
+    import polars as pl
+
+
+ROWS_DIR = "rows"
+ROLLUPS_DIR = "rollups"
+
+# 집계 대상 행 상태 (분류 결과가 있는 행)
+CLASSIFIED_STATUSES = ["success", "reused"]
+
+# 월 롤업 파일은 읽고-수정-쓰기로 갱신하므로 동시 갱신을 막음
+_rollup_lock = threading.Lock()
+
+ROLLUP_COLUMNS = ["date", "equipment_name", "defect_name", "count"]
+
+
+def row_schema() -> Dict[str, Any]:
+    import polars as pl
+
+    return {
+        "date": pl.Date,
+        "history_id": pl.Int64,
+        "filename": pl.Utf8,
+        "row_index": pl.Int64,
+        "defect_name": pl.Utf8,
+        "equipment_name": pl.Utf8,
+        "action_taken": pl.Utf8,
+        "status": pl.Utf8,
+    }
+
+
+def rollup_schema() -> Dict[str, Any]:
+    import polars as pl
+
+    return {
+        "date": pl.Date,
+        "equipment_name": pl.Utf8,
+        "defect_name": pl.Utf8,
+        "count": pl.Int64,
+    }
+
+
+def analytics_root() -> Path:
+    return Path(settings.analytics_dir)
+
+
+def partition_date(history: ClassificationHistory) -> date:
+    """이력이 속하는 파티션 날짜 (완료 시각 기준, UTC)"""
+    return (history.completed_at or history.created_at or datetime.utcnow()).date()
+
+
+def partition_dir(kind: str, day: date) -> Path:
+    return analytics_root() / kind / f"date={day.isoformat()}"
+
+
+def _write_parquet(df: "pl.DataFrame", path: Path) -> None:
+    # 읽는 쪽에서 반쯤 쓰인 파일이 보이지 않도록 임시 파일에 쓴 뒤 교체
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.part")
+    try:
+        df.write_parquet(str(partial_path), statistics=True)
+        partial_path.replace(path)
+    finally:
+        partial_path.unlink(missing_ok=True)
+
+
+def rollup_path(day: date) -> Path:
+    """일자 롤업이 들어가는 월 단위 롤업 파일 경로"""
+    return analytics_root() / ROLLUPS_DIR / f"month={day.strftime('%Y-%m')}" / "rollup.parquet"
+
+
+def _partition_files(kind: str, start: Optional[date] = None, end: Optional[date] = None) -> List[Path]:
+    """
+    기간에 해당하는 파티션의 parquet 파일 목록
+
+    디렉토리 이름(date=YYYY-MM-DD / month=YYYY-MM)만 보고
+    기간 밖의 파티션은 열지 않음
+    """
+    base = analytics_root() / kind
+    if not base.exists():
+        return []
+
+    files = []
+    for directory in sorted(base.glob("*=*")):
+        key, value = directory.name.split("=", 1)
+        try:
+            if key == "month":
+                first = date.fromisoformat(f"{value}-01")
+                last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            else:
+                first = last = date.fromisoformat(value)
+        except ValueError:
+            continue
+        if (start and last < start) or (end and first > end):
+            continue
+        files.extend(sorted(directory.glob("*.parquet")))
+    return files
+
+
+def append_history_rows(db: Session, history: ClassificationHistory) -> int:
+    """
+    완료된 작업의 행 단위 결과를 날짜 파티션에 추가하고 해당 일자 롤업 갱신
+
+    Returns:
+        저장한 행 수
+    """
+    rows = db.query(ClassificationRow)\
+        .filter(ClassificationRow.history_id == history.id)\
+        .order_by(ClassificationRow.row_index)\
+        .all()
+    return write_history_rows(history, rows)
+
+
+def write_history_rows(history: ClassificationHistory, rows: List[ClassificationRow]) -> int:
+    """
+    이미 조회한 행들을 날짜 파티션에 저장 (파일 I/O만 수행, DB 접근 없음)
+
+    작업마다 파일 하나(history_{id}.parquet)로 저장하므로 같은 작업을
+    다시 추가해도 덮어쓰기만 됨
+
+    Returns:
+        저장한 행 수
+    """
+    import polars as pl
+
+    day = partition_date(history)
+    df = pl.DataFrame(
+        {
+            "date": [day] * len(rows),
+            "history_id": [history.id] * len(rows),
+            "filename": [history.filename] * len(rows),
+            "row_index": [row.row_index for row in rows],
+            "defect_name": [row.defect_name for row in rows],
+            "equipment_name": [row.equipment_name for row in rows],
+            "action_taken": [row.action_taken for row in rows],
+            "status": [row.status for row in rows],
+        },
+        schema=row_schema()
+    )
+    _write_parquet(df, partition_dir(ROWS_DIR, day) / f"history_{history.id}.parquet")
+    refresh_daily_rollup(day)
+    return len(rows)
+
+
+def refresh_daily_rollup(day: date) -> None:
+    """
+    하루치 행 파티션으로 (날짜, 설비명, 불량명)별 건수 롤업 재계산
+
+    새 작업이 추가된 날짜만 다시 집계하여 월 단위 롤업 파일의 해당 일자 부분만
+    교체함. 조회 시 1년치도 파일 12~13개만 열면 되도록 월 단위로 묶어서 저장
+    """
+    import polars as pl
+
+    files = _partition_files(ROWS_DIR, day, day)
+    daily = pl.DataFrame(schema=rollup_schema())
+    if files:
+        daily = pl.scan_parquet([str(f) for f in files], hive_partitioning=False)\
+            .filter(
+                pl.col("status").is_in(CLASSIFIED_STATUSES)
+                & pl.col("defect_name").is_not_null()
+            )\
+            .group_by(["date", "equipment_name", "defect_name"])\
+            .agg(pl.count().cast(pl.Int64).alias("count"))\
+            .collect()\
+            .select(ROLLUP_COLUMNS)
+
+    path = rollup_path(day)
+    with _rollup_lock:
+        if path.exists():
+            others = pl.read_parquet(str(path), hive_partitioning=False).filter(pl.col("date") != day)
+            daily = pl.concat([others, daily])
+
+        if daily.is_empty():
+            path.unlink(missing_ok=True)
+            return
+        _write_parquet(daily.sort(["date", "equipment_name", "defect_name"], nulls_last=True), path)
+
+
+def scan_rollups(days: int, today: Optional[date] = None) -> Optional["pl.LazyFrame"]:
+    """
+    최근 days일 롤업 lazy scan (롤업 파일이 없으면 None)
+
+    기간 밖 월 파티션은 파일 목록에서 제외하고, 월 안에서의 날짜 조건은
+    scan에 넘겨 row group 통계로 걸러지도록 함 (predicate pushdown)
+    """
+    import polars as pl
+
+    end = today or datetime.utcnow().date()
+    start = end - timedelta(days=max(1, days) - 1)
+    files = _partition_files(ROLLUPS_DIR, start, end)
+    if not files:
+        return None
+    return pl.scan_parquet([str(f) for f in files], hive_partitioning=False)\
+        .filter(pl.col("date").is_between(start, end))
+
+
+def scan_rows(start: Optional[date] = None, end: Optional[date] = None) -> Optional["pl.LazyFrame"]:
+    """기간 내 행 단위 데이터 lazy scan (상세 분석용, 파일이 없으면 None)"""
+    import polars as pl
+
+    files = _partition_files(ROWS_DIR, start, end)
+    if not files:
+        return None
+    lazy = pl.scan_parquet([str(f) for f in files], hive_partitioning=False)
+    if start:
+        lazy = lazy.filter(pl.col("date") >= start)
+    if end:
+        lazy = lazy.filter(pl.col("date") <= end)
+    return lazy
+
+
+def top_defects(
+    days: int = 90,
+    equipment: Optional[str] = None,
+    limit: int = 10,
+    today: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """기간 내 불량명별 건수 상위 N개 (설비명 지정 시 해당 설비만)"""
+    import polars as pl
+
+    lazy = scan_rollups(days, today)
+    if lazy is None:
+        return []
+    if equipment:
+        lazy = lazy.filter(pl.col("equipment_name") == equipment)
+
+    return lazy.group_by("defect_name")\
+        .agg(pl.col("count").sum())\
+        .sort(["count", "defect_name"], descending=[True, False])\
+        .limit(limit)\
+        .collect()\
+        .to_dicts()
+
+
+def equipment_summary(
+    days: int = 90,
+    limit: int = 20,
+    top_n: int = 3,
+    today: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """기간 내 설비명별 건수와 설비별 상위 불량명"""
+    import polars as pl
+
+    lazy = scan_rollups(days, today)
+    if lazy is None:
+        return []
+
+    pairs = lazy.with_columns(pl.col("equipment_name").fill_null(""))\
+        .group_by(["equipment_name", "defect_name"])\
+        .agg(pl.col("count").sum())\
+        .sort(["count", "defect_name"], descending=[True, False])
+
+    summary = pairs.group_by("equipment_name", maintain_order=True)\
+        .agg(
+            pl.col("count").sum().alias("total"),
+            pl.struct(["defect_name", "count"]).head(top_n).alias("top_defects")
+        )\
+        .sort(["total", "equipment_name"], descending=[True, False])\
+        .limit(limit)\
+        .collect()
+
+    return [
+        {
+            "equipment_name": item["equipment_name"],
+            "count": item["total"],
+            "top_defects": item["top_defects"],
+        }
+        for item in summary.to_dicts()
+    ]
+
+
+def defect_time_series(
+    days: int = 90,
+    defect: Optional[str] = None,
+    equipment: Optional[str] = None,
+    today: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """기간 내 일자별 건수 (불량명/설비명 필터)"""
+    import polars as pl
+
+    lazy = scan_rollups(days, today)
+    if lazy is None:
+        return []
+    if defect:
+        lazy = lazy.filter(pl.col("defect_name") == defect)
+    if equipment:
+        lazy = lazy.filter(pl.col("equipment_name") == equipment)
+
+    return lazy.group_by("date")\
+        .agg(pl.col("count").sum())\
+        .sort("date")\
+        .collect()\
+        .to_dicts()
+
+
+def rebuild_analytics(db: Session) -> int:
+    """
+    완료된 모든 작업으로 저장소 재구성 (기존 데이터 이전 / 파일 손상 복구용)
+
+    Returns:
+        처리한 작업 수
+    """
+    histories = db.query(ClassificationHistory)\
+        .filter(ClassificationHistory.status == "completed")\
+        .order_by(ClassificationHistory.id)\
+        .all()
+    for history in histories:
+        append_history_rows(db, history)
+    return len(histories)
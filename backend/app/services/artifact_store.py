@@ -0,0 +1,324 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Artifact, ClassificationHistory
+
+
+CHUNK_SIZE = 1024 * 1024
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+TMP_DIR = "tmp"
+
+
+def artifacts_root() -> Path:
+    return Path(settings.artifacts_dir)
+
+
+def blob_path(sha256: str, extension: str) -> Path:
+    """
+    내용 해시로 정해지는 저장 경로 (앞 2글자로 디렉토리 분산)
+
+    압축 여부와 관계없이 경로가 같으므로 이력에 저장된 경로가 바뀌지 않음
+    """
+    return artifacts_root() / sha256[:2] / f"{sha256}{extension}"
+
+
+def hash_file(path: Path) -> Tuple[str, int]:
+    """파일을 스트리밍으로 읽어서 (sha256, 크기) 계산"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def is_compressed_file(path: Path) -> bool:
+    """zstd 프레임 헤더로 압축 여부 판단 (DB 조회 없이 판단 가능)"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(ZSTD_MAGIC)) == ZSTD_MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def is_artifact_path(path: Optional[str]) -> bool:
+    if not path:
+        return False
+    try:
+        Path(path).resolve().relative_to(artifacts_root().resolve())
+        return True
+    except ValueError:
+        return False
+
+
+def find_by_path(db: Session, path: Optional[str]) -> Optional[Artifact]:
+    """저장소 경로로 아티팩트 조회 (저장소 밖의 경로면 None)"""
+    if not is_artifact_path(path):
+        return None
+    sha256 = Path(path).name[:64]
+    return db.query(Artifact).filter(Artifact.sha256 == sha256).first()
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    """하드 링크로 추가 (다른 파일시스템이면 복사), 임시 파일에 만든 뒤 교체"""
+    partial_path = target.with_name(f"{target.name}.part")
+    partial_path.unlink(missing_ok=True)
+    try:
+        os.link(source, partial_path)
+    except OSError:
+        shutil.copyfile(source, partial_path)
+    partial_path.replace(target)
+
+
+def put_file(
+    db: Session,
+    path: Path,
+    keep_source: bool = False,
+    digest: Optional[Tuple[str, int]] = None
+) -> Artifact:
+    """
+    파일을 저장소에 추가 (내용이 같은 파일은 한 번만 저장)
+
+    Args:
+        path: 추가할 파일
+        keep_source: False면 파일을 저장소로 옮김 (이미 같은 내용이 있으면 원본 삭제),
+            True면 원본은 그대로 두고 하드 링크(또는 복사)로 추가
+        digest: 미리 계산한 (sha256, 크기) - 해시 계산을 스레드에서 한 경우
+
+    Returns:
+        Artifact (참조 수는 attach로 별도 증가)
+    """
+    path = Path(path)
+    sha256, size = digest or hash_file(path)
+    extension = path.suffix.lower()
+    artifact = db.query(Artifact).filter(Artifact.sha256 == sha256).first()
+    target = blob_path(sha256, artifact.extension if artifact else extension)
+
+    restored = not target.exists()
+    if restored:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if keep_source:
+            _link_or_copy(path, target)
+        else:
+            shutil.move(str(path), str(target))
+    elif not keep_source and path.resolve() != target.resolve():
+        path.unlink(missing_ok=True)
+
+    if artifact is None:
+        artifact = Artifact(sha256=sha256, extension=extension, size=size, stored_size=size, ref_count=0)
+        db.add(artifact)
+    elif restored:
+        # 파일이 유실되었다가 다시 저장된 경우
+        artifact.compressed = False
+        artifact.stored_size = size
+    artifact.last_accessed_at = datetime.utcnow()
+    db.flush()
+    return artifact
+
+
+def artifact_path(artifact: Artifact) -> Path:
+    return blob_path(artifact.sha256, artifact.extension)
+
+
+def attach(artifact: Artifact) -> None:
+    """참조 수 증가 (이력이 아티팩트를 참조할 때)"""
+    artifact.ref_count = (artifact.ref_count or 0) + 1
+
+
+def release(db: Session, artifact_id: Optional[int]) -> Optional[Artifact]:
+    """참조 수 감소 (0이 된 아티팩트는 저장소 정리 시 삭제됨)"""
+    if artifact_id is None:
+        return None
+    artifact = db.get(Artifact, artifact_id)
+    if artifact is not None:
+        artifact.ref_count = max(0, (artifact.ref_count or 0) - 1)
+    return artifact
+
+
+def register_history_artifacts(
+    db: Session,
+    history: ClassificationHistory,
+    source_digest: Optional[Tuple[str, int]] = None,
+    result_digest: Optional[Tuple[str, int]] = None
+) -> None:
+    """
+    완료된 작업의 원본/결과 파일을 저장소에 등록하고 이력이 아티팩트를 참조하도록 변경
+
+    원본은 업로드 경로를 그대로 두고(같은 파일로 다시 분류할 수 있도록) 링크로 추가,
+    결과는 저장소로 옮김. 이력의 file_path/result_path는 저장소 경로로 바뀌며
+    압축 후에도 경로가 유지됨
+    """
+    source = find_by_path(db, history.file_path)
+    if source is None:
+        source = put_file(db, Path(history.file_path), keep_source=True, digest=source_digest)
+    if history.source_artifact_id != source.id:
+        release(db, history.source_artifact_id)
+        attach(source)
+        history.source_artifact_id = source.id
+    history.file_path = str(artifact_path(source))
+
+    if history.result_path:
+        result = put_file(db, Path(history.result_path), digest=result_digest)
+        if history.result_artifact_id != result.id:
+            release(db, history.result_artifact_id)
+            attach(result)
+            history.result_artifact_id = result.id
+        history.result_path = str(artifact_path(result))
+
+
+def iter_file_bytes(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    파일 내용을 청크 단위로 읽음 (압축된 파일은 스트리밍으로 압축 해제)
+
+    압축 해제된 전체 내용을 메모리나 디스크에 만들지 않음
+    """
+    if not is_compressed_file(path):
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(chunk_size), b"")
+        return
+
+    import zstandard
+
+    with open(path, "rb") as f:
+        reader = zstandard.ZstdDecompressor().stream_reader(f)
+        yield from iter(lambda: reader.read(chunk_size), b"")
+
+
+@contextmanager
+def materialize(path: Optional[str]) -> Iterator[Optional[Path]]:
+    """
+    openpyxl/polars로 읽을 수 있는 압축되지 않은 경로 제공
+
+    압축되지 않은 파일은 그대로, 압축된 파일은 같은 확장자의 임시 파일로
+    풀어서 제공하고 사용이 끝나면 삭제
+    """
+    if not path or not is_compressed_file(Path(path)):
+        yield Path(path) if path else None
+        return
+
+    tmp_dir = artifacts_root() / TMP_DIR
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=tmp_dir, suffix=Path(path).suffix)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter_file_bytes(Path(path)):
+                out.write(chunk)
+        yield Path(tmp_name)
+    finally:
+        Path(tmp_name).unlink(missing_ok=True)
+
+
+def compress_artifact(artifact: Artifact, level: Optional[int] = None) -> int:
+    """
+    아티팩트를 zstd로 압축하여 같은 경로에 교체 저장
+
+    Returns:
+        절약한 바이트 수 (압축 효과가 없으면 압축하지 않고 0)
+    """
+    import zstandard
+
+    path = artifact_path(artifact)
+    if artifact.compressed or is_compressed_file(path):
+        artifact.compressed = True
+        return 0
+
+    partial_path = path.with_name(f"{path.name}.zst.part")
+    compressor = zstandard.ZstdCompressor(level=level or settings.artifact_compression_level)
+    with open(path, "rb") as src, open(partial_path, "wb") as dst:
+        compressor.copy_stream(src, dst, size=artifact.size)
+
+    compressed_size = partial_path.stat().st_size
+    if compressed_size >= path.stat().st_size:
+        partial_path.unlink(missing_ok=True)
+        return 0
+
+    saved = path.stat().st_size - compressed_size
+    partial_path.replace(path)
+    artifact.compressed = True
+    artifact.stored_size = compressed_size
+    return saved
+
+
+def compress_cold_artifacts(
+    db: Session,
+    older_than_days: Optional[int] = None,
+    now: Optional[datetime] = None,
+    dry_run: bool = False
+) -> Tuple[int, int]:
+    """
+    최근 사용하지 않은 아티팩트 압축
+
+    Returns:
+        (압축한 개수, 절약한 바이트 수)
+    """
+    days = settings.artifact_compress_after_days if older_than_days is None else older_than_days
+    if not days:
+        return 0, 0
+
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    candidates = db.query(Artifact).filter(
+        Artifact.compressed.is_(False),
+        func.coalesce(Artifact.last_accessed_at, Artifact.created_at) < cutoff
+    ).all()
+
+    count = 0
+    saved = 0
+    for artifact in candidates:
+        if not artifact_path(artifact).exists():
+            continue
+        if dry_run:
+            count += 1
+            continue
+        freed = compress_artifact(artifact)
+        if freed:
+            count += 1
+            saved += freed
+    return count, saved
+
+
+def reconcile_artifacts(db: Session) -> Dict[str, Any]:
+    """
+    아티팩트 레코드와 저장소 파일, 이력 참조 정합성 맞추기
+
+    - 파일이 없는 레코드 삭제 (참조하던 이력의 아티팩트 id 해제)
+    - 참조 수를 이력 기준으로 다시 계산
+    """
+    removed = 0
+    for artifact in db.query(Artifact).all():
+        if artifact_path(artifact).exists():
+            continue
+        db.query(ClassificationHistory)\
+            .filter(ClassificationHistory.source_artifact_id == artifact.id)\
+            .update({ClassificationHistory.source_artifact_id: None}, synchronize_session=False)
+        db.query(ClassificationHistory)\
+            .filter(ClassificationHistory.result_artifact_id == artifact.id)\
+            .update({ClassificationHistory.result_artifact_id: None}, synchronize_session=False)
+        db.delete(artifact)
+        removed += 1
+    db.flush()
+
+    counts: Dict[int, int] = {}
+    rows = db.query(ClassificationHistory.source_artifact_id, ClassificationHistory.result_artifact_id)\
+        .filter(or_(
+            ClassificationHistory.source_artifact_id.isnot(None),
+            ClassificationHistory.result_artifact_id.isnot(None)
+        ))
+    for source_id, result_id in rows:
+        for artifact_id in (source_id, result_id):
+            if artifact_id is not None:
+                counts[artifact_id] = counts.get(artifact_id, 0) + 1
+    for artifact in db.query(Artifact).all():
+        artifact.ref_count = counts.get(artifact.id, 0)
+
+    return {"removed_artifacts": removed}
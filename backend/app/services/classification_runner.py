@@ -0,0 +1,311 @@
+import asyncio
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from .excel_handler import ExcelHandler
+from .issue_normalizer import IssueNormalizer
+from .llm_classifier import LLMClassifier
+from .metrics import QUEUE_DEPTH, stage_timer
+from .tracing import record_event
+from .xlsx_patcher import patch_results_into_xlsx
+from ..config import settings
+from ..core.preprocessor import (
+    DATA_START_ROW,
+    convert_xlsb_to_xlsx,
+    preprocess_structure,
+    iter_preprocessed_groups,
+)
+
+
+# 분류 실패/빈 값일 때 사용하는 결과
+EMPTY_RESULT = {"불량명": "", "설비명": "", "조치내용": ""}
+
+
+def empty_result() -> Dict[str, str]:
+    """빈 분류 결과 생성"""
+    return dict(EMPTY_RESULT)
+
+
+def build_result_path(file_path: Path) -> Path:
+    """분류 결과 파일 경로 생성"""
+    result_filename = f"classified_{file_path.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    return Path(settings.results_dir) / result_filename
+
+
+@stage_timer("write_result")
+def write_result_file(
+    original_file_path: str,
+    output_file_path: str,
+    classifications: List[Dict[str, str]],
+    sheet_name: str,
+    writer: Optional[str] = None
+) -> str:
+    """
+    설정된 방식(settings.result_writer)으로 결과 파일 작성
+
+    Args:
+        writer: "openpyxl" (서식/병합 유지), "streaming" (constant_memory),
+            "xml_patch" (시트 XML만 다시 쓰고 나머지 파트는 그대로 복사)
+    """
+    writer = writer or settings.result_writer
+    if writer == "xml_patch" and str(original_file_path).lower().endswith((".xlsx", ".xlsm")):
+        return patch_results_into_xlsx(
+            original_file_path, output_file_path, classifications, sheet_name
+        )
+    if writer == "streaming":
+        return ExcelHandler.write_results_streaming(
+            original_file_path, output_file_path, classifications, sheet_name
+        )
+    if writer not in ("openpyxl", "xml_patch"):
+        raise ValueError(f"Unknown result writer: {writer}")
+    return ExcelHandler.append_results_to_file(
+        original_file_path, output_file_path, classifications, sheet_name
+    )
+
+
+async def classify_issue_values(
+    classifier: LLMClassifier,
+    issue_values: Sequence[Any],
+    prompt: str,
+    few_shot_examples: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    max_retries: int = 3,
+    normalizer: Optional[IssueNormalizer] = None
+) -> List[Tuple[Dict[str, str], str]]:
+    """
+    Issue 값 목록을 동시에 분류
+
+    LLM 호출은 스레드에서 실행하고 세마포어로 동시 호출 수를 제한함.
+    Issue 텍스트는 정리(IssueNormalizer)한 뒤 보내며, 정리 결과가 같은 Issue는
+    한 번만 호출하고 결과를 공유함. 정리 후 남는 내용이 없으면 빈 값으로 처리함.
+
+    Args:
+        classifier: LLM Classifier
+        issue_values: 분류할 Issue 값 목록 (입력 순서 유지)
+        prompt: 사용자 정의 프롬프트
+        few_shot_examples: Few-shot learning 예제
+        concurrency: 최대 동시 LLM 호출 수 (기본값: settings.llm_concurrency)
+        max_retries: JSON 파싱 실패 시 최대 재시도 횟수
+        normalizer: Issue 텍스트 정리기 (기본값: 설정값으로 생성)
+
+    Returns:
+        입력 순서와 같은 (분류 결과 dict, 상태) 리스트
+        상태: "success", "failed", "empty"
+    """
+    normalizer = normalizer or IssueNormalizer()
+    semaphore = asyncio.Semaphore(max(1, concurrency or settings.llm_concurrency))
+
+    async def classify_one(issue_content: str) -> Tuple[Optional[Dict[str, str]], bool]:
+        async with semaphore:
+            return await asyncio.to_thread(
+                classifier.classify,
+                issue_content=issue_content,
+                prompt=prompt,
+                few_shot_examples=few_shot_examples,
+                max_retries=max_retries
+            )
+
+    # 정리 결과가 같은 내용은 하나의 task로 묶음
+    contents = [normalizer.normalize(value) for value in issue_values]
+    tasks: Dict[str, asyncio.Task] = {}
+    rows = 0
+    for content in contents:
+        if not content:
+            continue
+        rows += 1
+        if content not in tasks:
+            tasks[content] = asyncio.create_task(classify_one(content))
+    record_event("dedup", "cache", rows=rows, unique=len(tasks), hits=rows - len(tasks))
+
+    if tasks:
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    outcomes = []
+    for content in contents:
+        if not content:
+            outcomes.append((empty_result(), "empty"))
+            continue
+
+        task = tasks[content]
+        result, success = (None, False) if task.exception() else task.result()
+        if success and result:
+            outcomes.append((dict(result), "success"))
+        else:
+            outcomes.append((empty_result(), "failed"))
+
+    return outcomes
+
+
+def expand_group_results(
+    group_results: Sequence[Tuple[dict, Dict[str, str]]],
+    data_start_row: int = DATA_START_ROW
+) -> List[Dict[str, str]]:
+    """
+    그룹 단위 결과를 행 단위 결과 리스트로 변환
+
+    그룹의 첫 행에 결과를 두고 나머지(병합된) 행은 빈 결과로 채움.
+    반환 리스트의 0번째는 data_start_row에 해당함
+    """
+    classifications: List[Dict[str, str]] = []
+    for group, result in group_results:
+        offset = group["start_row"] - data_start_row
+        while len(classifications) < offset:
+            classifications.append(empty_result())
+        classifications.append(result)
+        while len(classifications) < group["end_row"] - data_start_row + 1:
+            classifications.append(empty_result())
+    return classifications
+
+
+_END = object()
+
+
+class ClassificationPipeline:
+    """
+    전처리와 LLM 분류를 겹쳐서 실행하는 스트리밍 파이프라인
+
+    생산자(스레드): xlsb 변환 → 워크북 로드 → 시트를 읽어 내려가며 병합 해제/값 채우기와
+    Issue 그룹 병합을 하고 그룹을 하나씩 큐에 넣음 (openpyxl 워크북 로드는 첫 그룹 전에 끝나야 함)
+    소비자(이벤트 루프): 큐에서 그룹을 꺼내는 즉시 LLM 호출 (동시 호출 수 제한)
+
+    큐 크기가 제한되어 있어 LLM이 밀리면 시트 파싱도 대기함 (backpressure).
+    Issue 텍스트는 정리(IssueNormalizer)한 뒤 보내며, 정리 결과가 앞 그룹과 같으면
+    새로 호출하지 않고 그 그룹의 결과를 공유함.
+    결과는 입력 순서대로 yield 되며, 실행이 끝나면 self.workbook에
+    Issue 병합까지 끝난 워크북이 남음 (결과 컬럼 추가 후 바로 저장 가능)
+    """
+
+    def __init__(
+        self,
+        classifier: LLMClassifier,
+        prompt: str,
+        few_shot_examples: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        max_retries: int = 3,
+        normalizer: Optional[IssueNormalizer] = None
+    ):
+        self.classifier = classifier
+        self.normalizer = normalizer or IssueNormalizer()
+        self.prompt = prompt
+        self.few_shot_examples = few_shot_examples
+        self.concurrency = max(1, concurrency or settings.llm_concurrency)
+        self.queue_size = max(1, queue_size or settings.pipeline_queue_size)
+        self.max_retries = max_retries
+        self.workbook = None
+
+    async def run(
+        self,
+        file_path: Path,
+        sheet_name: Optional[str] = None,
+        column_name: str = "Issue"
+    ) -> AsyncIterator[Tuple[dict, Dict[str, str], str]]:
+        """
+        파이프라인 실행
+
+        Yields:
+            (Issue 그룹, 분류 결과 dict, 상태) - 시트의 그룹 순서와 동일
+            상태: "success", "failed", "empty"
+        """
+        loop = asyncio.get_running_loop()
+        work_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        ordered: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        stop = threading.Event()
+
+        work_depth = QUEUE_DEPTH.labels("work")
+        ordered_depth = QUEUE_DEPTH.labels("ordered")
+
+        def put(item) -> None:
+            # 큐가 가득 차면 생산자 스레드가 여기서 대기 (backpressure)
+            work_depth.inc()
+            asyncio.run_coroutine_threadsafe(work_queue.put(item), loop).result()
+
+        def produce() -> None:
+            try:
+                xlsx_path = convert_xlsb_to_xlsx(Path(file_path), sheet_name=sheet_name)
+                # 병합 해제/값 채우기는 그룹을 만들면서 행 순서대로 진행 (워크북 로드 직후 첫 그룹 전달)
+                self.workbook = preprocess_structure(xlsx_path, sheet_name=sheet_name, fill_merged=False)
+                for group in iter_preprocessed_groups(self.workbook, sheet_name, column_name, fill_merged=True):
+                    if stop.is_set():
+                        break
+                    put(group)
+            finally:
+                put(_END)
+
+        async def classify(text: str) -> Tuple[Dict[str, str], str]:
+            try:
+                result, success = await asyncio.to_thread(
+                    self.classifier.classify,
+                    issue_content=text,
+                    prompt=self.prompt,
+                    few_shot_examples=self.few_shot_examples,
+                    max_retries=self.max_retries
+                )
+            except Exception:
+                result, success = None, False
+            finally:
+                semaphore.release()
+
+            if success and result:
+                return dict(result), "success"
+            return empty_result(), "failed"
+
+        async def dispatch() -> None:
+            # 정리된 Issue 텍스트 → 분류 task (같은 내용은 결과 공유)
+            classified: Dict[str, asyncio.Task] = {}
+            try:
+                while True:
+                    group = await work_queue.get()
+                    work_depth.dec()
+                    if group is _END:
+                        break
+
+                    content = self.normalizer.normalize(group["text"])
+                    if not content:
+                        future = loop.create_future()
+                        future.set_result((empty_result(), "empty"))
+                    elif content in classified:
+                        future = classified[content]
+                    else:
+                        await semaphore.acquire()
+                        future = asyncio.create_task(classify(content))
+                        classified[content] = future
+                    ordered_depth.inc()
+                    await ordered.put((group, future))
+            finally:
+                # 예외로 끝나도 소비자가 기다리지 않도록 항상 종료 표시
+                await ordered.put(_END)
+
+        producer = loop.run_in_executor(None, produce)
+        dispatcher = asyncio.create_task(dispatch())
+
+        try:
+            while True:
+                item = await ordered.get()
+                if item is _END:
+                    break
+                ordered_depth.dec()
+                group, future = item
+                result, status = await future
+                yield group, result, status
+
+            # 분류 요청 단계와 전처리 단계에서 발생한 예외 전파
+            await dispatcher
+            await producer
+        finally:
+            stop.set()
+            dispatcher.cancel()
+            while not ordered.empty():
+                item = ordered.get_nowait()
+                if item is not _END:
+                    ordered_depth.dec()
+                    item[1].cancel()
+            # 생산자 스레드가 put에서 멈춰있지 않도록 큐를 비우면서 종료 대기
+            while not producer.done():
+                while not work_queue.empty():
+                    work_queue.get_nowait()
+                    work_depth.dec()
+                await asyncio.sleep(0.01)
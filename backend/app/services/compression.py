@@ -0,0 +1,175 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from ..config import settings
+
+
+# 압축할 응답 형식 (xlsx/parquet/zip 등 이미 압축된 형식은 제외)
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+# SSE는 청크 단위로 바로 전달되어야 하므로 압축하지 않음 (프록시/브라우저 버퍼링 방지)
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(EXCLUDED_TYPES)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Accept-Encoding에서 사용할 인코딩 선택 (br 우선, q=0은 제외)
+
+    brotli 패키지가 없으면 gzip만 사용
+    """
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 1.0
+        if quality > 0:
+            accepted.add(coding.strip())
+
+    if "br" in accepted:
+        try:
+            import brotli  # noqa: F401
+            return "br"
+        except ImportError:
+            pass
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        # wbits=31: gzip 헤더/트레일러 포함
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def make_compressor(encoding: str):
+    if encoding == "br":
+        return _BrotliCompressor(settings.compression_brotli_quality)
+    return _GzipCompressor(settings.compression_gzip_level)
+
+
+class CompressionMiddleware:
+    """
+    응답 압축 (ASGI 미들웨어, brotli/gzip)
+
+    starlette GZipMiddleware와 달리 brotli를 지원하고, SSE와 이미 압축된 파일 형식은
+    건너뛰며, 스트리밍 응답은 청크마다 flush해서 진행상황 전달이 늦어지지 않음.
+    minimum_size보다 작은 단일 본문 응답은 압축하지 않음 (헤더 오버헤드가 더 큼)
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.compression_minimum_size if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type", ""))
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # 첫 본문 크기를 보고 압축 여부를 정하므로 헤더 전송을 미룸
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = make_compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # 인코딩마다 바이트가 달라지므로 strong ETag는 weak로 변경
+                    headers["ETag"] = f"W/{etag}"
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+
+                if not more_body:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    start_message = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start_message)
+                start_message = None
+
+            chunk = compressor.compress(body)
+            chunk += compressor.flush() if more_body else compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
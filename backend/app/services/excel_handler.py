@@ -1,18 +1,23 @@
-import polars as pl
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-import openpyxl
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
 
+from .metrics import stage_timer
+
+if TYPE_CHECKING:
+    # polars/openpyxl은 import 비용이 커서 실제로 사용하는 함수 안에서 로드
+    import openpyxl
+    import polars as pl
 
 
 class ExcelHandler:
     """Excel 파일 처리를 위한 클래스"""
     
     @staticmethod
+    @stage_timer("read_excel")
     def read_excel(
         file_path: str,
         sheet_name: str = "일보_Worst55"
-    ) -> pl.DataFrame:
+    ) -> "pl.DataFrame":
         """
         Excel 파일을 읽어서 Polars DataFrame으로 반환
         
@@ -23,6 +28,8 @@ class ExcelHandler:
         Returns:
             Polars DataFrame
         """
+        import polars as pl
+        
         # Polars는 openpyxl 엔진을 사용하여 Excel 읽기
         df = pl.read_excel(
             file_path,
@@ -40,8 +47,29 @@ class ExcelHandler:
         """
         기존 엑셀 파일의 서식(병합 등)을 유지하면서 결과 컬럼 추가
         """
+        import openpyxl
+        
         # Load workbook
         wb = openpyxl.load_workbook(original_file_path)
+        ExcelHandler.append_results_to_workbook(wb, classifications, sheet_name)
+
+        # Save
+        wb.save(output_file_path)
+        wb.close()
+        
+        return output_file_path
+
+    @staticmethod
+    def append_results_to_workbook(
+        wb: "openpyxl.Workbook",
+        classifications: List[Dict[str, str]],
+        sheet_name: str = "일보_Worst55"
+    ) -> "openpyxl.Workbook":
+        """
+        메모리에 로드된 워크북에 결과 컬럼 추가 (저장은 호출자가 수행)
+        """
+        from openpyxl.styles import Alignment, Font
+        
         if sheet_name in wb.sheetnames:
             ws = wb[sheet_name]
         else:
@@ -63,8 +91,8 @@ class ExcelHandler:
             cell = ws.cell(row=header_row, column=start_col + idx)
             cell.value = header
             # Simple styling
-            cell.font = openpyxl.styles.Font(bold=True)
-            cell.alignment = openpyxl.styles.Alignment(horizontal='center', vertical='center')
+            cell.font = Font(bold=True)
+            cell.alignment = Alignment(horizontal='center', vertical='center')
             
         # Write Data
         # classifications index 0 corresponds to data_start_row
@@ -81,17 +109,77 @@ class ExcelHandler:
             for col_offset, value in enumerate(values):
                 cell = ws.cell(row=row_idx, column=start_col + col_offset)
                 cell.value = value
-                cell.alignment = openpyxl.styles.Alignment(wrap_text=True, vertical='center')
+                cell.alignment = Alignment(wrap_text=True, vertical='center')
 
-        # Save
-        wb.save(output_file_path)
-        wb.close()
+        return wb
+
+    @staticmethod
+    def write_results_streaming(
+        original_file_path: str,
+        output_file_path: str,
+        classifications: List[Dict[str, str]],
+        sheet_name: str = "일보_Worst55"
+    ) -> str:
+        """
+        constant_memory 모드로 결과 파일 작성
+        
+        원본은 read-only 모드로 한 행씩 읽고, xlsxwriter로 한 행씩 기록하므로
+        시트 크기와 무관하게 메모리 사용량이 일정함.
+        셀 값만 복사하며 서식/병합은 유지되지 않음
+        """
+        import openpyxl
+        from .result_writers import XlsxStreamResultWriter, RESULT_COLUMNS
+        
+        header_row = 3
+        data_start_row = 4
+        
+        wb = openpyxl.load_workbook(original_file_path, read_only=True)
+        try:
+            if sheet_name in wb.sheetnames:
+                ws = wb[sheet_name]
+            else:
+                ws = wb.worksheets[0]
+            
+            # dimension 정보가 없는 파일은 한 번 훑어서 최대 컬럼 계산
+            max_column = ws.max_column
+            if not max_column:
+                max_column = max((len(row) for row in ws.iter_rows(values_only=True)), default=0)
+            
+            with XlsxStreamResultWriter(output_file_path, sheet_name=ws.title) as writer:
+                row_idx = 0
+                for row_idx, values in enumerate(ws.iter_rows(values_only=True), start=1):
+                    writer.write_row_at(row_idx - 1, 0, values)
+                    if row_idx == header_row:
+                        writer.write_row_at(row_idx - 1, max_column, RESULT_COLUMNS, style="header")
+                    elif row_idx >= data_start_row and row_idx - data_start_row < len(classifications):
+                        result = classifications[row_idx - data_start_row]
+                        writer.write_row_at(
+                            row_idx - 1,
+                            max_column,
+                            [result.get(column, "") for column in RESULT_COLUMNS],
+                            style="wrap"
+                        )
+                
+                # 시트보다 결과가 많은 경우 (빈 행이 잘린 경우) 나머지 기록
+                if row_idx < header_row:
+                    writer.write_row_at(header_row - 1, max_column, RESULT_COLUMNS, style="header")
+                    row_idx = header_row
+                for i in range(max(0, row_idx - data_start_row + 1), len(classifications)):
+                    result = classifications[i]
+                    writer.write_row_at(
+                        data_start_row + i - 1,
+                        max_column,
+                        [result.get(column, "") for column in RESULT_COLUMNS],
+                        style="wrap"
+                    )
+        finally:
+            wb.close()
         
         return output_file_path
 
     @staticmethod
     def write_excel(
-        df: pl.DataFrame,
+        df: "pl.DataFrame",
         file_path: str,
         sheet_name: str = "일보_Worst55"
     ) -> str:
@@ -114,9 +202,9 @@ class ExcelHandler:
     
     @staticmethod
     def add_classification_columns(
-        df: pl.DataFrame,
+        df: "pl.DataFrame",
         classifications: List[Dict[str, str]]
-    ) -> pl.DataFrame:
+    ) -> "pl.DataFrame":
         """
         분류 결과를 DataFrame에 추가
         
@@ -127,6 +215,8 @@ class ExcelHandler:
         Returns:
             분류 컬럼이 추가된 DataFrame
         """
+        import polars as pl
+        
         # 분류 결과를 Series로 변환
         불량명_list = [c.get("불량명", "") for c in classifications]
         설비명_list = [c.get("설비명", "") for c in classifications]
@@ -143,7 +233,7 @@ class ExcelHandler:
     
     @staticmethod
     def get_column_values(
-        df: pl.DataFrame,
+        df: "pl.DataFrame",
         column_name: str
     ) -> List[Optional[str]]:
         """
@@ -1,11 +1,21 @@
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 from fastapi import UploadFile
 import shutil
+import zipfile
 
 
 ALLOWED_EXTENSIONS = {'.xlsx', '.xls', '.pptx', '.xlsb'}
+ARCHIVE_EXTENSIONS = {'.zip'}
+# 전처리 파이프라인이 읽을 수 있는 형식 (CLI 일괄 분류 / 폴더 감시 대상)
+REPORT_EXTENSIONS = {'.xlsx', '.xlsb'}
+# 업로드 저장 시 한 번에 복사하는 크기
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """업로드 파일 또는 ZIP 압축 해제 결과가 허용 크기/항목 수를 넘음"""
 
 
 def is_allowed_file(filename: str) -> bool:
@@ -13,12 +23,42 @@ def is_allowed_file(filename: str) -> bool:
     return Path(filename).suffix.lower() in ALLOWED_EXTENSIONS
 
 
-async def save_upload_file(upload_file: UploadFile, destination: Path) -> Path:
-    """Save uploaded file to destination"""
+def is_report_workbook(path: Path) -> bool:
+    """일괄 분류 대상 파일인지 (엑셀 잠금 파일 ~$*, 전처리 결과 processed_* 제외)"""
+    return (
+        path.suffix.lower() in REPORT_EXTENSIONS
+        and not path.name.startswith(("~$", "processed_"))
+    )
+
+
+def is_archive_file(filename: str) -> bool:
+    """Check if file is a ZIP archive"""
+    return Path(filename).suffix.lower() in ARCHIVE_EXTENSIONS
+
+
+async def save_upload_file(upload_file: UploadFile, destination: Path, max_size: Optional[int] = None) -> Path:
+    """
+    Save uploaded file to destination
+
+    max_size를 넘으면 저장하던 파일을 지우고 UploadTooLargeError 발생
+    """
+    written = 0
     try:
         with destination.open("wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
+            while True:
+                chunk = upload_file.file.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_size is not None and written > max_size:
+                    raise UploadTooLargeError(
+                        f"파일 크기가 허용 한도({max_size} bytes)를 넘습니다: {upload_file.filename}"
+                    )
+                buffer.write(chunk)
         return destination
+    except UploadTooLargeError:
+        destination.unlink(missing_ok=True)
+        raise
     finally:
         upload_file.file.close()
 
@@ -32,7 +72,75 @@ def create_unique_filename(original_filename: str, directory: Path) -> Path:
     ext = Path(original_filename).suffix
     
     unique_filename = f"{name}_{timestamp}{ext}"
-    return directory / unique_filename
+    candidate = directory / unique_filename
+    
+    # 같은 초에 같은 이름이 들어오는 경우 (배치 업로드) 번호를 붙여 충돌 방지
+    counter = 1
+    while candidate.exists():
+        candidate = directory / f"{name}_{timestamp}_{counter}{ext}"
+        counter += 1
+    return candidate
+
+
+def extract_archive(
+    archive_path: Path,
+    directory: Path,
+    max_total_size: Optional[int] = None,
+    max_members: Optional[int] = None
+) -> List[Tuple[str, Path]]:
+    """
+    ZIP 파일에서 허용된 엑셀 파일만 추출
+    
+    폴더 구조는 무시하고 파일명만 사용하며 (경로 조작 방지),
+    macOS 메타데이터(__MACOSX, ._*)는 건너뜀.
+    추출 전에 항목 수와 추출할 파일의 압축 해제 크기 합계(ZipInfo.file_size)를
+    확인하여 한도를 넘으면 아무것도 추출하지 않고 UploadTooLargeError 발생
+    (zipfile은 file_size보다 많이 풀지 않으므로 헤더를 속인 ZIP도 한도를 넘지 않음)
+    
+    Returns:
+        (ZIP 내 원본 파일명, 추출된 경로) 리스트
+    """
+    extracted = []
+    with zipfile.ZipFile(archive_path) as archive:
+        members = archive.infolist()
+        if max_members is not None and len(members) > max_members:
+            raise UploadTooLargeError(
+                f"ZIP 항목 수가 허용 한도({max_members}개)를 넘습니다: {len(members)}개"
+            )
+        
+        selected = []
+        total_size = 0
+        for member in members:
+            if member.is_dir():
+                continue
+            
+            member_path = _decode_member_name(member)
+            member_name = Path(member_path).name
+            if member_path.startswith("__MACOSX") or member_name.startswith("._"):
+                continue
+            if not is_allowed_file(member_name):
+                continue
+            
+            total_size += member.file_size
+            if max_total_size is not None and total_size > max_total_size:
+                raise UploadTooLargeError(
+                    f"ZIP 압축 해제 크기가 허용 한도({max_total_size} bytes)를 넘습니다: {member_name}"
+                )
+            selected.append((member, member_name))
+        
+        try:
+            for member, member_name in selected:
+                destination = create_unique_filename(member_name, directory)
+                extracted.append((member_name, destination))
+                with archive.open(member) as source, destination.open("wb") as target:
+                    shutil.copyfileobj(source, target)
+        except Exception:
+            # 손상된 ZIP (CRC 불일치 등)이면 이미 추출한 파일 정리
+            for _, path in extracted:
+                path.unlink(missing_ok=True)
+            raise
+    
+    return extracted
 
 
 def cleanup_file(file_path: str) -> bool:
@@ -44,3 +152,13 @@ def cleanup_file(file_path: str) -> bool:
         return False
     except Exception:
         return False
+
+
+def _decode_member_name(member: zipfile.ZipInfo) -> str:
+    """Windows 탐색기로 만든 ZIP은 UTF-8 플래그 없이 cp949로 파일명을 저장함"""
+    if member.flag_bits & 0x800:
+        return member.filename
+    try:
+        return member.filename.encode("cp437").decode("cp949")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return member.filename
@@ -0,0 +1,140 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+
+
+# 브라우저가 캐시된 응답을 쓰기 전에 항상 ETag로 재검증하도록 함
+REVALIDATE = "no-cache"
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 비교 (weak 비교: W/ 접두어 무시, * 허용)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque(candidate.strip()) == _opaque(etag) for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE, **(headers or {})})
+
+
+def cached_json(request: Request, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    JSON 응답에 본문 해시로 만든 weak ETag를 붙이고, If-None-Match가 같으면 304 반환
+
+    폴링하는 클라이언트는 바뀐 내용이 없으면 본문 없이 304만 받음
+    (DB 조회/직렬화는 그대로 하지만 전송과 클라이언트 파싱이 생략됨)
+    """
+    response = JSONResponse(jsonable_encoder(content), headers=headers)
+    etag = f'W/"{hashlib.sha256(response.body).hexdigest()[:32]}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag, headers)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE
+    return response
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    단일 바이트 범위 Range 헤더 해석
+
+    Returns:
+        (start, end) 포함 범위, 헤더가 없거나 여러 범위/잘못된 형식이면 None (전체 응답)
+
+    Raises:
+        ValueError: 파일 크기를 벗어난 범위 (416)
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    first, last = (part.strip() for part in spec.split("-", 1))
+    if not first:
+        # bytes=-500: 마지막 500바이트
+        if not last.isdigit():
+            return None
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("범위가 파일 크기를 벗어남")
+        return max(0, size - length), size - 1
+
+    if not first.isdigit() or (last and not last.isdigit()):
+        return None
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and start > end:
+        return None
+    if start >= size:
+        raise ValueError("범위가 파일 크기를 벗어남")
+    return start, min(end, size - 1)
+
+
+def iter_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    """파일의 [start, end] 범위를 청크 단위로 읽기 (StreamingResponse가 스레드에서 실행)"""
+    remaining = end - start + 1
+    with open(path, "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(
+    request: Request,
+    path: Path,
+    etag: str,
+    filename: str,
+    media_type: str
+) -> Response:
+    """
+    strong ETag와 Range 요청을 지원하는 파일 응답
+
+    - If-None-Match가 같으면 304
+    - Range(단일 범위)면 206, 파일 크기를 벗어나면 416
+    - If-Range가 현재 ETag와 다르면 (파일이 바뀜) Range를 무시하고 전체 전송
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    size = os.stat(path).st_size
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": REVALIDATE}
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            return StreamingResponse(
+                iter_file_range(path, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers={
+                    **headers,
+                    "Content-Range": f"bytes {start}-{end}/{size}",
+                    "Content-Length": str(end - start + 1),
+                    "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+                }
+            )
+
+    return FileResponse(path=str(path), filename=filename, media_type=media_type, headers=headers)
@@ -0,0 +1,171 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .artifact_store import materialize
+from .excel_handler import ExcelHandler
+from .issue_normalizer import IssueNormalizer
+from .tracing import record_event
+from ..models import ClassificationHistory
+
+if TYPE_CHECKING:
+    import polars as pl
+
+
+RESULT_COLUMNS = ["불량명", "설비명", "조치내용"]
+
+
+def compute_row_keys(df: "pl.DataFrame", column_name: str) -> List[str]:
+    """
+    행 매칭 키 계산
+
+    Issue 컬럼 왼쪽의 그룹 키 컬럼(모델, 라인 등)과 정리된 Issue 텍스트(IssueNormalizer)를
+    묶어 해시. 전처리된 파일과 그 결과 파일은 왼쪽 컬럼 구성이 같으므로 같은 키가 나오며,
+    공백/중복 줄/상용구만 다른 Issue도 같은 키가 됨
+    """
+    if column_name not in df.columns:
+        raise ValueError(f"Column '{column_name}' not found in DataFrame")
+
+    key_columns = df.columns[: df.columns.index(column_name)]
+    normalizer = IssueNormalizer()
+    keys = []
+    for row in df.select(key_columns + [column_name]).iter_rows():
+        normalized = ["" if v is None else str(v).strip() for v in row[:-1]]
+        normalized.append(normalizer.normalize(row[-1]))
+        digest = hashlib.sha1(
+            json.dumps(normalized, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        keys.append(digest)
+    return keys
+
+
+def read_result_columns(
+    result_path: str,
+    sheet_name: str,
+    header_row: int = 3,
+    data_start_row: int = 4
+) -> List[Dict[str, str]]:
+    """
+    결과 파일에서 분류 결과 컬럼만 읽음 (read-only)
+
+    append_results_to_file과 같은 배치(3행 헤더, 4행부터 결과)를 가정하며,
+    반환 리스트의 i번째는 분류 당시 classifications[i]에 해당함
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(result_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.worksheets[0]
+        rows = ws.iter_rows(min_row=header_row, values_only=True)
+        header = next(rows, None) or ()
+
+        # 결과 컬럼은 맨 뒤에 추가되므로 마지막으로 나오는 위치 사용
+        positions = {}
+        for idx, name in enumerate(header):
+            if name in RESULT_COLUMNS:
+                positions[name] = idx
+        if len(positions) != len(RESULT_COLUMNS):
+            return []
+
+        results = []
+        for row in ws.iter_rows(min_row=data_start_row, values_only=True):
+            results.append({
+                name: "" if idx >= len(row) or row[idx] is None else str(row[idx])
+                for name, idx in positions.items()
+            })
+        return results
+    finally:
+        wb.close()
+
+
+def load_baseline_results(
+    baseline: ClassificationHistory
+) -> Dict[str, Dict[str, str]]:
+    """
+    기준 작업의 원본 파일과 결과 파일로 {행 키: 분류 결과} 해시 테이블 생성
+
+    키는 원본 파일의 행에서, 결과는 결과 파일의 같은 인덱스에서 가져옴.
+    Issue가 비어있거나 결과가 모두 빈 행(실패)은 제외하여 다시 분류되도록 함
+    """
+    if not Path(baseline.file_path).exists() or not Path(baseline.result_path).exists():
+        return {}
+
+    # 저장소에서 압축된 파일은 임시로 풀어서 읽음
+    with materialize(baseline.file_path) as source_path:
+        df = ExcelHandler.read_excel(str(source_path), baseline.sheet_name)
+    if baseline.column_name not in df.columns:
+        return {}
+
+    keys = compute_row_keys(df, baseline.column_name)
+    issues = df[baseline.column_name].to_list()
+    with materialize(baseline.result_path) as result_path:
+        results = read_result_columns(str(result_path), baseline.sheet_name)
+
+    table = {}
+    for key, issue, result in zip(keys, issues, results):
+        if ExcelHandler.is_empty_value(issue):
+            continue
+        if any(result.values()):
+            table[key] = result
+    return table
+
+
+def find_baseline_history(
+    db: Session,
+    sheet_name: str,
+    column_name: str,
+    baseline_history_id: Optional[int] = None,
+    exclude_id: Optional[int] = None
+) -> Optional[ClassificationHistory]:
+    """
+    기준 이력 조회
+
+    baseline_history_id가 없으면 같은 시트/컬럼의 가장 최근 완료 작업을 사용
+    """
+    query = db.query(ClassificationHistory).filter(
+        ClassificationHistory.status == "completed",
+        ClassificationHistory.result_path.isnot(None)
+    )
+    if baseline_history_id is not None:
+        return query.filter(ClassificationHistory.id == baseline_history_id).first()
+
+    query = query.filter(
+        ClassificationHistory.sheet_name == sheet_name,
+        ClassificationHistory.column_name == column_name
+    )
+    if exclude_id is not None:
+        query = query.filter(ClassificationHistory.id != exclude_id)
+
+    for history in query.order_by(ClassificationHistory.created_at.desc(), ClassificationHistory.id.desc()).limit(5):
+        if Path(history.result_path).exists() and Path(history.file_path).exists():
+            return history
+    return None
+
+
+def plan_incremental(
+    df: "pl.DataFrame",
+    column_name: str,
+    baseline: ClassificationHistory
+) -> Dict[int, Dict[str, str]]:
+    """
+    기준 결과와 해시 조인하여 재사용할 행 계산
+
+    기준 결과로 해시 테이블을 만들고(build), 새 파일의 각 행 키로 조회(probe)
+
+    Returns:
+        {행 인덱스: 재사용할 분류 결과}
+    """
+    table = load_baseline_results(baseline)
+    if not table:
+        return {}
+
+    reused = {}
+    for idx, key in enumerate(compute_row_keys(df, column_name)):
+        result = table.get(key)
+        if result is not None:
+            reused[idx] = dict(result)
+    record_event("incremental_reuse", "cache", baseline_history_id=baseline.id, rows=len(df), hits=len(reused))
+    return reused
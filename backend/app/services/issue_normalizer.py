@@ -0,0 +1,120 @@
+import re
+from typing import Any, Dict, Iterable, Optional
+
+from .excel_handler import ExcelHandler
+from ..config import settings
+
+
+_WHITESPACE = re.compile(r"\s+")
+TRUNCATION_MARK = "…"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 추정 (토크나이저 없이)
+
+    한글 등 비ASCII 문자는 문자당 1토큰, ASCII는 4문자당 1토큰으로 계산
+    """
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_chars = len(text) - non_ascii
+    return non_ascii + (ascii_chars + 3) // 4
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """추정 토큰 수가 budget 이하가 되도록 앞부분만 남김 (잘렸으면 끝에 … 표시)"""
+    if budget <= 0 or estimate_tokens(text) <= budget:
+        return text
+    cost = 0.0
+    for idx, ch in enumerate(text):
+        cost += 1 if ord(ch) > 127 else 0.25
+        if cost > budget - 1:
+            return text[:idx].rstrip() + TRUNCATION_MARK
+    return text
+
+
+class IssueNormalizer:
+    """
+    LLM에 보내기 전 Issue 텍스트 정리
+
+    consolidate_issue_column이 여러 행을 줄바꿈으로 합친 텍스트에서
+    - 줄마다 연속 공백을 하나로 줄이고 앞뒤 공백 제거
+    - 설정된 상용구 패턴(정규식) 제거 후 빈 줄 삭제
+    - 그룹 안에서 완전히 같은 줄은 처음 한 번만 유지
+    - 추정 토큰 수가 예산을 넘으면 뒷부분 절단
+
+    정리된 텍스트는 프롬프트에 들어가고, 작업 내 중복 제거/결과 재사용과
+    증분 분류의 행 키로도 사용됨 (공백/상용구만 다른 Issue는 같은 Issue로 취급)
+    """
+
+    def __init__(
+        self,
+        boilerplate_pattern: Optional[str] = None,
+        token_budget: Optional[int] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Args:
+            boilerplate_pattern: 줄에서 제거할 정규식 (기본값: settings.issue_boilerplate_pattern)
+            token_budget: Issue 하나의 최대 추정 토큰 수, 0이면 미적용 (기본값: settings.issue_token_budget)
+            enabled: False면 앞뒤 공백만 제거 (기본값: settings.issue_normalize)
+        """
+        pattern = settings.issue_boilerplate_pattern if boilerplate_pattern is None else boilerplate_pattern
+        self.boilerplate = re.compile(pattern) if pattern else None
+        self.token_budget = settings.issue_token_budget if token_budget is None else token_budget
+        self.enabled = settings.issue_normalize if enabled is None else enabled
+        self._cache: Dict[str, str] = {}
+
+    def normalize(self, value: Any) -> str:
+        """정리된 Issue 텍스트 (빈 값이거나 상용구뿐이면 "")"""
+        if ExcelHandler.is_empty_value(value):
+            return ""
+        text = str(value)
+        normalized = self._cache.get(text)
+        if normalized is None:
+            normalized = self._normalize(text)
+            self._cache[text] = normalized
+        return normalized
+
+    def _normalize(self, text: str) -> str:
+        if not self.enabled:
+            return text.strip()
+
+        lines = []
+        seen = set()
+        for line in text.splitlines():
+            if self.boilerplate is not None:
+                line = self.boilerplate.sub("", line)
+            line = _WHITESPACE.sub(" ", line).strip()
+            if not line or line in seen:
+                continue
+            seen.add(line)
+            lines.append(line)
+        return truncate_to_tokens("\n".join(lines), self.token_budget)
+
+    def token_stats(self, values: Iterable[Any]) -> Dict[str, int]:
+        """
+        작업의 Issue 토큰 절감량
+
+        원문 그대로 보냈을 때(같은 원문은 한 번)와 정리 후 실제로 보내는 텍스트
+        (같은 정리 결과는 한 번)의 추정 토큰 수 비교
+
+        Returns:
+            {"issue_tokens": 원문 기준, "prompt_tokens": 정리 후, "tokens_saved": 차이}
+        """
+        raw_texts = set()
+        normalized_texts = set()
+        for value in values:
+            if ExcelHandler.is_empty_value(value):
+                continue
+            raw_texts.add(str(value))
+            normalized = self.normalize(value)
+            if normalized:
+                normalized_texts.add(normalized)
+
+        issue_tokens = sum(estimate_tokens(text) for text in raw_texts)
+        prompt_tokens = sum(estimate_tokens(text) for text in normalized_texts)
+        return {
+            "issue_tokens": issue_tokens,
+            "prompt_tokens": prompt_tokens,
+            "tokens_saved": issue_tokens - prompt_tokens,
+        }
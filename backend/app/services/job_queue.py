@@ -0,0 +1,145 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import ClassificationHistory, JobLease
+
+
+class LeasedJob:
+    """워커가 임대한 작업 (세션과 분리된 값만 보관)"""
+
+    __slots__ = ("id", "history_id", "kind", "payload", "lease_token", "attempts")
+
+    def __init__(self, job: JobLease, lease_token: str):
+        self.id = job.id
+        self.history_id = job.history_id
+        self.kind = job.kind
+        self.payload: Dict[str, Any] = json.loads(job.payload)
+        self.lease_token = lease_token
+        self.attempts = job.attempts
+
+
+def enqueue_job(db: Session, history: ClassificationHistory, payload: Dict[str, Any], kind: str = "classify") -> JobLease:
+    """이력을 대기 상태로 두고 작업 추가 (커밋은 호출자가 수행)"""
+    history.status = "queued"
+    job = JobLease(history_id=history.id, kind=kind, payload=json.dumps(payload, ensure_ascii=False))
+    db.add(job)
+    return job
+
+
+def _claimable(now: datetime):
+    # 대기 중이거나, 임대했던 워커가 만료 시각까지 연장하지 못한 작업
+    return or_(
+        JobLease.status == "queued",
+        and_(JobLease.status == "leased", JobLease.expires_at < now),
+    )
+
+
+def claim_job(
+    db: Session,
+    worker_id: str,
+    lease_seconds: Optional[int] = None,
+    now: Optional[datetime] = None,
+    candidates: int = 5
+) -> Optional[LeasedJob]:
+    """
+    가져갈 수 있는 작업 하나를 임대
+
+    후보를 조회한 뒤 같은 조건을 건 UPDATE로 한 건씩 선점(compare-and-set)하므로
+    여러 프로세스/호스트의 워커가 같은 DB를 써도 한 작업은 한 워커만 가져감.
+    SQLite에서 읽기 트랜잭션을 쓰기로 올리면 다른 커밋과 충돌할 수 있으므로
+    후보 조회 트랜잭션은 닫고 UPDATE를 새 트랜잭션에서 실행
+    """
+    now = now or datetime.utcnow()
+    lease_seconds = lease_seconds or settings.job_lease_seconds
+    ids = [
+        job_id for (job_id,) in db.query(JobLease.id)
+        .filter(_claimable(now))
+        .order_by(JobLease.id)
+        .limit(candidates)
+    ]
+    db.rollback()
+
+    for job_id in ids:
+        token = uuid.uuid4().hex
+        claimed = db.execute(
+            update(JobLease)
+            .where(JobLease.id == job_id, _claimable(now))
+            .values(
+                status="leased",
+                worker_id=worker_id,
+                lease_token=token,
+                attempts=JobLease.attempts + 1,
+                leased_at=now,
+                heartbeat_at=now,
+                expires_at=now + timedelta(seconds=lease_seconds),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if claimed != 1:
+            # 다른 워커가 먼저 가져감
+            continue
+
+        return LeasedJob(db.get(JobLease, job_id), token)
+    return None
+
+
+def heartbeat_job(db: Session, job: LeasedJob, lease_seconds: Optional[int] = None, now: Optional[datetime] = None) -> bool:
+    """
+    임대 연장
+
+    Returns:
+        False면 임대를 잃음 (만료되어 다른 워커가 가져감 / 작업 삭제) → 실행을 중단해야 함
+    """
+    now = now or datetime.utcnow()
+    lease_seconds = lease_seconds or settings.job_lease_seconds
+    renewed = db.execute(
+        update(JobLease)
+        .where(JobLease.id == job.id, JobLease.lease_token == job.lease_token)
+        .values(heartbeat_at=now, expires_at=now + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return renewed == 1
+
+
+def complete_job(db: Session, job: LeasedJob) -> bool:
+    """작업 완료 (성공/실패 결과는 이력에 기록되어 있으므로 임대 행만 삭제)"""
+    deleted = db.execute(
+        delete(JobLease)
+        .where(JobLease.id == job.id, JobLease.lease_token == job.lease_token)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return deleted == 1
+
+
+def release_job(db: Session, job: LeasedJob) -> bool:
+    """작업을 끝내지 않고 반납 (워커 종료 시, 다른 워커가 바로 가져갈 수 있음)"""
+    released = db.execute(
+        update(JobLease)
+        .where(JobLease.id == job.id, JobLease.lease_token == job.lease_token)
+        .values(status="queued", worker_id=None, lease_token=None, expires_at=None, attempts=JobLease.attempts - 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return released == 1
+
+
+def fail_job(db: Session, job: LeasedJob, message: str) -> bool:
+    """실행하지 않고 실패 처리 (이력을 failed로 기록하고 임대 행 삭제)"""
+    if not complete_job(db, job):
+        return False
+    history = db.get(ClassificationHistory, job.history_id)
+    if history is not None:
+        history.status = "failed"
+        history.error_message = message
+        history.completed_at = datetime.utcnow()
+        db.commit()
+    return True
@@ -1,10 +1,14 @@
-from openai import OpenAI
 import json
 import os
 import random
-from typing import Dict, Optional, Tuple
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 import logging
 
+from .metrics import LLM_CALLS, LLM_CASCADE_ROWS, LLM_ESCALATIONS, stage_timer
+from .tracing import record_event
+from ..config import settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,16 +21,142 @@ MOCK_RESPONSES = [
     {"불량명": "색상 불량", "설비명": "믹서기 E-5", "조치내용": "원료 비율 재조정"},
 ]
 
+REQUIRED_KEYS = ["불량명", "설비명", "조치내용"]
+CONFIDENCE_KEY = "신뢰도"
+
+
+def parse_model_list(value: str) -> List[str]:
+    """쉼표로 구분된 모델 목록 ("local-7b,gpt-4o-mini")"""
+    return [model.strip() for model in value.split(",") if model.strip()]
+
+
+def parse_model_prices(value: str) -> Dict[str, float]:
+    """모델별 단가 ("local-7b=0,gpt-4o-mini=0.6", 1M 토큰당 USD)"""
+    prices = {}
+    for item in value.split(","):
+        model, sep, price = item.partition("=")
+        if not sep or not model.strip():
+            continue
+        try:
+            prices[model.strip()] = float(price)
+        except ValueError:
+            logger.warning("모델 단가 형식이 잘못되었습니다: %s", item)
+    return prices
+
+
+def cascade_models(model: str) -> List[str]:
+    """
+    행마다 순서대로 시도할 모델 목록
+
+    settings.llm_cascade_models(저렴한 모델부터)의 뒤에 사용자 설정 모델을
+    마지막(가장 강한) 단계로 붙임. 캐스케이드 설정이 없으면 사용자 설정 모델 하나
+    """
+    models = [m for m in parse_model_list(settings.llm_cascade_models) if m != model]
+    return models + [model]
+
+
+class CascadeUsage:
+    """
+    작업 하나의 캐스케이드 사용량 집계 (분류 스레드에서 동시에 기록하므로 lock 사용)
+
+    행마다 (Issue 내용, 호출 목록, 최종 모델, 에스컬레이션 사유)를 남기고,
+    summary()에서 모델별 호출/토큰/비용과 에스컬레이션 비율, 절감 비용을 계산함.
+    절감 비용은 같은 행을 처음부터 마지막 단계 모델로 한 번씩 호출했을 때의 비용
+    (첫 호출의 토큰 수 기준)과 실제 비용의 차이
+    """
+
+    def __init__(self, models: Sequence[str], prices: Optional[Dict[str, float]] = None):
+        self.models = list(models)
+        self.prices = parse_model_prices(settings.llm_model_prices) if prices is None else prices
+        self._rows: List[Tuple[str, List[Tuple[str, int]], Optional[str], List[str]]] = []
+        self._lock = threading.Lock()
+
+    def record_row(
+        self,
+        key: str,
+        calls: List[Tuple[str, int]],
+        final_model: Optional[str],
+        reasons: List[str]
+    ) -> None:
+        """
+        Args:
+            key: Issue 내용 (배치 작업에서 파일별로 나누어 집계할 때 사용)
+            calls: (모델, 토큰 수) 호출 목록 (재시도 포함)
+            final_model: 결과를 채택한 모델 (모든 단계 실패 시 None)
+            reasons: 다음 단계로 넘긴 사유 목록
+        """
+        with self._lock:
+            self._rows.append((key, calls, final_model, reasons))
+
+    def cost(self, model: str, tokens: int) -> float:
+        return tokens * self.prices.get(model, 0.0) / 1_000_000
+
+    def summary(self, keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        사용량 요약 (keys를 주면 해당 Issue 내용의 행만 집계)
+
+        Returns:
+            {"models", "rows", "escalated_rows", "escalation_rate", "escalations",
+             "by_model": {모델: {"calls", "rows", "tokens", "cost"}},
+             "cost", "baseline_cost", "cost_saved"}
+        """
+        keys = set(keys) if keys is not None else None
+        with self._lock:
+            rows = [row for row in self._rows if keys is None or row[0] in keys]
+
+        by_model = {model: {"calls": 0, "rows": 0, "tokens": 0, "cost": 0.0} for model in self.models}
+        escalations: Dict[str, int] = {}
+        escalated = 0
+        baseline_cost = 0.0
+        strongest = self.models[-1]
+        for _, calls, final_model, reasons in rows:
+            for model, tokens in calls:
+                usage = by_model.setdefault(model, {"calls": 0, "rows": 0, "tokens": 0, "cost": 0.0})
+                usage["calls"] += 1
+                usage["tokens"] += tokens
+                usage["cost"] += self.cost(model, tokens)
+            if final_model is not None:
+                by_model[final_model]["rows"] += 1
+            if reasons:
+                escalated += 1
+            for reason in reasons:
+                escalations[reason] = escalations.get(reason, 0) + 1
+            if calls:
+                baseline_cost += self.cost(strongest, calls[0][1])
+
+        cost = sum(usage["cost"] for usage in by_model.values())
+        for usage in by_model.values():
+            usage["cost"] = round(usage["cost"], 6)
+        return {
+            "models": self.models,
+            "rows": len(rows),
+            "escalated_rows": escalated,
+            "escalation_rate": round(escalated / len(rows), 4) if rows else 0.0,
+            "escalations": escalations,
+            "by_model": by_model,
+            "cost": round(cost, 6),
+            "baseline_cost": round(baseline_cost, 6),
+            "cost_saved": round(baseline_cost - cost, 6),
+        }
+
 
 class LLMClassifier:
-    """LLM을 사용한 분류 서비스"""
+    """
+    LLM을 사용한 분류 서비스
+
+    모델이 여러 개면 (settings.llm_cascade_models) 행마다 저렴한 모델부터 시도하고,
+    JSON 검증 실패 / 모든 필드가 빈 값 / 자체 신뢰도가 기준 미만이면 다음 모델로 넘김.
+    마지막 모델은 재시도(max_retries)까지 하고 형식만 맞으면 결과를 채택함
+    """
     
     def __init__(
         self,
         api_key: str,
         base_url: str = "https://api.openai.com/v1",
         model: str = "gpt-4o-mini",
-        mock_mode: bool = False
+        mock_mode: bool = False,
+        models: Optional[Sequence[str]] = None,
+        confidence_threshold: Optional[float] = None
     ):
         """
         LLM Classifier 초기화
@@ -34,11 +164,16 @@ class LLMClassifier:
         Args:
             api_key: OpenAI API 키
             base_url: API Base URL
-            model: 사용할 모델명
+            model: 사용할 모델명 (캐스케이드의 마지막 단계)
             mock_mode: Mock 모드 사용 여부
+            models: 시도할 모델 순서 (기본값: cascade_models(model))
+            confidence_threshold: 중간 단계 결과를 채택하는 최소 신뢰도
+                (기본값: settings.llm_cascade_confidence)
         """
         self.mock_mode = mock_mode
         if not mock_mode:
+            # openai 패키지는 import 비용이 커서 실제 호출이 필요할 때 로드
+            from openai import OpenAI
             self.client = OpenAI(
                 api_key=api_key,
                 base_url=base_url
@@ -46,6 +181,15 @@ class LLMClassifier:
         else:
             self.client = None
         self.model = model
+        self.models = list(models) if models else cascade_models(model)
+        self.confidence_threshold = (
+            settings.llm_cascade_confidence if confidence_threshold is None else confidence_threshold
+        )
+        self.usage = CascadeUsage(self.models)
+    
+    @property
+    def is_cascade(self) -> bool:
+        return len(self.models) > 1
     
     def classify(
         self,
@@ -61,59 +205,131 @@ class LLMClassifier:
             issue_content: 분류할 Issue 내용
             prompt: 사용자 정의 프롬프트
             few_shot_examples: Few-shot learning 예제
-            max_retries: JSON 파싱 실패 시 최대 재시도 횟수
+            max_retries: JSON 파싱 실패 시 최대 재시도 횟수 (마지막 단계 모델 기준,
+                중간 단계는 한 번만 호출하고 실패하면 다음 모델로 넘김)
             
         Returns:
             (분류 결과 dict, 성공 여부)
             분류 결과: {"불량명": "", "설비명": "", "조치내용": ""}
         """
-        # Mock 모드일 때 랜덤 응답 반환
-        if self.mock_mode:
-            import time
-            time.sleep(0.2)  # 실제 API 호출처럼 약간의 딜레이
-            mock_response = random.choice(MOCK_RESPONSES).copy()
-            logger.info(f"[MOCK] 분류 결과: {mock_response}")
-            return mock_response, True
-        
         # 전체 프롬프트 구성
         system_prompt = self._build_system_prompt(few_shot_examples)
         user_message = f"{prompt}\n\nIssue 내용: {issue_content}"
         
-        for attempt in range(max_retries):
-            try:
-                # OpenAI API 호출
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_message}
-                    ],
-                    temperature=0.3,
-                    response_format={"type": "json_object"}
-                )
-                
-                # 응답 추출
-                content = response.choices[0].message.content
-                
-                # JSON 파싱
-                result = json.loads(content)
-                
-                # 필수 키 검증
-                if self._validate_result(result):
-                    return result, True
-                else:
-                    logger.warning(f"Invalid result format (attempt {attempt + 1}/{max_retries}): {result}")
-                    
-            except json.JSONDecodeError as e:
-                logger.warning(f"JSON parsing failed (attempt {attempt + 1}/{max_retries}): {e}")
-            except Exception as e:
-                logger.error(f"Classification failed (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
-                    return None, False
+        calls: List[Tuple[str, int]] = []
+        reasons: List[str] = []
+        for tier, model in enumerate(self.models):
+            last = tier == len(self.models) - 1
+            result, outcome = self._classify_with(
+                model, system_prompt, user_message, max_retries if last else 1, calls
+            )
+            if outcome == "success" or (last and result is not None):
+                self.usage.record_row(issue_content, calls, model, reasons)
+                if self.is_cascade:
+                    LLM_CASCADE_ROWS.labels(model).inc()
+                return result, True
+            if last:
+                break
+            
+            reasons.append(outcome)
+            LLM_ESCALATIONS.labels(model, outcome).inc()
+            record_event("escalate", "cascade", model=model, reason=outcome)
+            logger.debug("다음 모델로 넘김 (%s → %s): %s", model, self.models[tier + 1], outcome)
         
         # 모든 재시도 실패
+        self.usage.record_row(issue_content, calls, None, reasons)
         return None, False
     
+    def _classify_with(
+        self,
+        model: str,
+        system_prompt: str,
+        user_message: str,
+        max_retries: int,
+        calls: List[Tuple[str, int]]
+    ) -> Tuple[Optional[Dict[str, str]], str]:
+        """
+        모델 하나로 분류 (형식 오류/API 오류면 max_retries까지 재시도)
+        
+        Returns:
+            (형식이 맞는 결과 또는 None, 결과)
+            결과: success, mock, empty, low_confidence, invalid_format, json_error, api_error
+        """
+        outcome = "api_error"
+        for attempt in range(max_retries):
+            result = None
+            # 시도마다 소요 시간과 결과를 지표/작업 트레이스에 기록
+            with stage_timer("llm_call", attempt=attempt + 1, model=model) as call:
+                try:
+                    content, tokens = self._request(model, system_prompt, user_message)
+                    calls.append((model, tokens))
+                    
+                    # JSON 파싱
+                    result = json.loads(content)
+                    
+                    # 필수 키 검증
+                    if not self._validate_result(result):
+                        call["outcome"] = "invalid_format"
+                        logger.warning("Invalid result format (%s, attempt %d/%d): %s", model, attempt + 1, max_retries, result)
+                    else:
+                        confidence = result.pop(CONFIDENCE_KEY, None)
+                        if not any(str(result[key]).strip() for key in REQUIRED_KEYS):
+                            call["outcome"] = "empty"
+                        elif self.is_cascade and not self._is_confident(confidence):
+                            call["outcome"] = "low_confidence"
+                        else:
+                            call["outcome"] = "mock" if self.mock_mode else "success"
+                        
+                except json.JSONDecodeError as e:
+                    call["outcome"] = "json_error"
+                    logger.warning("JSON parsing failed (%s, attempt %d/%d): %s", model, attempt + 1, max_retries, e)
+                except Exception as e:
+                    call["outcome"] = "api_error"
+                    logger.error("Classification failed (%s, attempt %d/%d): %s", model, attempt + 1, max_retries, e)
+            
+            outcome = call["outcome"]
+            LLM_CALLS.labels(outcome).inc()
+            if outcome in ("success", "mock"):
+                return result, "success"
+            if outcome in ("empty", "low_confidence"):
+                # 형식은 맞으므로 같은 모델로 재시도하지 않음
+                return result, outcome
+        
+        return None, outcome
+    
+    def _request(self, model: str, system_prompt: str, user_message: str) -> Tuple[str, int]:
+        """모델 호출 후 (응답 내용, 사용 토큰 수) 반환"""
+        if self.mock_mode:
+            # Mock 모드일 때 랜덤 응답 반환 (캐스케이드면 신뢰도도 랜덤)
+            import time
+            time.sleep(0.2)  # 실제 API 호출처럼 약간의 딜레이
+            mock_response = random.choice(MOCK_RESPONSES).copy()
+            if self.is_cascade:
+                mock_response[CONFIDENCE_KEY] = round(random.uniform(0.5, 1.0), 2)
+            logger.debug("[MOCK] 분류 결과 (%s): %s", model, mock_response)
+            return json.dumps(mock_response, ensure_ascii=False), 0
+        
+        # OpenAI API 호출
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        )
+        usage = getattr(response, "usage", None)
+        tokens = getattr(usage, "total_tokens", None) or 0
+        return response.choices[0].message.content, tokens
+    
+    def _is_confident(self, confidence: Any) -> bool:
+        """자체 신뢰도 기준 충족 여부 (없거나 숫자가 아니면 낮은 것으로 간주)"""
+        try:
+            return float(confidence) >= self.confidence_threshold
+        except (TypeError, ValueError):
+            return False
+    
     def _build_system_prompt(self, few_shot_examples: Optional[str] = None) -> str:
         """시스템 프롬프트 구성"""
         base_prompt = """당신은 제조 현장의 일보를 분석하는 전문가입니다.
@@ -127,6 +343,13 @@ Issue 내용을 분석하여 다음 정보를 JSON 형식으로 추출해야 합
 
 정보를 추출할 수 없는 경우 빈 문자열("")을 사용하세요."""
         
+        if self.is_cascade:
+            # 캐스케이드에서 다음 모델로 넘길지 판단하는 데 사용 (결과에서는 제거)
+            base_prompt += """
+
+추출 결과에 대한 확신 정도를 0~1 사이 숫자로 "신뢰도" 키에 함께 포함하세요.
+예: {"불량명": "...", "설비명": "...", "조치내용": "...", "신뢰도": 0.9}"""
+        
         if few_shot_examples:
             base_prompt += f"\n\n### 예제:\n{few_shot_examples}"
         
@@ -134,5 +357,4 @@ Issue 내용을 분석하여 다음 정보를 JSON 형식으로 추출해야 합
     
     def _validate_result(self, result: Dict) -> bool:
         """분류 결과 검증"""
-        required_keys = ["불량명", "설비명", "조치내용"]
-        return all(key in result for key in required_keys)
+        return isinstance(result, dict) and all(key in result for key in REQUIRED_KEYS)
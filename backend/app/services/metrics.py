@@ -0,0 +1,160 @@
+import functools
+import time
+from typing import Any, Callable, Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from .profiling import start_thread_profile, stop_thread_profile
+from .tracing import record_span
+
+
+# 파일 단위 단계(엑셀 읽기/쓰기, 전처리)는 수 초~수십 초, LLM 호출은 수백 ms~수 초
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "dailyreport_stage_duration_seconds",
+    "처리 단계별 소요 시간",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "dailyreport_http_request_duration_seconds",
+    "HTTP 요청 처리 시간 (라우트 경로 템플릿 기준)",
+    ["method", "route", "status"],
+)
+LLM_CALLS = Counter(
+    "dailyreport_llm_calls_total",
+    "LLM 호출 수 (재시도 포함, 결과별)",
+    ["outcome"],
+)
+LLM_ESCALATIONS = Counter(
+    "dailyreport_llm_escalations_total",
+    "캐스케이드에서 다음 모델로 넘긴 횟수 (넘긴 모델/사유별)",
+    ["model", "reason"],
+)
+LLM_CASCADE_ROWS = Counter(
+    "dailyreport_llm_cascade_rows_total",
+    "캐스케이드에서 결과를 채택한 모델별 행 수",
+    ["model"],
+)
+JOBS_IN_FLIGHT = Gauge(
+    "dailyreport_jobs_in_flight",
+    "실행 중인 분류 작업 수",
+    ["kind"],
+)
+QUEUE_DEPTH = Gauge(
+    "dailyreport_pipeline_queue_depth",
+    "파이프라인 분류 큐에 대기 중인 항목 수",
+    ["queue"],
+)
+
+# 라우트에 매칭되지 않은 요청 (404 등)은 경로별로 나누지 않음 (라벨 수 폭증 방지)
+UNMATCHED_ROUTE = "unmatched"
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+class StageTimer:
+    """
+    단계 소요 시간을 히스토그램과 현재 작업 트레이스(있으면)에 함께 기록
+
+    with 문으로 쓰면 args dict를 돌려주며, 여기에 넣은 값은 span args로 저장됨.
+    데코레이터로 쓰면 호출마다 새 타이머를 만들어 재진입/동시 호출에 안전.
+    프로파일링 중인 요청의 단계가 다른 스레드에서 실행되면 해당 구간도 프로파일링함
+    """
+
+    __slots__ = ("stage", "histogram", "args", "_start", "_profile")
+
+    def __init__(self, stage: str, histogram, args: Dict[str, Any]):
+        self.stage = stage
+        self.histogram = histogram
+        self.args = args
+        self._start = 0.0
+        self._profile = None
+
+    def __enter__(self) -> Dict[str, Any]:
+        self._profile = start_thread_profile()
+        self._start = time.perf_counter()
+        return self.args
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self._start
+        stop_thread_profile(self._profile)
+        self.histogram.observe(elapsed)
+        record_span(self.stage, "stage", self._start, elapsed, self.args)
+        return False
+
+    def __call__(self, func):
+        stage, histogram = self.stage, self.histogram
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with StageTimer(stage, histogram, {}):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def stage_timer(stage: str, **args) -> StageTimer:
+    """
+    단계 소요 시간 측정 (with 문 또는 동기 함수 데코레이터로 사용)
+
+    측정 비용은 perf_counter 두 번과 히스토그램 버킷 갱신 정도 (μs 단위)
+    """
+    return StageTimer(stage, STAGE_SECONDS.labels(stage), args)
+
+
+def track_job(kind: str) -> Callable:
+    """async 엔드포인트 실행 중 작업 수 게이지 증가"""
+    gauge = JOBS_IN_FLIGHT.labels(kind)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            gauge.inc()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                gauge.dec()
+        return wrapper
+    return decorator
+
+
+def render_metrics() -> bytes:
+    """Prometheus 텍스트 포맷으로 현재 지표 출력"""
+    return generate_latest()
+
+
+class MetricsMiddleware:
+    """
+    라우트별 HTTP 처리 시간 기록 (ASGI 미들웨어)
+
+    BaseHTTPMiddleware와 달리 응답 본문을 감싸지 않아 스트리밍(SSE) 응답에도
+    부하가 없으며, 스트리밍 응답은 마지막 청크 전송까지의 시간이 기록됨
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                str(status_code),
+            ).observe(time.perf_counter() - start)
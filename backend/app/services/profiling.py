@@ -0,0 +1,243 @@
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+_TRUTHY = {"1", "true", "yes", "on"}
+
+# 이벤트 루프 스레드 프로파일러 사용 중 여부 (이벤트 루프에서만 변경)
+_loop_profiler_busy = False
+
+
+class ProfileSession:
+    """
+    요청 하나의 프로파일 수집
+
+    이벤트 루프 스레드는 요청 시작부터 끝까지 cProfile로 측정하고,
+    asyncio.to_thread 등으로 다른 스레드에서 실행되는 단계(stage_timer)는
+    스레드별 프로파일러로 측정한 뒤 저장할 때 합침.
+    이벤트 루프 스레드 측정에는 같은 시간에 처리된 다른 요청도 포함될 수 있으며,
+    스레드당 프로파일러는 하나만 켤 수 있으므로 동시에 프로파일링하는 요청은
+    다른 스레드 단계만 측정함
+    """
+
+    def __init__(self, method: str, path: str):
+        self.id = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.history_ids: List[int] = []
+        self.status_code = 500
+        self.thread_id = threading.get_ident()
+        self._profiler: Optional[cProfile.Profile] = None
+        self._worker_profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._start = 0.0
+        self.duration_ms = 0.0
+
+    def start(self) -> None:
+        global _loop_profiler_busy
+        self._start = time.perf_counter()
+        if not _loop_profiler_busy:
+            _loop_profiler_busy = True
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        global _loop_profiler_busy
+        if self._profiler is not None:
+            self._profiler.disable()
+            _loop_profiler_busy = False
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 1)
+
+    def add_worker_profile(self, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            self._worker_profiles.append(profiler)
+
+    def save(self, directory: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+        """
+        pstats 파일(.prof)과 메타데이터(.json) 저장 (기록이 없으면 저장하지 않음)
+
+        .prof는 python -m pstats, snakeviz 등으로 열 수 있음
+        """
+        directory = Path(directory or settings.profiles_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        stats = None
+        profilers = ([self._profiler] if self._profiler else []) + self._worker_profiles
+        for profiler in profilers:
+            try:
+                profile_stats = pstats.Stats(profiler)
+            except TypeError:
+                # 기록된 호출이 없는 프로파일러
+                continue
+            if stats is None:
+                stats = profile_stats
+            else:
+                stats.add(profile_stats)
+        if stats is None:
+            return None
+
+        profile_path = directory / f"{self.id}.prof"
+        stats.dump_stats(str(profile_path))
+
+        meta = {
+            "id": self.id,
+            "created_at": datetime.utcnow().isoformat(),
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "duration_ms": self.duration_ms,
+            "history_ids": sorted(set(self.history_ids)),
+            "worker_profiles": len(self._worker_profiles),
+            "size": profile_path.stat().st_size,
+        }
+        (directory / f"{self.id}.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        prune_profiles(directory)
+        return meta
+
+
+_active_profile: ContextVar[Optional[ProfileSession]] = ContextVar("request_profile", default=None)
+_thread_state = threading.local()
+
+
+def tag_profile(*history_ids: int) -> None:
+    """현재 요청을 프로파일링 중이면 작업 이력 id 연결 (목록에서 이력 id로 조회)"""
+    session = _active_profile.get()
+    if session is not None:
+        session.history_ids.extend(history_ids)
+
+
+def start_thread_profile() -> Optional[Tuple[ProfileSession, cProfile.Profile]]:
+    """
+    다른 스레드에서 실행되는 단계의 프로파일링 시작 (stage_timer에서 호출)
+
+    프로파일링 중인 요청이 없으면 contextvar 조회 한 번으로 끝남
+    """
+    session = _active_profile.get()
+    if session is None or threading.get_ident() == session.thread_id:
+        return None
+    if getattr(_thread_state, "active", False):
+        # 바깥 단계에서 이미 측정 중
+        return None
+    profiler = cProfile.Profile()
+    _thread_state.active = True
+    profiler.enable()
+    return session, profiler
+
+
+def stop_thread_profile(handle: Optional[Tuple[ProfileSession, cProfile.Profile]]) -> None:
+    if handle is None:
+        return
+    session, profiler = handle
+    profiler.disable()
+    _thread_state.active = False
+    session.add_worker_profile(profiler)
+
+
+def _profile_requested(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == PROFILE_HEADER:
+            return value.decode("latin-1").lower() in _TRUTHY
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return any(value.lower() in _TRUTHY for value in query.get(PROFILE_QUERY, ()))
+
+
+class ProfilingMiddleware:
+    """
+    요청 단위 프로파일링 (ASGI 미들웨어)
+
+    settings.profiling_enabled일 때만 앱에 추가되므로 꺼져 있으면 부하 없음.
+    켜져 있어도 X-Profile: 1 헤더나 ?profile=1 이 있는 요청만 측정하며,
+    응답의 X-Profile-Id 헤더로 저장된 프로파일 id를 알려줌
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                session.status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER, session.id.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = _active_profile.set(session)
+        session.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.stop()
+            _active_profile.reset(token)
+            try:
+                await asyncio.to_thread(session.save)
+            except Exception as e:
+                logger.error(f"프로파일 저장 실패 ({session.id}): {e}")
+
+
+def list_profiles(history_id: Optional[int] = None, directory: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """저장된 프로파일 목록 (최신순)"""
+    directory = Path(directory or settings.profiles_dir)
+    profiles = []
+    for meta_path in directory.glob("*.json"):
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if history_id is None or history_id in meta.get("history_ids", []):
+            profiles.append(meta)
+    return sorted(profiles, key=lambda meta: meta["id"], reverse=True)
+
+
+def profile_path(profile_id: str, directory: Optional[Path] = None) -> Optional[Path]:
+    """프로파일 파일 경로 (id 형식이 아니거나 파일이 없으면 None)"""
+    if not profile_id or not all(c.isalnum() or c == "_" for c in profile_id):
+        return None
+    path = Path(directory or settings.profiles_dir) / f"{profile_id}.prof"
+    return path if path.exists() else None
+
+
+def render_profile_text(path: Path, sort: str = "cumulative", limit: int = 50) -> str:
+    """pstats 텍스트 요약 (누적 시간순 상위 limit개 함수)"""
+    output = io.StringIO()
+    stats = pstats.Stats(str(path), stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+def prune_profiles(directory: Optional[Path] = None, keep: Optional[int] = None) -> int:
+    """최근 keep개만 남기고 오래된 프로파일 삭제"""
+    directory = Path(directory or settings.profiles_dir)
+    keep = settings.profile_keep if keep is None else keep
+    ids = sorted((path.stem for path in directory.glob("*.json")), reverse=True)
+    removed = 0
+    for profile_id in ids[keep:]:
+        for suffix in (".prof", ".json"):
+            (directory / f"{profile_id}{suffix}").unlink(missing_ok=True)
+        removed += 1
+    return removed
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models import ClassificationHistory
+from .tracing import span
+
+
+class ProgressRecorder:
+    """
+    분류 진행상황(처리/실패 행 수)을 이력에 모아서 기록
+
+    행마다 commit하지 않고 every_rows 행 또는 interval_ms 밀리초가
+    지났을 때만 commit하여 DB 쓰기 횟수를 줄임. 마지막 값은 flush()로 기록
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        history: ClassificationHistory,
+        every_rows: Optional[int] = None,
+        interval_ms: Optional[int] = None
+    ):
+        self.db = db
+        self.history = history
+        self.every_rows = max(1, every_rows or settings.progress_commit_rows)
+        self.interval = (interval_ms if interval_ms is not None else settings.progress_commit_interval_ms) / 1000
+        self.commits = 0
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    async def update(self, processed_rows: int, failed_rows: int) -> bool:
+        """
+        진행상황 반영 (조건을 만족하면 commit)
+
+        Returns:
+            이번 호출에서 commit 했는지 여부
+        """
+        self.history.processed_rows = processed_rows
+        self.history.failed_rows = failed_rows
+        self._pending += 1
+        progress_broker.publish(self.history)
+
+        if self._pending >= self.every_rows or time.monotonic() - self._last_commit >= self.interval:
+            await self.flush()
+            return True
+        return False
+
+    async def flush(self) -> None:
+        """기록되지 않은 진행상황 commit"""
+        if not self._pending:
+            return
+        with span("db_commit", "db", rows=self._pending):
+            await self.db.commit()
+        self.commits += 1
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+
+class JobChannel:
+    """
+    실행 중인 작업 하나의 SSE 이벤트 기록
+
+    작업은 요청과 별도의 태스크에서 실행되며 이벤트를 여기에 순서대로 쌓고,
+    SSE 응답은 이를 구독만 하므로 연결이 끊겨도 작업은 계속됨.
+    이벤트 id는 1부터 순서대로 증가하므로 재연결 시 Last-Event-ID 다음 이벤트부터 다시 전송.
+
+    행 단위 결과는 interval_ms 단위로 묶어서 progress 이벤트 하나로 보냄
+    (행이 빠르게 끝나는 큰 시트에서 이벤트 수를 줄임)
+    """
+
+    def __init__(self, history_id: int, interval_ms: Optional[int] = None):
+        self.history_id = history_id
+        self.interval = (interval_ms if interval_ms is not None else settings.stream_event_interval_ms) / 1000
+        self.events: List[str] = []  # 이벤트 id - 1 위치에 JSON 문자열
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._rows: List[Dict[str, Any]] = []
+        self._state: Dict[str, Any] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """이벤트 추가 후 대기 중인 구독자를 깨움, 이벤트 id 반환"""
+        self.events.append(json.dumps(event, ensure_ascii=False))
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+        return len(self.events)
+
+    def add_row(self, row: Dict[str, Any], **state) -> None:
+        """
+        행 결과 추가 (state: current, total 등 progress 이벤트에 담을 최신 진행상황)
+
+        첫 행이 들어오면 interval 뒤에 묶어서 전송하도록 예약
+        """
+        self._rows.append(row)
+        self._state = state
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.interval, self.flush)
+
+    def flush(self) -> None:
+        """모아 둔 행 결과를 progress 이벤트로 전송"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._rows:
+            rows, self._rows = self._rows, []
+            self.publish({"type": "progress", **self._state, "rows": rows})
+
+    def close(self, event: Dict[str, Any]) -> None:
+        """남은 행을 보내고 마지막 이벤트(complete/error) 전송"""
+        self.flush()
+        self.publish(event)
+        self.closed = True
+
+    async def subscribe(self, last_event_id: int = 0, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Tuple[int, str]]]:
+        """
+        last_event_id 다음 이벤트부터 (id, JSON) 반환, 작업이 끝나면 종료
+
+        heartbeat초 동안 새 이벤트가 없으면 None 반환 (연결 유지용 주석 전송)
+        """
+        heartbeat = heartbeat if heartbeat is not None else settings.stream_heartbeat_seconds
+        position = max(0, last_event_id)
+        while True:
+            while position < len(self.events):
+                position += 1
+                yield position, self.events[position - 1]
+            if self.closed:
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def history_update(history: ClassificationHistory) -> Dict[str, Any]:
+    """WebSocket으로 보내는 이력 상태 (짧은 키만 사용)"""
+    update = {
+        "id": history.id,
+        "status": history.status,
+        "total": history.total_rows or 0,
+        "processed": history.processed_rows or 0,
+        "failed": history.failed_rows or 0,
+    }
+    if history.status == "failed" and history.error_message:
+        update["error"] = history.error_message
+    return update
+
+
+class UpdateSubscriber:
+    """
+    WebSocket 연결 하나의 구독 (구독한 이력 ID의 최신 상태만 보관)
+
+    같은 이력의 업데이트는 마지막 값으로 덮어쓰므로 행이 빠르게 처리되어도
+    전송 구간마다 이력당 하나만 보냄 (완료 상태는 마지막 값이므로 빠지지 않음)
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.ids: Set[int] = set()
+        self.pending: Dict[int, Dict[str, Any]] = {}
+        self._wakeup = asyncio.Event()
+
+    def push(self, update: Dict[str, Any]) -> None:
+        """구독자의 이벤트 루프에서 실행"""
+        if update["id"] in self.ids:
+            self.pending[update["id"]] = update
+            self._wakeup.set()
+
+    async def next_batch(self, interval: float) -> List[Dict[str, Any]]:
+        """업데이트가 생기면 interval 동안 더 모은 뒤 한 번에 반환"""
+        await self._wakeup.wait()
+        await asyncio.sleep(interval)
+        self._wakeup.clear()
+        batch = list(self.pending.values())
+        self.pending.clear()
+        return batch
+
+
+class ProgressBroker:
+    """
+    프로세스 내 진행상황 pub/sub
+
+    - 이력 ID별 JobChannel (SSE): 끝난 작업의 채널은 retention초 동안 남겨 두어
+      늦게 재연결한 클라이언트도 결과를 받음
+    - WebSocket 구독자: 작업 실행 코드가 publish한 이력 상태를 구독한 연결에만 전달
+    """
+
+    def __init__(self):
+        self._channels: Dict[int, JobChannel] = {}
+        self._tasks = set()
+        self._subscribers: Set[UpdateSubscriber] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> UpdateSubscriber:
+        subscriber = UpdateSubscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: UpdateSubscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, *histories: ClassificationHistory) -> None:
+        """
+        이력 상태 전달 (구독자가 없으면 바로 반환)
+
+        구독자마다 자신의 이벤트 루프에서 처리하도록 넘기므로 다른 스레드/루프에서 호출해도 됨
+        """
+        if not self._subscribers:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for history in histories:
+            update = history_update(history)
+            for subscriber in subscribers:
+                if update["id"] in subscriber.ids:
+                    subscriber.loop.call_soon_threadsafe(subscriber.push, update)
+
+    def open(self, history_id: int) -> JobChannel:
+        channel = JobChannel(history_id)
+        self._channels[history_id] = channel
+        return channel
+
+    def get(self, history_id: int) -> Optional[JobChannel]:
+        return self._channels.get(history_id)
+
+    def run(self, channel: JobChannel, job) -> asyncio.Task:
+        """작업 코루틴을 요청과 분리된 태스크로 실행 (끝나면 retention 뒤 채널 제거)"""
+        task = asyncio.create_task(job)
+        self._tasks.add(task)
+
+        def done(_):
+            self._tasks.discard(task)
+            asyncio.get_running_loop().call_later(
+                settings.stream_retention_seconds, self._remove, channel
+            )
+
+        task.add_done_callback(done)
+        return task
+
+    def _remove(self, channel: JobChannel) -> None:
+        if self._channels.get(channel.history_id) is channel:
+            del self._channels[channel.history_id]
+
+
+progress_broker = ProgressBroker()
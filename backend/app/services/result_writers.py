@@ -0,0 +1,354 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .excel_handler import ExcelHandler
+
+logger = logging.getLogger(__name__)
+
+
+# 분류 결과 컬럼
+RESULT_COLUMNS = ["불량명", "설비명", "조치내용"]
+
+
+class ResultWriter(ABC):
+    """
+    행 단위 스트리밍 결과 writer 기본 클래스
+
+    write_header → write_row (반복) → close 순서로 사용하며,
+    각 행은 받는 즉시 출력하여 전체 결과를 메모리에 쌓지 않음
+    """
+
+    extension = ""
+    media_type = "application/octet-stream"
+
+    def __init__(self, output_path: str):
+        self.output_path = str(output_path)
+        self.columns: List[str] = []
+
+    def write_header(self, columns: Sequence[str]) -> None:
+        self.columns = [str(c) for c in columns]
+
+    @abstractmethod
+    def write_row(self, values: Sequence[Any]) -> None:
+        """값 목록 한 행 기록 (write_header의 컬럼 순서)"""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CsvResultWriter(ResultWriter):
+    """CSV writer (Excel에서 한글이 깨지지 않도록 UTF-8 BOM 사용)"""
+
+    extension = ".csv"
+    media_type = "text/csv"
+
+    def __init__(self, output_path: str):
+        super().__init__(output_path)
+        self._file = open(self.output_path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file)
+
+    def write_header(self, columns: Sequence[str]) -> None:
+        super().write_header(columns)
+        self._writer.writerow(self.columns)
+
+    def write_row(self, values: Sequence[Any]) -> None:
+        self._writer.writerow(["" if v is None else v for v in values])
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class JsonlResultWriter(ResultWriter):
+    """JSON Lines writer (한 줄에 한 행, 헤더를 key로 사용)"""
+
+    extension = ".jsonl"
+    media_type = "application/x-ndjson"
+
+    def __init__(self, output_path: str):
+        super().__init__(output_path)
+        self._file = open(self.output_path, "w", encoding="utf-8")
+
+    def write_row(self, values: Sequence[Any]) -> None:
+        record = dict(zip(self.columns, values))
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetResultWriter(ResultWriter):
+    """
+    Parquet writer
+
+    row_group_size 행씩 모아서 row group 단위로 기록하므로
+    메모리 사용량은 row group 하나 크기로 제한됨 (모든 컬럼은 문자열)
+    """
+
+    extension = ".parquet"
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, output_path: str, row_group_size: int = 5000):
+        super().__init__(output_path)
+        self.row_group_size = row_group_size
+        self._rows: List[List[Optional[str]]] = []
+        self._writer = None
+        self._schema = None
+
+    def write_header(self, columns: Sequence[str]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        super().write_header(columns)
+        self._schema = pa.schema([(name, pa.string()) for name in self.columns])
+        self._writer = pq.ParquetWriter(self.output_path, self._schema)
+
+    def write_row(self, values: Sequence[Any]) -> None:
+        self._rows.append([None if v is None else str(v) for v in values])
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        import pyarrow as pa
+
+        if not self._rows:
+            return
+        columns = list(zip(*self._rows))
+        table = pa.Table.from_arrays(
+            [pa.array(col, type=pa.string()) for col in columns],
+            schema=self._schema
+        )
+        self._writer.write_table(table)
+        self._rows = []
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+
+
+class XlsxStreamResultWriter(ResultWriter):
+    """
+    xlsxwriter constant_memory 모드 writer
+
+    행을 쓰는 즉시 임시 파일로 flush 하므로 시트 크기와 무관하게
+    메모리 사용량이 일정함 (행은 반드시 위에서 아래 순서로 기록)
+    """
+
+    extension = ".xlsx"
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    def __init__(self, output_path: str, sheet_name: str = "Sheet1"):
+        import xlsxwriter
+
+        super().__init__(output_path)
+        self._workbook = xlsxwriter.Workbook(self.output_path, {"constant_memory": True})
+        self._worksheet = self._workbook.add_worksheet(sheet_name[:31])
+        self._wrap = self._workbook.add_format({"text_wrap": True, "valign": "vcenter"})
+        self._bold = self._workbook.add_format({"bold": True, "align": "center", "valign": "vcenter"})
+        self._row = 0
+
+    def write_header(self, columns: Sequence[str]) -> None:
+        super().write_header(columns)
+        self._worksheet.write_row(self._row, 0, self.columns, self._bold)
+        self._row += 1
+
+    def write_row(self, values: Sequence[Any]) -> None:
+        self.write_row_at(self._row, 0, values, style="wrap")
+
+    def write_row_at(
+        self,
+        row: int,
+        col: int,
+        values: Sequence[Any],
+        style: Optional[str] = None
+    ) -> None:
+        """
+        0-based 위치에 행 기록 (원본 시트 배치를 그대로 옮길 때 사용)
+
+        constant_memory 모드에서는 이미 지나간 행에 다시 쓸 수 없으므로
+        row는 항상 이전 호출보다 크거나 같아야 함
+
+        Args:
+            style: None (서식 없음), "wrap" (줄바꿈), "header" (굵게/가운데)
+        """
+        cell_format = {"wrap": self._wrap, "header": self._bold}.get(style)
+        for offset, value in enumerate(values):
+            if value is None:
+                continue
+            self._worksheet.write(row, col + offset, value, cell_format)
+        self._row = row + 1
+
+    def close(self) -> None:
+        self._workbook.close()
+
+
+# 다운로드 포맷 → writer
+EXPORT_FORMATS = {
+    "csv": CsvResultWriter,
+    "jsonl": JsonlResultWriter,
+    "parquet": ParquetResultWriter,
+    "xlsx_flat": XlsxStreamResultWriter,
+}
+
+
+def export_suffix(export_format: str) -> str:
+    """포맷별 파일 접미사 (xlsx_flat은 결과 xlsx와 구분되도록 _flat.xlsx)"""
+    return "_flat.xlsx" if export_format == "xlsx_flat" else EXPORT_FORMATS[export_format].extension
+
+
+def parse_export_formats(value: str) -> List[str]:
+    """쉼표로 구분된 포맷 목록 (지원하지 않는 포맷은 경고 후 제외)"""
+    formats = []
+    for name in (item.strip() for item in value.split(",")):
+        if not name:
+            continue
+        if name not in EXPORT_FORMATS:
+            logger.warning("지원하지 않는 결과 파일 포맷입니다: %s", name)
+            continue
+        if name not in formats:
+            formats.append(name)
+    return formats
+
+
+class RowExporter:
+    """
+    분류 중 나오는 행 결과를 여러 포맷의 행 단위 결과 파일에 바로 기록
+
+    컬럼은 행 단위 결과(ClassificationRow)와 같은 구성:
+    row_index, Issue 컬럼, 불량명, 설비명, 조치내용, status.
+    임시 파일(.part)에 쓰다가 finish에서 결과 파일과 같은 stem으로 이름을 바꿔
+    다운로드 캐시 위치에 둠 (다운로드 시 결과 xlsx를 다시 읽지 않음).
+    writer를 만들 수 없는 포맷(의존성 없음 등)은 건너뛰고, 다운로드 시
+    저장된 ClassificationRow로 같은 구성의 파일을 만듦.
+    값은 ClassificationRow에 저장되는 값과 같게 맞춤 (빈 Issue는 None, 빈 결과는 "")
+    """
+
+    def __init__(self, directory: str, column_name: str, formats: Sequence[str]):
+        self.directory = Path(directory)
+        self.columns = ["row_index", column_name, *RESULT_COLUMNS, "status"]
+        self._writers: Dict[str, ResultWriter] = {}
+        token = uuid.uuid4().hex
+        for export_format in formats:
+            partial_path = self.directory / f"export_{token}{export_suffix(export_format)}.part"
+            try:
+                writer = EXPORT_FORMATS[export_format](str(partial_path))
+                writer.write_header(self.columns)
+            except Exception as e:
+                logger.warning("행 단위 결과 파일(%s)을 만들 수 없습니다: %s", export_format, e)
+                partial_path.unlink(missing_ok=True)
+                continue
+            self._writers[export_format] = writer
+
+    def write_row(self, row_index: int, issue_value: Any, result: Optional[Dict[str, str]], status: str) -> None:
+        result = result or {}
+        issue_text = None if ExcelHandler.is_empty_value(issue_value) else str(issue_value)
+        values = [row_index, issue_text, *(result.get(column) or "" for column in RESULT_COLUMNS), status]
+        for writer in self._writers.values():
+            writer.write_row(values)
+
+    def finish(self, stem: str) -> List[Path]:
+        """writer를 닫고 {stem}{접미사}로 이동 (결과 파일보다 나중 시각으로 기록해 최신 캐시로 취급)"""
+        paths = []
+        writers, self._writers = self._writers, {}
+        for export_format, writer in writers.items():
+            writer.close()
+            export_path = self.directory / f"{stem}{export_suffix(export_format)}"
+            os.replace(writer.output_path, export_path)
+            os.utime(export_path)
+            paths.append(export_path)
+        return paths
+
+    def abort(self) -> None:
+        """작업 실패 시 임시 파일 삭제"""
+        writers, self._writers = self._writers, {}
+        for writer in writers.values():
+            try:
+                writer.close()
+            except Exception:
+                pass
+            Path(writer.output_path).unlink(missing_ok=True)
+
+
+def iter_result_rows(
+    result_path: str,
+    sheet_name: Optional[str] = None,
+    header_row: int = 3
+) -> Iterator[List[Any]]:
+    """
+    분류 결과 파일을 read-only 모드로 한 행씩 읽음 (Generator)
+
+    첫 번째로 헤더를 yield 하고 이후 데이터 행을 yield.
+    헤더가 비어있는 컬럼(예: A열 여백)과 완전히 빈 행은 제외함
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(result_path, read_only=True, data_only=True)
+    try:
+        if sheet_name and sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+        else:
+            ws = wb.worksheets[0]
+
+        rows = ws.iter_rows(min_row=header_row, values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        keep = [idx for idx, name in enumerate(header) if name is not None and str(name).strip()]
+        yield [str(header[idx]).strip() for idx in keep]
+
+        for row in rows:
+            values = [row[idx] if idx < len(row) else None for idx in keep]
+            if all(v is None or v == "" for v in values):
+                continue
+            yield values
+    finally:
+        wb.close()
+
+
+def export_result_file(
+    result_path: str,
+    output_path: str,
+    export_format: str,
+    sheet_name: Optional[str] = None
+) -> str:
+    """
+    분류 결과 파일을 다른 포맷으로 스트리밍 변환
+
+    결과 시트 전체(원본 컬럼 + 결과 컬럼)를 옮기며, 다운로드 API의 행 단위 결과
+    파일(RowExporter)과는 컬럼 구성이 다름
+
+    Args:
+        result_path: 분류 결과 엑셀 파일 경로
+        output_path: 저장 경로
+        export_format: EXPORT_FORMATS의 key (csv, jsonl, parquet, xlsx_flat)
+        sheet_name: 시트 이름
+
+    Returns:
+        저장된 파일 경로
+    """
+    writer_cls = EXPORT_FORMATS.get(export_format)
+    if writer_cls is None:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    rows = iter_result_rows(result_path, sheet_name)
+    with writer_cls(output_path) as writer:
+        header = next(rows, None)
+        writer.write_header(header or RESULT_COLUMNS)
+        for values in rows:
+            writer.write_row(values)
+
+    return output_path
@@ -0,0 +1,92 @@
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from .excel_handler import ExcelHandler
+from .metrics import stage_timer
+from ..config import settings
+from ..models import ClassificationRow
+
+
+# 분류 결과 key → ClassificationRow 컬럼
+RESULT_FIELDS = {
+    "불량명": "defect_name",
+    "설비명": "equipment_name",
+    "조치내용": "action_taken",
+}
+
+
+def hash_issue_text(value: Any) -> Optional[str]:
+    """Issue 텍스트 해시 (앞뒤 공백 무시, 빈 값은 None)"""
+    if ExcelHandler.is_empty_value(value):
+        return None
+    return hashlib.sha1(str(value).strip().encode("utf-8")).hexdigest()
+
+
+def build_row_record(
+    history_id: int,
+    row_index: int,
+    issue_value: Any,
+    result: Optional[Dict[str, str]],
+    status: str
+) -> Dict[str, Any]:
+    """INSERT 파라미터 dict 생성"""
+    result = result or {}
+    record = {
+        "history_id": history_id,
+        "row_index": row_index,
+        "issue_hash": hash_issue_text(issue_value),
+        "issue_text": None if ExcelHandler.is_empty_value(issue_value) else str(issue_value),
+        "status": status,
+    }
+    for key, column in RESULT_FIELDS.items():
+        record[column] = result.get(key) or None
+    return record
+
+
+@stage_timer("save_rows")
+def save_classification_rows(
+    db: Session,
+    history_id: int,
+    rows: Iterable[Tuple[int, Any, Optional[Dict[str, str]], str]],
+    batch_size: Optional[int] = None
+) -> int:
+    """
+    행 단위 분류 결과 저장
+
+    기존 행을 지운 뒤 batch_size 행씩 executemany로 INSERT.
+    ORM 객체를 만들지 않으므로 행 수가 많아도 빠르며, commit은 호출한 쪽에서 수행
+
+    Args:
+        rows: (행 인덱스, Issue 값, 분류 결과 dict, 상태) 목록
+        batch_size: 한 번에 INSERT 할 행 수 (기본값: settings.row_insert_batch_size)
+
+    Returns:
+        저장한 행 수
+    """
+    batch_size = max(1, batch_size or settings.row_insert_batch_size)
+    table = ClassificationRow.__table__
+    statement = insert(table)
+
+    db.execute(delete(table).where(table.c.history_id == history_id))
+
+    saved = 0
+    batch: List[Dict[str, Any]] = []
+    for row_index, issue_value, result, status in rows:
+        batch.append(build_row_record(history_id, row_index, issue_value, result, status))
+        if len(batch) >= batch_size:
+            db.execute(statement, batch)
+            saved += len(batch)
+            batch = []
+    if batch:
+        db.execute(statement, batch)
+        saved += len(batch)
+
+    return saved
+
+
+def row_to_result(row: ClassificationRow) -> Dict[str, str]:
+    """ClassificationRow를 분류 결과 dict로 변환"""
+    return {key: getattr(row, column) or "" for key, column in RESULT_FIELDS.items()}
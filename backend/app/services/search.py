@@ -0,0 +1,125 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+SEARCH_TABLE = "classification_rows_fts"
+
+# trigram 토크나이저는 3글자 미만 검색어를 인덱스로 찾지 못함
+MIN_MATCH_LENGTH = 3
+
+# bm25 컬럼 가중치 (issue_text, defect_name, equipment_name, action_taken)
+BM25_WEIGHTS = "1.0, 2.0, 2.0, 0.5"
+
+_SELECT_COLUMNS = """
+    r.history_id, h.filename, h.created_at, r.row_index, r.status,
+    r.issue_text, r.defect_name, r.equipment_name, r.action_taken
+"""
+
+
+def search_index_available(db: Session) -> bool:
+    """FTS5 검색 인덱스 테이블 존재 여부 (SQLite가 아니거나 마이그레이션 전이면 False)"""
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+    return db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": SEARCH_TABLE}
+    ).first() is not None
+
+
+def split_terms(query: str) -> List[str]:
+    """검색어를 공백 기준으로 분리 (중복 제거, 순서 유지)"""
+    terms = []
+    for term in query.split():
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def build_match_expression(terms: List[str]) -> str:
+    """
+    FTS5 MATCH 식 생성
+
+    각 검색어를 따옴표로 감싸 FTS 문법(AND, OR, *, - 등)으로 해석되지 않게 하고,
+    모든 검색어를 포함하는 행만 찾음 (AND)
+    """
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _hit(row) -> Dict[str, Any]:
+    mapping = row._mapping
+    return {
+        "history_id": mapping["history_id"],
+        "filename": mapping["filename"],
+        "created_at": mapping["created_at"],
+        "row_index": mapping["row_index"],
+        "status": mapping["status"],
+        "issue_text": mapping["issue_text"],
+        "불량명": mapping["defect_name"] or "",
+        "설비명": mapping["equipment_name"] or "",
+        "조치내용": mapping["action_taken"] or "",
+        "score": mapping["score"],
+    }
+
+
+def search_rows(
+    db: Session,
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    history_id: Optional[int] = None
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    완료된 작업의 행 단위 결과 검색
+
+    모든 검색어가 3글자 이상이면 FTS5 인덱스로 찾아 bm25 점수순(관련도 높은 순)으로
+    정렬하고, 2글자 이하 검색어(예: "기포")가 있으면 LIKE 부분 일치로 찾아
+    최신 작업순으로 정렬함
+
+    Returns:
+        (전체 건수, 검색 결과 목록)
+    """
+    terms = split_terms(query)
+    if not terms:
+        return 0, []
+
+    params: Dict[str, Any] = {"limit": limit, "offset": offset}
+    conditions = ["h.status = 'completed'"]
+    if history_id is not None:
+        conditions.append("r.history_id = :history_id")
+        params["history_id"] = history_id
+
+    use_index = all(len(term) >= MIN_MATCH_LENGTH for term in terms) and search_index_available(db)
+    if use_index:
+        params["match"] = build_match_expression(terms)
+        source = (
+            f"{SEARCH_TABLE} JOIN classification_rows r ON r.id = {SEARCH_TABLE}.rowid "
+            "JOIN classification_history h ON h.id = r.history_id"
+        )
+        conditions.insert(0, f"{SEARCH_TABLE} MATCH :match")
+        score = f"bm25({SEARCH_TABLE}, {BM25_WEIGHTS})"
+        order_by = "score, r.history_id DESC, r.row_index"
+    else:
+        source = "classification_rows r JOIN classification_history h ON h.id = r.history_id"
+        for idx, term in enumerate(terms):
+            key = f"term{idx}"
+            params[key] = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions.append("(" + " OR ".join(
+                f"r.{column} LIKE :{key} ESCAPE '\\'"
+                for column in ("issue_text", "defect_name", "equipment_name", "action_taken")
+            ) + ")")
+        score = "NULL"
+        order_by = "h.created_at DESC, r.history_id DESC, r.row_index"
+
+    where = " AND ".join(conditions)
+    total = db.execute(text(f"SELECT COUNT(*) FROM {source} WHERE {where}"), params).scalar() or 0
+    rows = db.execute(
+        text(
+            f"SELECT {_SELECT_COLUMNS}, {score} AS score FROM {source} "
+            f"WHERE {where} ORDER BY {order_by} LIMIT :limit OFFSET :offset"
+        ),
+        params
+    ).all()
+
+    return total, [_hit(row) for row in rows]
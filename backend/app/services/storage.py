@@ -0,0 +1,310 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import ClassificationHistory
+from .artifact_store import compress_cold_artifacts, reconcile_artifacts, release
+
+logger = logging.getLogger(__name__)
+
+
+# (경로, 크기, 수정 시각)
+FileEntry = Tuple[str, int, float]
+
+# 워커 대기/실행 중인 이력은 보관 기간/용량 한도로 파일을 지우지 않음
+ACTIVE_STATUSES = ("queued", "processing")
+
+
+def managed_directories() -> List[Path]:
+    """정리 대상 디렉토리 (업로드/결과/아티팩트 저장소, 같은 경로면 한 번만)"""
+    directories = []
+    for directory in (settings.upload_dir, settings.results_dir, settings.artifacts_dir):
+        path = Path(directory).resolve()
+        if path not in directories:
+            directories.append(path)
+    return directories
+
+
+def _scan_tree(directory: str) -> Tuple[List[FileEntry], List[str]]:
+    """디렉토리 하나를 os.scandir로 훑어서 (파일 목록, 하위 디렉토리 목록) 반환"""
+    files: List[FileEntry] = []
+    subdirectories: List[str] = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        files.append((entry.path, stat.st_size, stat.st_mtime))
+                except OSError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return files, subdirectories
+
+
+def scan_files(
+    directories: Iterable[Path],
+    workers: Optional[int] = None,
+    exclude: Iterable[Path] = ()
+) -> List[FileEntry]:
+    """
+    여러 디렉토리를 병렬로 스캔 (하위 디렉토리 포함)
+
+    디렉토리 단위로 스레드 풀에 나눠서 os.scandir를 실행하며,
+    발견한 하위 디렉토리는 다음 단계에서 다시 병렬로 스캔함
+    (exclude에 포함된 디렉토리는 건너뜀)
+    """
+    excluded = {str(Path(d).resolve()) for d in exclude}
+    pending = [str(d) for d in directories]
+    files: List[FileEntry] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers or settings.storage_sweep_workers)) as executor:
+        while pending:
+            results = list(executor.map(_scan_tree, pending))
+            pending = []
+            for found, subdirectories in results:
+                files.extend(found)
+                pending.extend(d for d in subdirectories if str(Path(d).resolve()) not in excluded)
+    return files
+
+
+def _normalize(path: Optional[str]) -> Optional[str]:
+    if not path:
+        return None
+    return str(Path(path).resolve())
+
+
+def history_artifacts(history: ClassificationHistory, files_by_path: Dict[str, FileEntry]) -> List[FileEntry]:
+    """
+    이력이 참조하는 디스크 파일 목록
+
+    원본 파일, 결과 파일, 결과 파일에서 변환한 다운로드 캐시(같은 stem으로 시작)를 포함
+    (저장소 결과의 다운로드 캐시는 결과 디렉토리에 있음)
+    """
+    artifacts = []
+    source = _normalize(history.file_path)
+    if source in files_by_path:
+        artifacts.append(files_by_path[source])
+
+    result = _normalize(history.result_path)
+    if result:
+        result_path = Path(result)
+        prefixes = {
+            str(result_path.with_name(result_path.stem)),
+            str(Path(settings.results_dir).resolve() / result_path.stem),
+        }
+        artifacts.extend(
+            entry for path, entry in files_by_path.items()
+            if path == result or any(
+                path.startswith(prefix + ".") or path.startswith(prefix + "_flat") for prefix in prefixes
+            )
+        )
+    return artifacts
+
+
+def _delete_files(entries: Iterable[FileEntry], dry_run: bool) -> Tuple[int, int]:
+    """파일 삭제 후 (삭제 개수, 삭제 바이트) 반환"""
+    count = 0
+    size = 0
+    for path, file_size, _ in entries:
+        if not dry_run:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"파일 삭제 실패: {path} - {e}")
+                continue
+        count += 1
+        size += file_size
+    return count, size
+
+
+def _expire_history(db: Session, history: ClassificationHistory, now: datetime) -> None:
+    """파일이 삭제된 이력 표시 (이력과 행 단위 결과는 유지, 아티팩트 참조 해제)"""
+    history.result_path = None
+    history.expired_at = now
+    release(db, history.source_artifact_id)
+    release(db, history.result_artifact_id)
+    history.source_artifact_id = None
+    history.result_artifact_id = None
+
+
+def run_storage_sweep(
+    db: Session,
+    retention_days: Optional[int] = None,
+    quota_bytes: Optional[int] = None,
+    orphan_grace_hours: Optional[float] = None,
+    dry_run: bool = False,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    저장소 정리 (DB 기준 보관 기간, 양방향 정합성, 용량 한도)
+
+    1. DB → 디스크: 결과 파일이 없어진 완료 이력은 만료 처리
+    2. 디스크 → DB: 어떤 이력도 참조하지 않는 파일은 유예 시간이 지나면 삭제
+    3. 보관 기간: 보관 기간이 지난 완료/실패 이력의 파일 삭제 후 만료 처리
+    4. 용량 한도: 사용량이 한도를 넘으면 가장 오래 전에 다운로드된(LRU)
+       완료 이력의 파일부터 삭제
+    5. 아티팩트 저장소: 파일이 없어진 레코드 정리, 참조 수 재계산,
+       오래 사용하지 않은 아티팩트 zstd 압축
+
+    처리 중(processing) 이력의 파일은 건드리지 않음
+
+    Args:
+        retention_days: 보관 일수 (기본값: settings.retention_days, 0이면 미적용)
+        quota_bytes: 용량 한도 (기본값: settings.storage_quota_mb, 0이면 미적용)
+        orphan_grace_hours: 참조 없는 파일 유예 시간 (기본값: settings.orphan_grace_hours)
+        dry_run: True면 삭제/DB 변경 없이 결과만 계산
+
+    Returns:
+        정리 결과 요약 dict
+    """
+    now = now or datetime.utcnow()
+    retention_days = settings.retention_days if retention_days is None else retention_days
+    quota_bytes = settings.storage_quota_mb * 1024 * 1024 if quota_bytes is None else quota_bytes
+    grace_hours = settings.orphan_grace_hours if orphan_grace_hours is None else orphan_grace_hours
+
+    files = scan_files(managed_directories(), exclude=[Path(settings.analytics_dir)])
+    files_by_path = {str(Path(path).resolve()): (path, size, mtime) for path, size, mtime in files}
+    report = {
+        "dry_run": dry_run,
+        "scanned_files": len(files),
+        "used_bytes": sum(size for _, size, _ in files),
+        "expired_histories": 0,
+        "orphan_files": 0,
+        "retention_files": 0,
+        "evicted_files": 0,
+        "freed_bytes": 0,
+        "compressed_artifacts": 0,
+        "compressed_saved_bytes": 0,
+    }
+
+    histories = db.query(ClassificationHistory).all()
+    artifacts = {h.id: history_artifacts(h, files_by_path) for h in histories}
+
+    # 파일별 참조 이력 (여러 작업이 같은 원본을 쓰는 경우 마지막 참조가 없어질 때만 삭제)
+    owners: Dict[str, Set[int]] = {}
+    for history_id, entries in artifacts.items():
+        for entry in entries:
+            owners.setdefault(entry[0], set()).add(history_id)
+
+    expired_ids: Set[int] = set()
+
+    def expire(history: ClassificationHistory) -> int:
+        """이력의 파일 참조를 해제하고, 더 이상 참조가 없는 파일 삭제"""
+        releasable = []
+        for entry in artifacts[history.id]:
+            holders = owners.get(entry[0], set())
+            holders.discard(history.id)
+            if not holders:
+                releasable.append(entry)
+        artifacts[history.id] = []
+
+        count, size = _delete_files(releasable, dry_run)
+        report["freed_bytes"] += size
+        report["used_bytes"] -= size
+        if history.result_path and not dry_run:
+            _expire_history(db, history, now)
+        expired_ids.add(history.id)
+        return count
+
+    # 1. DB → 디스크: 결과 파일이 사라진 이력 만료 처리
+    for history in histories:
+        result = _normalize(history.result_path)
+        if history.status == "completed" and result and result not in files_by_path:
+            if not dry_run:
+                _expire_history(db, history, now)
+            expired_ids.add(history.id)
+
+    # 2. 디스크 → DB: 참조 없는 파일 삭제
+    grace_cutoff = (now - timedelta(hours=grace_hours)).timestamp()
+    orphans = [entry for entry in files if entry[0] not in owners and entry[2] < grace_cutoff]
+    report["orphan_files"], orphan_bytes = _delete_files(orphans, dry_run)
+    report["freed_bytes"] += orphan_bytes
+    report["used_bytes"] -= orphan_bytes
+
+    # 3. 보관 기간이 지난 이력
+    if retention_days:
+        cutoff = now - timedelta(days=retention_days)
+        for history in histories:
+            if history.status in ACTIVE_STATUSES or not history.created_at or history.created_at >= cutoff:
+                continue
+            if artifacts[history.id]:
+                report["retention_files"] += expire(history)
+
+    # 4. 용량 한도: 최근 사용 시각이 오래된 순서로 삭제
+    if quota_bytes and report["used_bytes"] > quota_bytes:
+        candidates = sorted(
+            (h for h in histories if h.status not in ACTIVE_STATUSES and artifacts[h.id]),
+            key=lambda h: (h.last_accessed_at or h.completed_at or h.created_at or datetime.min, h.id)
+        )
+        for history in candidates:
+            if report["used_bytes"] <= quota_bytes:
+                break
+            report["evicted_files"] += expire(history)
+
+    report["expired_histories"] = len(expired_ids)
+    if not dry_run:
+        db.flush()
+        reconcile_artifacts(db)
+    report["compressed_artifacts"], report["compressed_saved_bytes"] = compress_cold_artifacts(
+        db, now=now, dry_run=dry_run
+    )
+    if not dry_run:
+        report["used_bytes"] -= report["compressed_saved_bytes"]
+        db.commit()
+
+    logger.info(f"저장소 정리 완료: {report}")
+    return report
+
+
+def storage_usage(db: Session) -> Dict[str, Any]:
+    """현재 사용량과 한도"""
+    files = scan_files(managed_directories(), exclude=[Path(settings.analytics_dir)])
+    expired = db.query(func.count(ClassificationHistory.id))\
+        .filter(ClassificationHistory.expired_at.isnot(None))\
+        .scalar()
+    return {
+        "files": len(files),
+        "used_bytes": sum(size for _, size, _ in files),
+        "quota_bytes": settings.storage_quota_mb * 1024 * 1024,
+        "retention_days": settings.retention_days,
+        "expired_histories": expired or 0,
+    }
+
+
+def run_scheduled_sweep() -> Dict[str, Any]:
+    """별도 DB 세션으로 저장소 정리 실행 (주기 작업 / CLI용)"""
+    db = SessionLocal()
+    try:
+        return run_storage_sweep(db)
+    finally:
+        db.close()
+
+
+async def storage_sweep_loop(interval_minutes: Optional[int] = None) -> None:
+    """
+    앱 실행 중 주기적으로 저장소 정리 (cron 실행 사이에 디스크가 차는 것 방지)
+
+    정리 작업은 스레드에서 실행하여 이벤트 루프를 막지 않으며,
+    한 번 실패해도 다음 주기에 다시 시도함
+    """
+    interval = max(1, interval_minutes or settings.storage_sweep_interval_minutes) * 60
+    while True:
+        try:
+            await asyncio.to_thread(run_scheduled_sweep)
+        except Exception as e:
+            logger.error(f"주기적 저장소 정리 실패: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,197 @@
+import copy
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from ..config import settings
+
+
+# 행 단위 이벤트 표시 (샘플링 대상) / 이벤트별 추가 필드
+ROW_EVENT_ATTR = "row_event"
+FIELDS_ATTR = "fields"
+
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+def bind_log_context(**fields) -> None:
+    """
+    현재 컨텍스트(요청 task)의 로그에 공통 필드 추가 (예: history_id, job)
+
+    asyncio.to_thread로 실행되는 함수의 로그에도 함께 기록됨
+    """
+    _log_context.set({**_log_context.get(), **fields})
+
+
+def row_extra(row: int, **fields) -> Dict[str, Any]:
+    """행 단위 로그의 extra (LOG_ROW_SAMPLE_EVERY에 따라 샘플링됨)"""
+    return {ROW_EVENT_ATTR: True, FIELDS_ATTR: {"row": row, **fields}}
+
+
+def job_extra(**fields) -> Dict[str, Any]:
+    """작업 단위 로그의 extra (샘플링하지 않음)"""
+    return {FIELDS_ATTR: fields}
+
+
+class ContextFilter(logging.Filter):
+    """로그를 남긴 시점의 컨텍스트 필드를 레코드에 복사 (큐를 건너가도 유지)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _log_context.get()
+        return True
+
+
+class RowSamplingFilter(logging.Filter):
+    """
+    행 단위 INFO 이하 로그를 N건 중 1건만 통과
+
+    WARNING 이상과 작업 단위 로그는 항상 통과. every가 0이면 행 단위 로그를 모두 버림
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = every
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, ROW_EVENT_ATTR, False):
+            return True
+        if self.every <= 0:
+            return False
+        return next(self._counter) % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄 JSON 포맷 (백그라운드 리스너 스레드에서 실행)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        payload.update(getattr(record, "context", None) or {})
+        payload.update(getattr(record, FIELDS_ATTR, None) or {})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """사람이 읽기 위한 텍스트 포맷 (컨텍스트/필드를 key=value로 덧붙임)"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {**(getattr(record, "context", None) or {}), **(getattr(record, FIELDS_ATTR, None) or {})}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    로그 레코드를 큐에 넣기만 하는 핸들러 (포맷/출력은 리스너 스레드에서)
+
+    - 메시지 % args 결합을 호출 스레드에서 하지 않음 (지연 포맷)
+    - 큐가 가득 차면 기다리지 않고 버린 뒤 개수만 기록
+    - 다른 프로세스(전처리 프로세스 풀)로 복사된 경우 리스너가 없으므로 직접 출력
+    """
+
+    def __init__(self, log_queue: queue.Queue, fallback: logging.Handler):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.fallback = fallback
+        self._pid = os.getpid()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            # traceback 객체는 호출 스레드에서 문자열로 변환
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if os.getpid() != self._pid:
+            self.fallback.handle(record)
+            return
+        super().emit(record)
+
+
+class StderrHandler(logging.StreamHandler):
+    """출력 시점의 sys.stderr에 기록 (테스트 등에서 stderr가 교체되어도 안전)"""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+def build_formatter(log_format: Optional[str] = None) -> logging.Formatter:
+    return TextFormatter() if (log_format or settings.log_format) == "text" else JsonFormatter()
+
+
+def configure_logging(stream=None) -> None:
+    """
+    루트 로거를 큐 기반 구조화 로깅으로 설정 (여러 번 호출해도 한 번만 적용)
+
+    호출 스레드는 필터(컨텍스트 복사, 행 단위 샘플링)를 거친 레코드를 큐에 넣기만 하고,
+    QueueListener 스레드가 포맷 후 stderr로 출력함
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream) if stream is not None else StderrHandler()
+    output.setFormatter(build_formatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=max(0, settings.log_queue_size)), output)
+    handler.addFilter(ContextFilter())
+    handler.addFilter(RowSamplingFilter(settings.log_row_sample_every))
+
+    root = logging.getLogger()
+    root.setLevel(settings.log_level.upper())
+    root.addHandler(handler)
+
+    _queue_handler = handler
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """리스너 종료 (큐에 남은 로그를 모두 출력한 뒤 반환)"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+
+
+def dropped_log_records() -> int:
+    """큐가 가득 차서 버린 로그 수"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import ClassificationTrace
+
+
+class JobTrace:
+    """
+    작업 하나의 span 기록 (단계 시작/종료, LLM 호출, 캐시 적중, DB 커밋)
+
+    contextvar로 현재 작업에 연결되며, asyncio.to_thread로 실행되는 함수에도
+    컨텍스트가 복사되어 같은 트레이스에 기록됨.
+    span은 [이름, 분류, 시작(μs), 길이(μs, 순간 이벤트는 None), 스레드, args]
+    리스트로 보관하여 저장 크기를 줄임
+    """
+
+    def __init__(self, kind: str, max_spans: Optional[int] = None):
+        self.kind = kind
+        self.started_at = datetime.utcnow()
+        self.max_spans = max_spans or settings.trace_max_spans
+        self.spans: List[list] = []
+        self.dropped = 0
+        self._origin = time.perf_counter()
+        self._finished = False
+
+    def add(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        duration: Optional[float],
+        args: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """span 추가 (start/duration은 perf_counter 기준 초), 최대 개수를 넘으면 버림"""
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return
+        self.spans.append([
+            name,
+            category,
+            round((start - self._origin) * 1_000_000),
+            None if duration is None else round(duration * 1_000_000),
+            threading.get_ident(),
+            args or None,
+        ])
+
+    def finish(self) -> None:
+        """작업 전체 span 기록 (여러 번 호출해도 한 번만 기록)"""
+        if self._finished:
+            return
+        self._finished = True
+        self.spans.insert(0, [self.kind, "job", 0, round((time.perf_counter() - self._origin) * 1_000_000), threading.get_ident(), None])
+
+    def dump(self) -> bytes:
+        """저장용 직렬화 (압축된 JSON)"""
+        payload = {
+            "kind": self.kind,
+            "started_at": self.started_at.isoformat(),
+            "dropped": self.dropped,
+            "spans": self.spans,
+        }
+        return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+_current_trace: ContextVar[Optional[JobTrace]] = ContextVar("job_trace", default=None)
+
+
+def start_trace(kind: str) -> Optional[JobTrace]:
+    """
+    현재 컨텍스트(요청 task)에 새 트레이스 연결
+
+    요청마다 별도 task에서 실행되므로 다른 요청의 트레이스와 섞이지 않음
+    """
+    if not settings.trace_enabled:
+        return None
+    trace = JobTrace(kind)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[JobTrace]:
+    return _current_trace.get()
+
+
+def record_span(
+    name: str,
+    category: str,
+    start: float,
+    duration: float,
+    args: Optional[Dict[str, Any]] = None
+) -> None:
+    """현재 트레이스에 span 기록 (트레이스가 없으면 아무것도 하지 않음)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, category, start, duration, args)
+
+
+def record_event(name: str, category: str = "event", **args) -> None:
+    """현재 트레이스에 순간 이벤트 기록 (캐시 적중 등)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, category, time.perf_counter(), None, args)
+
+
+@contextmanager
+def span(name: str, category: str = "stage", **args) -> Iterator[Dict[str, Any]]:
+    """
+    with 블록 실행 시간을 span으로 기록
+
+    yield한 dict에 값을 넣으면 span args에 함께 저장됨
+    """
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        record_span(name, category, start, time.perf_counter() - start, args)
+
+
+def save_trace(db: Session, history_id: int, trace: JobTrace) -> ClassificationTrace:
+    """작업 트레이스 저장 (같은 작업의 기존 트레이스는 교체, 커밋은 호출자가 수행)"""
+    record = db.get(ClassificationTrace, history_id)
+    if record is None:
+        record = ClassificationTrace(history_id=history_id)
+        db.add(record)
+    record.span_count = len(trace.spans)
+    record.data = trace.dump()
+    return record
+
+
+def load_trace(record: ClassificationTrace) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(record.data).decode("utf-8"))
+
+
+def to_chrome_trace(history_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Chrome trace event 포맷으로 변환 (chrome://tracing, Perfetto에서 열 수 있음)
+
+    기간이 있는 span은 complete 이벤트(ph=X), 순간 이벤트는 ph=i로 변환하고
+    스레드 id는 등장 순서대로 작은 번호로 바꿔서 이름(metadata)을 붙임
+    """
+    thread_ids: Dict[int, int] = {}
+    events = []
+    for name, category, ts, dur, thread, args in payload["spans"]:
+        tid = thread_ids.setdefault(thread, len(thread_ids) + 1)
+        event = {"name": name, "cat": category, "ts": ts, "pid": history_id, "tid": tid}
+        if dur is None:
+            event.update(ph="i", s="t")
+        else:
+            event.update(ph="X", dur=dur)
+        if args:
+            event["args"] = args
+        events.append(event)
+
+    metadata = [{
+        "name": "process_name", "ph": "M", "pid": history_id, "tid": 0,
+        "args": {"name": f"history {history_id} ({payload['kind']})"},
+    }]
+    for thread, tid in thread_ids.items():
+        metadata.append({
+            "name": "thread_name", "ph": "M", "pid": history_id, "tid": tid,
+            "args": {"name": "event loop" if tid == 1 else f"worker {tid - 1}"},
+        })
+
+    return {
+        "traceEvents": metadata + events,
+        "displayTimeUnit": "ms",
+        "otherData": {
+            "history_id": history_id,
+            "kind": payload["kind"],
+            "started_at": payload["started_at"],
+            "dropped_spans": payload.get("dropped", 0),
+        },
+    }
@@ -0,0 +1,225 @@
+import posixpath
+import re
+import shutil
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from xml.sax import handler as sax_handler
+from xml.sax import make_parser
+from xml.sax.saxutils import XMLGenerator
+
+from ..core.preprocessor import DATA_START_ROW
+
+
+# 결과 컬럼 / 위치 (append_results_to_file과 동일)
+RESULT_COLUMNS = ["불량명", "설비명", "조치내용"]
+HEADER_ROW = 3
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_CELL_REF = re.compile(r"^\$?([A-Za-z]+)\$?(\d+)$")
+# XML 1.0에서 허용되지 않는 제어 문자
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _local_name(name: str) -> str:
+    return name.rsplit(":", 1)[-1].rsplit("}", 1)[-1]
+
+
+def find_sheet_part(archive: zipfile.ZipFile, sheet_name: Optional[str]) -> str:
+    """
+    workbook.xml과 관계 파일에서 시트 XML 파트 경로 검색
+
+    시트 이름이 없거나 찾지 못하면 활성 시트(activeTab)를 사용
+    """
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {
+        rel.get("Id"): rel.get("Target")
+        for rel in rels.iter(f"{{{PKG_REL_NS}}}Relationship")
+    }
+
+    sheets = list(workbook.iter(f"{{{MAIN_NS}}}sheet"))
+    if not sheets:
+        raise ValueError("Workbook has no sheets")
+
+    selected = next((s for s in sheets if sheet_name and s.get("name") == sheet_name), None)
+    if selected is None:
+        view = workbook.find(f"{{{MAIN_NS}}}bookViews/{{{MAIN_NS}}}workbookView")
+        active_tab = int(view.get("activeTab", 0)) if view is not None else 0
+        selected = sheets[min(active_tab, len(sheets) - 1)]
+
+    target = targets[selected.get(f"{{{REL_NS}}}id")]
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join("xl", target))
+
+
+def scan_sheet_bounds(archive: zipfile.ZipFile, sheet_part: str) -> Tuple[int, int]:
+    """
+    시트 XML을 iterparse로 훑어서 (최대 행, 최대 컬럼) 계산
+
+    행 단위로 요소를 비우므로 시트 크기와 무관하게 메모리 사용량이 일정함
+    """
+    from openpyxl.utils import column_index_from_string
+
+    max_row = 0
+    max_col = 0
+    with archive.open(sheet_part) as source:
+        row_idx = 0
+        for _, elem in ET.iterparse(source, events=("end",)):
+            name = _local_name(elem.tag)
+            if name == "c":
+                match = _CELL_REF.match(elem.get("r", ""))
+                if match:
+                    max_col = max(max_col, column_index_from_string(match.group(1).upper()))
+            elif name == "row":
+                row_idx = int(elem.get("r", row_idx + 1))
+                # r 속성이 없는 셀은 위치로 컬럼을 계산
+                max_col = max(max_col, sum(1 for child in elem if _local_name(child.tag) == "c"))
+                if len(elem):
+                    max_row = max(max_row, row_idx)
+                elem.clear()
+    return max_row, max_col
+
+
+class _SheetPatchHandler(sax_handler.ContentHandler):
+    """
+    시트 XML을 그대로 복사하면서 지정된 행 끝에 inline string 셀을 추가하는 SAX 핸들러
+
+    네임스페이스 처리를 끄고(qname 그대로) 복사하므로 원본의 접두사와
+    xmlns 선언, 알 수 없는 확장 요소가 모두 유지됨
+    """
+
+    def __init__(self, out, row_values: Dict[int, List[str]], start_col: int, last_row: int):
+        from openpyxl.utils import get_column_letter
+
+        super().__init__()
+        self.gen = XMLGenerator(out, encoding="UTF-8", short_empty_elements=True)
+        self.row_values = row_values
+        self.pending_rows = deque(sorted(row_values))
+        self.start_col = start_col
+        self.last_col = start_col + len(RESULT_COLUMNS) - 1
+        self.column_letters = [get_column_letter(col) for col in range(start_col, self.last_col + 1)]
+        self.last_row = last_row
+        self.prefix = ""
+        self.current_row = 0
+
+    # --- 출력 헬퍼 ---
+    def _tag(self, local: str) -> str:
+        return f"{self.prefix}{local}"
+
+    def _write_cells(self, row: int) -> None:
+        for offset, value in enumerate(self.row_values.get(row, [])):
+            if not value:
+                continue
+            ref = f"{self.column_letters[offset]}{row}"
+            self.gen.startElement(self._tag("c"), {"r": ref, "t": "inlineStr"})
+            self.gen.startElement(self._tag("is"), {})
+            self.gen.startElement(self._tag("t"), {"xml:space": "preserve"})
+            self.gen.characters(_ILLEGAL_XML_CHARS.sub("", value))
+            self.gen.endElement(self._tag("t"))
+            self.gen.endElement(self._tag("is"))
+            self.gen.endElement(self._tag("c"))
+
+    def _write_new_rows(self, before: Optional[int]) -> None:
+        # 원본에 없는 행(빈 행)에 들어갈 값은 새 row 요소로 추가
+        while self.pending_rows and (before is None or self.pending_rows[0] < before):
+            row = self.pending_rows.popleft()
+            self.gen.startElement(self._tag("row"), {"r": str(row)})
+            self._write_cells(row)
+            self.gen.endElement(self._tag("row"))
+
+    # --- SAX 이벤트 ---
+    def startDocument(self):
+        self.gen.startDocument()
+
+    def endDocument(self):
+        self.gen.endDocument()
+
+    def startElement(self, name, attrs):
+        local = _local_name(name)
+        attrs = dict(attrs.items())
+
+        if local == "sheetData":
+            self.prefix = name[: len(name) - len(local)]
+        elif local == "dimension" and "ref" in attrs:
+            first = attrs["ref"].split(":")[0]
+            match = _CELL_REF.match(first)
+            first = first if match else "A1"
+            attrs["ref"] = f"{first}:{self.column_letters[-1]}{max(self.last_row, 1)}"
+        elif local == "row":
+            self.current_row = int(attrs.get("r", self.current_row + 1))
+            self._write_new_rows(before=self.current_row)
+            if self.current_row in self.row_values:
+                if self.pending_rows and self.pending_rows[0] == self.current_row:
+                    self.pending_rows.popleft()
+                if "spans" in attrs:
+                    first_span = attrs["spans"].split(":")[0]
+                    attrs["spans"] = f"{first_span}:{self.last_col}"
+
+        self.gen.startElement(name, attrs)
+
+    def endElement(self, name):
+        local = _local_name(name)
+        if local == "row" and self.current_row in self.row_values:
+            self._write_cells(self.current_row)
+        elif local == "sheetData":
+            self._write_new_rows(before=None)
+        self.gen.endElement(name)
+
+    def characters(self, content):
+        self.gen.characters(content)
+
+    def ignorableWhitespace(self, content):
+        self.gen.ignorableWhitespace(content)
+
+    def processingInstruction(self, target, data):
+        self.gen.processingInstruction(target, data)
+
+
+def patch_results_into_xlsx(
+    original_file_path: str,
+    output_file_path: str,
+    classifications: List[Dict[str, str]],
+    sheet_name: Optional[str] = None
+) -> str:
+    """
+    xlsx를 ZIP으로 다루어 대상 시트 XML만 스트리밍으로 다시 쓰면서 결과 컬럼 추가
+
+    - 대상 시트: iterparse로 최대 컬럼을 구한 뒤, SAX로 복사하면서
+      3행에 헤더, 4행부터 결과를 inline string 셀로 추가
+    - 나머지 파트(스타일, 공유 문자열, 다른 시트 등): 내용 그대로 복사
+    - 병합/서식/수식은 건드리지 않으므로 원본과 동일하게 열림
+      (결과 셀에는 별도 서식을 적용하지 않음)
+    """
+    row_values: Dict[int, List[str]] = {HEADER_ROW: list(RESULT_COLUMNS)}
+    for i, result in enumerate(classifications):
+        values = ["" if result.get(c) is None else str(result.get(c)) for c in RESULT_COLUMNS]
+        if any(values):
+            row_values[DATA_START_ROW + i] = values
+
+    with zipfile.ZipFile(original_file_path) as source:
+        sheet_part = find_sheet_part(source, sheet_name)
+        max_row, max_col = scan_sheet_bounds(source, sheet_part)
+        last_row = max(max_row, max(row_values))
+
+        with zipfile.ZipFile(output_file_path, "w") as target:
+            for item in source.infolist():
+                if item.filename == sheet_part:
+                    info = zipfile.ZipInfo(item.filename, date_time=item.date_time)
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    with source.open(item) as src, target.open(info, "w") as dst:
+                        patcher = _SheetPatchHandler(dst, row_values, max_col + 1, last_row)
+                        parser = make_parser()
+                        parser.setFeature(sax_handler.feature_namespaces, False)
+                        parser.setContentHandler(patcher)
+                        parser.parse(src)
+                else:
+                    with source.open(item) as src, target.open(item, "w") as dst:
+                        shutil.copyfileobj(src, dst)
+
+    return output_file_path
@@ -0,0 +1,280 @@
+"""
+감시 폴더 수집기
+
+MES가 일보를 내보내는 공유 폴더를 감시하다가 새 파일/바뀐 파일을 업로드 디렉토리로
+복사하고 전처리+분류 작업(kind="ingest")으로 등록합니다. 작업은 python -m app.worker가 실행합니다.
+
+- inotify(watchfiles) 이벤트로 감지하고, 쓸 수 없는 경로(네트워크 공유 폴더 등)는 polling 사용
+- 크기/수정시각이 watch_settle_seconds 동안 바뀌지 않아야 쓰기 완료로 보고 가져감
+- 파일 내용 해시를 watched_files에 기록하므로 같은 내용은 한 번만 등록
+  (재시작 시 폴더 전체를 다시 훑어도 이미 등록된 파일은 건너뜀)
+
+사용법:
+    python -m app.watcher                          # WATCH_DIRS 설정의 폴더 감시
+    python -m app.watcher --dir /mnt/mes/daily --dir /mnt/mes/weekly
+    python -m app.watcher --polling --poll-interval 10
+"""
+
+import argparse
+import asyncio
+import logging
+import shutil
+import signal
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from .config import settings, ensure_directories
+from .database import SessionLocal, init_db
+from .models import ClassificationHistory, UserSettings, WatchedFile
+from .schemas import ClassificationRequest
+from .services.artifact_store import hash_file
+from .services.file_processor import create_unique_filename, is_report_workbook
+from .services.job_queue import enqueue_job
+from .services.structured_log import configure_logging, job_extra, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+
+class DropFolderWatcher:
+    """
+    폴더 감시 → 쓰기 완료 대기 → 작업 등록
+
+    감지한 파일은 pending에 두고 (크기, 수정시각)이 settle_seconds 동안 그대로일 때
+    등록함. 감지(이벤트/폴더 스캔)와 등록을 분리했으므로 이벤트가 여러 번 오거나
+    이벤트 없이 스캔으로만 발견해도 같은 방식으로 처리됨
+    """
+
+    def __init__(
+        self,
+        directories: Sequence[Path],
+        recursive: Optional[bool] = None,
+        settle_seconds: Optional[float] = None,
+        force_polling: Optional[bool] = None,
+        poll_interval: Optional[float] = None,
+        session_factory: Callable = SessionLocal
+    ):
+        self.directories = [Path(d) for d in directories]
+        self.recursive = settings.watch_recursive if recursive is None else recursive
+        self.settle_seconds = settings.watch_settle_seconds if settle_seconds is None else settle_seconds
+        self.force_polling = settings.watch_force_polling if force_polling is None else force_polling
+        self.poll_interval = poll_interval if poll_interval is not None else settings.watch_poll_interval_seconds
+        self.session_factory = session_factory
+        # 경로 → ((크기, 수정시각 ns), 마지막으로 바뀐 것을 본 시각), None이면 아직 확인 전
+        self.pending: Dict[Path, Optional[Tuple[Tuple[int, int], float]]] = {}
+        self.ingested = 0
+
+    def observe(self, path: Path) -> None:
+        """새로 생겼거나 바뀐 파일 (쓰기 완료 여부는 settled에서 판단)"""
+        if is_report_workbook(path):
+            self.pending[path] = None
+
+    def scan(self) -> None:
+        """폴더 전체 확인 (시작 시 감시가 멈춘 동안 들어온 파일 처리)"""
+        for directory in self.directories:
+            paths = directory.rglob("*") if self.recursive else directory.glob("*")
+            for path in paths:
+                if path.is_file():
+                    self.observe(path)
+
+    def settled(self, now: float) -> List[Path]:
+        """
+        쓰기가 끝난 것으로 보이는 파일을 pending에서 꺼내 반환
+
+        Args:
+            now: time.monotonic() 기준 현재 시각
+        """
+        ready = []
+        for path, seen in list(self.pending.items()):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # 임시 파일 이름 변경 / 삭제
+                del self.pending[path]
+                continue
+
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if seen is None or seen[0] != signature:
+                self.pending[path] = (signature, now)
+            elif now - seen[1] >= self.settle_seconds:
+                del self.pending[path]
+                ready.append(path)
+        return ready
+
+    def ingest(self, path: Path) -> Optional[int]:
+        """
+        파일을 업로드 디렉토리로 복사하고 전처리+분류 작업 등록
+
+        Returns:
+            등록한 이력 ID, 이미 등록된 내용이거나 아직 읽을 수 없으면 None
+        """
+        if path.suffix.lower() == ".xlsx" and not zipfile.is_zipfile(path):
+            # 쓰는 중이거나 손상된 파일: 다시 쓰이면 이벤트로 다시 감지됨
+            logger.warning("엑셀 파일을 읽을 수 없어 건너뜁니다: %s", path)
+            return None
+
+        stat = path.stat()
+        digest, size = hash_file(path)
+        db = self.session_factory()
+        upload_path = None
+        try:
+            if db.query(WatchedFile.id).filter(WatchedFile.sha256 == digest).first() is not None:
+                return None
+
+            user_settings = db.query(UserSettings).first()
+            upload_path = create_unique_filename(path.name, Path(settings.upload_dir))
+            shutil.copyfile(path, upload_path)
+            request = ClassificationRequest(
+                file_path=str(upload_path),
+                sheet_name=(user_settings and user_settings.sheet_name) or settings.default_sheet_name,
+                column_name=(user_settings and user_settings.column_name) or settings.default_column_name,
+                prompt=(user_settings and user_settings.prompt) or settings.default_prompt
+            )
+
+            # 이력 / 감시 기록 / 작업을 한 트랜잭션으로 추가 (sha256 unique로 중복 등록 방지)
+            history = ClassificationHistory(
+                filename=upload_path.name,
+                file_path=str(upload_path),
+                sheet_name=request.sheet_name,
+                column_name=request.column_name,
+                source_sha256=digest,
+                status="queued"
+            )
+            db.add(history)
+            db.flush()
+            history_id = history.id
+            db.add(WatchedFile(
+                sha256=digest,
+                path=str(path),
+                size=size,
+                mtime=datetime.utcfromtimestamp(stat.st_mtime),
+                history_id=history_id
+            ))
+            enqueue_job(db, history, request.model_dump(), kind="ingest")
+            db.commit()
+        except IntegrityError:
+            # 다른 감시 프로세스가 먼저 등록
+            db.rollback()
+            upload_path.unlink(missing_ok=True)
+            return None
+        except Exception:
+            db.rollback()
+            if upload_path is not None:
+                upload_path.unlink(missing_ok=True)
+            raise
+        finally:
+            db.close()
+
+        self.ingested += 1
+        logger.info("감시 폴더 파일 등록", extra=job_extra(path=str(path), history_id=history_id, sha256=digest))
+        return history_id
+
+    async def ingest_settled(self) -> None:
+        for path in self.settled(time.monotonic()):
+            try:
+                await asyncio.to_thread(self.ingest, path)
+            except Exception as e:
+                logger.error("감시 폴더 파일 등록 실패 (%s): %s", path, e)
+
+    async def _settle_loop(self, stop_event: asyncio.Event) -> None:
+        interval = max(0.1, min(1.0, self.settle_seconds / 2))
+        while not stop_event.is_set():
+            await self.ingest_settled()
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _watch(self, stop_event: asyncio.Event, force_polling: bool) -> None:
+        from watchfiles import Change, awatch
+
+        async for changes in awatch(
+            *self.directories,
+            watch_filter=lambda change, path: change != Change.deleted and is_report_workbook(Path(path)),
+            recursive=self.recursive,
+            force_polling=force_polling,
+            poll_delay_ms=int(self.poll_interval * 1000),
+            stop_event=stop_event
+        ):
+            for _, path in changes:
+                self.observe(Path(path))
+
+    async def run(self, stop_event: Optional[asyncio.Event] = None) -> int:
+        """
+        감시 루프 (stop_event가 설정될 때까지)
+
+        Returns:
+            등록한 파일 수
+        """
+        stop_event = stop_event or asyncio.Event()
+        missing = [str(d) for d in self.directories if not d.is_dir()]
+        if missing:
+            raise FileNotFoundError(f"감시할 폴더를 찾을 수 없습니다: {', '.join(missing)}")
+
+        logger.info(
+            "폴더 감시 시작",
+            extra=job_extra(directories=[str(d) for d in self.directories], polling=self.force_polling)
+        )
+        self.scan()
+        settle_task = asyncio.create_task(self._settle_loop(stop_event))
+        try:
+            try:
+                await self._watch(stop_event, self.force_polling)
+            except OSError as e:
+                if self.force_polling:
+                    raise
+                # inotify 한도 초과 / 지원하지 않는 파일시스템
+                logger.warning("파일 변경 알림을 사용할 수 없어 polling으로 전환합니다: %s", e)
+                await self._watch(stop_event, True)
+        finally:
+            settle_task.cancel()
+        logger.info("폴더 감시 종료", extra=job_extra(ingested=self.ingested))
+        return self.ingested
+
+
+def main():
+    parser = argparse.ArgumentParser(description='감시 폴더의 일보 파일을 분류 작업으로 등록')
+    parser.add_argument('--dir', action='append', dest='directories', help='감시할 폴더 (여러 번 지정 가능, 기본값: WATCH_DIRS)')
+    parser.add_argument('--recursive', action='store_true', default=None, help='하위 폴더 포함')
+    parser.add_argument('--settle-seconds', type=float, help=f'쓰기 완료 판단 시간 초 (기본값: {settings.watch_settle_seconds})')
+    parser.add_argument('--polling', action='store_true', default=None, help='파일 변경 알림 대신 polling 사용')
+    parser.add_argument('--poll-interval', type=float, help=f'polling 간격 초 (기본값: {settings.watch_poll_interval_seconds})')
+    args = parser.parse_args()
+
+    directories = args.directories or [d.strip() for d in settings.watch_dirs.split(",") if d.strip()]
+    if not directories:
+        parser.error("감시할 폴더가 없습니다. --dir 또는 WATCH_DIRS를 지정해주세요.")
+
+    configure_logging()
+    # 변경 감지마다 남기는 INFO 로그 제외
+    logging.getLogger("watchfiles").setLevel(logging.WARNING)
+    ensure_directories()
+    init_db()
+
+    watcher = DropFolderWatcher(
+        directories,
+        recursive=args.recursive,
+        settle_seconds=args.settle_seconds,
+        force_polling=args.polling,
+        poll_interval=args.poll_interval
+    )
+
+    async def run():
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop_event.set)
+        await watcher.run(stop_event)
+
+    try:
+        asyncio.run(run())
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+분류 워커 프로세스
+
+API(/api/classify/jobs)로 등록된 작업을 DB의 임대(job_leases) 행으로 가져가서 실행합니다.
+같은 DB를 쓰는 여러 프로세스/호스트에서 실행해도 작업은 한 워커만 처리하며,
+heartbeat가 끊긴(워커가 죽은) 작업은 임대가 만료된 뒤 다른 워커가 다시 가져갑니다.
+
+사용법:
+    python -m app.worker                     # 계속 실행 (SIGTERM/Ctrl+C: 실행 중인 작업을 끝내고 종료)
+    python -m app.worker --concurrency 4
+    python -m app.worker --once              # 대기 작업이 없어질 때까지만 실행
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Callable, Optional, Set
+
+from fastapi import HTTPException
+
+from .config import settings, ensure_directories
+from .core.preprocessor import run_preprocessing_pipeline
+from .database import AsyncSessionLocal, SessionLocal, init_db
+from .api.classification import require_user_settings, run_classification
+from .models import ClassificationHistory
+from .schemas import ClassificationRequest
+from .services.job_queue import LeasedJob, claim_job, complete_job, fail_job, heartbeat_job, release_job
+from .services.structured_log import bind_log_context, configure_logging, job_extra, shutdown_logging
+from .services.tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    임대 → 실행 → 완료(임대 행 삭제) 루프
+
+    임대 조회/연장은 짧은 동기 트랜잭션이므로 스레드에서 실행하고,
+    작업 실행은 API와 같은 run_classification을 async 세션으로 호출함
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        session_factory: Callable = SessionLocal,
+        async_session_factory: Callable = AsyncSessionLocal
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.concurrency = max(1, concurrency or settings.worker_concurrency)
+        self.poll_interval = poll_interval if poll_interval is not None else settings.worker_poll_interval_seconds
+        self.session_factory = session_factory
+        self.async_session_factory = async_session_factory
+        self.processed = 0
+        self._stopping: Optional[asyncio.Event] = None
+        self._running: Set[asyncio.Task] = set()
+        self._lost: Set[int] = set()
+
+    def _with_session(self, func, *args):
+        db = self.session_factory()
+        try:
+            return func(db, *args)
+        finally:
+            db.close()
+
+    async def _lease(self, func, *args):
+        return await asyncio.to_thread(self._with_session, func, *args)
+
+    def stop(self) -> None:
+        """
+        종료 요청: 첫 호출은 새 작업을 가져가지 않고 실행 중인 작업을 끝낸 뒤 종료,
+        두 번째 호출은 실행 중인 작업을 중단하고 임대를 반납
+        """
+        if self._stopping is None:
+            return
+        if self._stopping.is_set():
+            for task in list(self._running):
+                task.cancel()
+        self._stopping.set()
+
+    async def run(self, once: bool = False) -> int:
+        """
+        작업 처리 루프
+
+        Args:
+            once: True면 가져갈 작업이 없고 실행 중인 작업도 끝나면 종료
+
+        Returns:
+            처리한 작업 수
+        """
+        self._stopping = asyncio.Event()
+        slots = asyncio.Semaphore(self.concurrency)
+        logger.info("워커 시작", extra=job_extra(worker_id=self.worker_id, concurrency=self.concurrency))
+
+        while not self._stopping.is_set():
+            await slots.acquire()
+            if self._stopping.is_set():
+                # 모든 슬롯이 사용 중일 때 종료 요청이 들어오면 새 작업을 가져가지 않음
+                slots.release()
+                break
+            try:
+                job = await self._lease(claim_job, self.worker_id)
+            except Exception as e:
+                logger.warning("작업 임대 실패: %s", e)
+                job = None
+
+            if job is None:
+                slots.release()
+                if once and not self._running:
+                    break
+                # 대기 작업이 없으면 poll_interval 동안 기다리되 종료 요청은 바로 반영
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._run_job(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        logger.info("워커 종료", extra=job_extra(worker_id=self.worker_id, processed=self.processed))
+        return self.processed
+
+    async def _heartbeat(self, job: LeasedJob, task: asyncio.Task) -> None:
+        """임대 연장, 임대를 잃으면 (다른 워커가 가져감) 실행 중인 작업 중단"""
+        while True:
+            await asyncio.sleep(settings.job_heartbeat_seconds)
+            try:
+                alive = await self._lease(heartbeat_job, job)
+            except Exception as e:
+                # DB 일시 오류: 만료 전에 다음 heartbeat에서 다시 시도
+                logger.warning("임대 연장 실패: %s", e)
+                continue
+            if not alive:
+                logger.warning("임대가 만료되어 작업을 중단합니다.")
+                self._lost.add(job.id)
+                task.cancel()
+                return
+
+    async def _run_job(self, job: LeasedJob) -> None:
+        bind_log_context(history_id=job.history_id, job=job.kind, worker_id=self.worker_id)
+
+        if job.attempts > settings.job_max_attempts:
+            logger.error("재시도 횟수 초과로 작업을 실패 처리합니다.", extra=job_extra(attempts=job.attempts))
+            await self._lease(fail_job, job, f"작업 재시도 횟수({settings.job_max_attempts}회)를 초과했습니다.")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job, asyncio.current_task()))
+        try:
+            handler = JOB_HANDLERS.get(job.kind)
+            if handler is None:
+                await self._lease(fail_job, job, f"알 수 없는 작업 종류입니다: {job.kind}")
+                return
+            await handler(self, job)
+            await self._lease(complete_job, job)
+            self.processed += 1
+        except asyncio.CancelledError:
+            if job.id in self._lost:
+                # 다른 워커가 다시 실행하므로 결과를 기록하지 않음
+                self._lost.discard(job.id)
+            else:
+                # 종료 요청으로 중단: 다른 워커가 바로 가져가도록 반납
+                await self._lease(release_job, job)
+        except Exception as e:
+            # 실패 내용은 이력에 기록됨 (run_classification)
+            logger.error("작업 실패: %s", e)
+            await self._lease(complete_job, job)
+            self.processed += 1
+        finally:
+            heartbeat.cancel()
+
+
+async def run_classify_job(worker: Worker, job: LeasedJob, preprocess: bool = False) -> None:
+    """
+    단일 파일 분류 작업 (API의 /classify와 같은 처리)
+    
+    preprocess=True면 원본 파일을 먼저 전처리 (감시 폴더에서 가져간 파일)
+    """
+    request = ClassificationRequest(**job.payload)
+    async with worker.async_session_factory() as db:
+        history = await db.get(ClassificationHistory, job.history_id)
+        if history is None:
+            return
+
+        # 임대가 만료되어 다시 실행하는 경우에도 처음부터 진행
+        history.status = "processing"
+        history.error_message = None
+        history.processed_rows = 0
+        history.failed_rows = 0
+        await db.commit()
+
+        try:
+            user_settings = await require_user_settings(db)
+        except HTTPException as e:
+            history.status = "failed"
+            history.error_message = e.detail
+            await db.commit()
+            raise RuntimeError(e.detail)
+
+        if preprocess:
+            try:
+                processed_path = await asyncio.to_thread(
+                    run_preprocessing_pipeline,
+                    Path(request.file_path),
+                    sheet_name=request.sheet_name,
+                    column_name=request.column_name
+                )
+            except Exception as e:
+                history.status = "failed"
+                history.error_message = f"전처리 실패: {e}"
+                history.completed_at = datetime.utcnow()
+                await db.commit()
+                raise
+            history.filename = processed_path.name
+            history.file_path = str(processed_path)
+            await db.commit()
+            request = request.model_copy(update={"file_path": str(processed_path)})
+        
+        baseline = None
+        if history.baseline_history_id:
+            baseline = await db.get(ClassificationHistory, history.baseline_history_id)
+
+        await run_classification(db, history, request, user_settings, baseline, start_trace("worker"))
+
+
+# 작업 종류별 실행 함수
+JOB_HANDLERS = {
+    "classify": run_classify_job,
+    "ingest": partial(run_classify_job, preprocess=True),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='분류 작업 워커')
+    parser.add_argument('--worker-id', help='워커 식별자 (기본값: 호스트명:PID:임의값)')
+    parser.add_argument('--concurrency', type=int, help=f'동시 실행 작업 수 (기본값: {settings.worker_concurrency})')
+    parser.add_argument('--poll-interval', type=float, help=f'대기 작업 조회 간격 초 (기본값: {settings.worker_poll_interval_seconds})')
+    parser.add_argument('--once', action='store_true', help='대기 작업이 없어지면 종료')
+    args = parser.parse_args()
+
+    configure_logging()
+    ensure_directories()
+    init_db()
+
+    worker = Worker(worker_id=args.worker_id, concurrency=args.concurrency, poll_interval=args.poll_interval)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run(once=args.once)
+
+    try:
+        asyncio.run(run())
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+앱 기동 시간 벤치마크
+
+새 프로세스에서 app.main import 시간과, uvicorn을 띄운 뒤 /health가
+처음 200을 돌려줄 때까지의 시간을 여러 번 측정해서 중앙값을 출력합니다.
+DB/데이터 디렉토리는 임시 디렉토리를 사용하므로 실제 데이터에 영향 없음.
+
+사용법:
+    python scripts/bench_startup.py                 # import + /health 각 5회
+    python scripts/bench_startup.py --runs 10
+    python scripts/bench_startup.py --top 15        # import 시간이 큰 모듈 상위 15개 (-X importtime)
+    python scripts/bench_startup.py --skip-health   # import 시간만 측정
+"""
+
+import sys
+import os
+import argparse
+import socket
+import statistics
+import subprocess
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def bench_env(data_dir: Path) -> dict:
+    """임시 디렉토리를 쓰도록 설정을 덮어쓴 환경 변수"""
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{data_dir / 'app.db'}",
+        "UPLOAD_DIR": str(data_dir / "uploads"),
+        "RESULTS_DIR": str(data_dir / "results"),
+        "ANALYTICS_DIR": str(data_dir / "analytics"),
+        "ARTIFACTS_DIR": str(data_dir / "artifacts"),
+        "PROFILES_DIR": str(data_dir / "profiles"),
+        "STORAGE_SWEEP_INTERVAL_MINUTES": "0",
+        "LOG_LEVEL": "WARNING",
+    })
+    return env
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def top_imports(env: dict, limit: int) -> list:
+    """-X importtime 결과에서 누적 시간이 큰 최상위 패키지 (자신 포함 누적 μs 기준)"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True
+    ).stderr
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.rstrip()
+        package = name.strip().split(".")[0]
+        # 들여쓰기가 가장 얕은 항목이 해당 패키지의 전체 누적 시간
+        depth = len(name) - len(name.lstrip())
+        current = totals.get(package)
+        if current is None or depth < current[0]:
+            totals[package] = (depth, int(cumulative))
+    ranked = sorted(((us, package) for package, (_, us) in totals.items()), reverse=True)
+    return ranked[:limit]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_health(env: dict, timeout: float = 60.0) -> float:
+    """uvicorn 프로세스 시작부터 /health 첫 200 응답까지의 시간"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn이 종료되었습니다 (exit code {process.returncode})")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"{timeout}초 안에 /health가 응답하지 않았습니다")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summarize(label: str, samples: list) -> None:
+    print(
+        f"{label:<18} median {statistics.median(samples) * 1000:8.1f} ms   "
+        f"min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms   (n={len(samples)})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='앱 import / 첫 /health 응답 시간 측정')
+    parser.add_argument('--runs', type=int, default=5, help='측정 횟수 (기본값: 5)')
+    parser.add_argument('--top', type=int, default=0, help='import 시간이 큰 패키지 상위 N개 출력')
+    parser.add_argument('--skip-health', action='store_true', help='/health 측정 생략')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = bench_env(Path(temp_dir))
+
+        # 첫 실행은 .pyc 생성 비용이 섞이므로 버림
+        measure_import(env)
+        summarize("import app.main", [measure_import(env) for _ in range(args.runs)])
+
+        if not args.skip_health:
+            summarize("first /health", [measure_health(env) for _ in range(args.runs)])
+
+        if args.top:
+            print(f"\nimport 시간 상위 {args.top}개 패키지 (누적)")
+            for microseconds, package in top_imports(env, args.top):
+                print(f"  {microseconds / 1000:8.1f} ms  {package}")
+
+
+if __name__ == "__main__":
+    main()
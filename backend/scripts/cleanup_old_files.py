@@ -1,26 +1,31 @@
 #!/usr/bin/env python3
 """
-30일 이상된 파일 자동 삭제 스크립트
+저장소 정리 스크립트
+
+DB 이력 기준으로 보관 기간이 지난 파일 삭제, DB와 디스크 정합성 맞추기,
+용량 한도 초과 시 오래 사용하지 않은 결과부터 삭제를 수행합니다.
+(앱 실행 중에는 STORAGE_SWEEP_INTERVAL_MINUTES 간격으로 같은 작업이 자동 실행됨)
 
 사용법:
     python cleanup_old_files.py              # 실제 삭제 실행
-    python cleanup_old_files.py --dry-run    # 삭제 대상 파일만 출력 (삭제 안함)
+    python cleanup_old_files.py --dry-run    # 삭제 대상만 출력 (삭제 안함)
+    python cleanup_old_files.py --days 7 --quota-mb 2048
 
 cron 설정 예시 (매일 새벽 2시에 실행):
     0 2 * * * cd /path/to/backend && python scripts/cleanup_old_files.py >> logs/cleanup.log 2>&1
 """
 
-import os
 import sys
 import argparse
 import logging
 from pathlib import Path
-from datetime import datetime, timedelta
 
 # 프로젝트 루트를 path에 추가
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.config import settings
+from app.database import SessionLocal
+from app.services.storage import run_storage_sweep
 
 # 로깅 설정
 logging.basicConfig(
@@ -30,111 +35,58 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def get_old_files(directory: Path, days: int = 30) -> list[Path]:
-    """
-    지정된 디렉토리에서 특정 일수 이상 된 파일 목록 반환
-    
-    Args:
-        directory: 검색할 디렉토리 경로
-        days: 기준 일수 (기본값: 30일)
-    
-    Returns:
-        오래된 파일들의 Path 리스트
-    """
-    if not directory.exists():
-        logger.warning(f"디렉토리가 존재하지 않습니다: {directory}")
-        return []
-    
-    old_files = []
-    cutoff_time = datetime.now() - timedelta(days=days)
-    
-    for file_path in directory.iterdir():
-        if file_path.is_file():
-            mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
-            if mtime < cutoff_time:
-                old_files.append(file_path)
-    
-    return old_files
-
-
-def delete_files(files: list[Path], dry_run: bool = False) -> tuple[int, int]:
-    """
-    파일 목록 삭제
-    
-    Args:
-        files: 삭제할 파일 목록
-        dry_run: True면 실제 삭제하지 않고 로그만 출력
-    
-    Returns:
-        (성공 개수, 실패 개수)
-    """
-    success_count = 0
-    fail_count = 0
-    
-    for file_path in files:
-        try:
-            if dry_run:
-                logger.info(f"[DRY-RUN] 삭제 예정: {file_path}")
-            else:
-                file_path.unlink()
-                logger.info(f"삭제됨: {file_path}")
-            success_count += 1
-        except Exception as e:
-            logger.error(f"삭제 실패: {file_path} - {e}")
-            fail_count += 1
-    
-    return success_count, fail_count
-
-
 def main():
-    parser = argparse.ArgumentParser(description='30일 이상된 파일 삭제')
+    parser = argparse.ArgumentParser(description='보관 기간/용량 한도 기준 저장소 정리')
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='실제 삭제하지 않고 대상만 출력'
+    )
     parser.add_argument(
-        '--dry-run', 
-        action='store_true', 
-        help='실제 삭제하지 않고 대상 파일만 출력'
+        '--days',
+        type=int,
+        default=settings.retention_days,
+        help=f'보관 일수 (기본값: {settings.retention_days}, 0이면 미적용)'
     )
     parser.add_argument(
-        '--days', 
-        type=int, 
-        default=30, 
-        help='기준 일수 (기본값: 30)'
+        '--quota-mb',
+        type=int,
+        default=settings.storage_quota_mb,
+        help=f'용량 한도 MB (기본값: {settings.storage_quota_mb}, 0이면 미적용)'
+    )
+    parser.add_argument(
+        '--orphan-grace-hours',
+        type=float,
+        default=settings.orphan_grace_hours,
+        help=f'이력이 참조하지 않는 파일 유예 시간 (기본값: {settings.orphan_grace_hours})'
     )
     args = parser.parse_args()
-    
+
     logger.info("=" * 50)
-    logger.info(f"파일 정리 시작 - 기준: {args.days}일 이상 된 파일")
+    logger.info(f"저장소 정리 시작 - 보관 {args.days}일, 용량 한도 {args.quota_mb}MB")
     if args.dry_run:
         logger.info("*** DRY-RUN 모드 (실제 삭제 안함) ***")
     logger.info("=" * 50)
-    
-    # 정리할 디렉토리들
-    directories = [
-        Path(settings.upload_dir),
-        Path(settings.results_dir),
-    ]
-    
-    total_success = 0
-    total_fail = 0
-    
-    for directory in directories:
-        logger.info(f"\n[{directory}] 검색 중...")
-        
-        old_files = get_old_files(directory, args.days)
-        
-        if not old_files:
-            logger.info(f"  삭제 대상 파일 없음")
-            continue
-        
-        logger.info(f"  삭제 대상: {len(old_files)}개 파일")
-        success, fail = delete_files(old_files, args.dry_run)
-        total_success += success
-        total_fail += fail
-    
-    logger.info("\n" + "=" * 50)
-    if args.dry_run:
-        logger.info(f"결과: {total_success}개 파일 삭제 예정")
-    else:
-        logger.info(f"결과: {total_success}개 삭제됨, {total_fail}개 실패")
+
+    db = SessionLocal()
+    try:
+        report = run_storage_sweep(
+            db,
+            retention_days=args.days,
+            quota_bytes=args.quota_mb * 1024 * 1024,
+            orphan_grace_hours=args.orphan_grace_hours,
+            dry_run=args.dry_run
+        )
+    finally:
+        db.close()
+
+    logger.info("=" * 50)
+    logger.info(f"스캔한 파일: {report['scanned_files']}개")
+    logger.info(f"참조 없는 파일: {report['orphan_files']}개")
+    logger.info(f"보관 기간 경과: {report['retention_files']}개")
+    logger.info(f"용량 한도 초과로 삭제: {report['evicted_files']}개")
+    logger.info(f"만료 처리된 이력: {report['expired_histories']}건")
+    logger.info(f"{'확보 예정' if args.dry_run else '확보'} 용량: {report['freed_bytes'] / 1024 / 1024:.1f}MB")
     logger.info("=" * 50)
 
 
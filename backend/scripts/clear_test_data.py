@@ -13,7 +13,7 @@ import shutil
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.database import SessionLocal, engine, Base
-from app.models import ClassificationHistory, UserSettings
+from app.models import Artifact, ClassificationHistory, ClassificationRow, ClassificationTrace, UserSettings
 from app.config import settings
 
 
@@ -22,10 +22,22 @@ def clear_database():
     db = SessionLocal()
     
     try:
+        # 행 단위 결과 삭제
+        deleted_rows = db.query(ClassificationRow).delete()
+        print(f"✅ 행 단위 결과 삭제: {deleted_rows}건")
+        
+        # 작업 트레이스 삭제
+        deleted_traces = db.query(ClassificationTrace).delete()
+        print(f"✅ 작업 트레이스 삭제: {deleted_traces}건")
+        
         # 모든 이력 삭제
         deleted_history = db.query(ClassificationHistory).delete()
         print(f"✅ 이력 데이터 삭제: {deleted_history}건")
         
+        # 아티팩트 레코드 삭제
+        deleted_artifacts = db.query(Artifact).delete()
+        print(f"✅ 아티팩트 삭제: {deleted_artifacts}건")
+        
         # 모든 설정 삭제 (선택사항 - 주석 처리)
         # deleted_settings = db.query(UserSettings).delete()
         # print(f"✅ 설정 데이터 삭제: {deleted_settings}건")
@@ -57,6 +69,14 @@ def clear_files():
             if file.is_file():
                 file.unlink()
                 print(f"✅ 결과 파일 삭제: {file.name}")
+    
+    # 아티팩트 저장소 정리 (해시 앞 2글자 디렉토리 포함)
+    artifacts_dir = Path(settings.artifacts_dir)
+    if artifacts_dir.exists():
+        for file in artifacts_dir.rglob("*"):
+            if file.is_file():
+                file.unlink()
+        print("✅ 아티팩트 저장소 정리")
 
 
 def main():
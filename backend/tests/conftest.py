@@ -1,13 +1,15 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from pathlib import Path
 import tempfile
 import shutil
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_async_db
 from app.config import settings
 
 
@@ -16,6 +18,10 @@ TEST_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# async 라우터용 (같은 파일 DB 사용, 테스트마다 이벤트 루프가 달라지므로 연결 풀 미사용)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 
 @pytest.fixture(scope="function")
 def test_db():
@@ -38,7 +44,12 @@ def client(test_db):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -49,9 +60,13 @@ def temp_upload_dir():
     temp_dir = tempfile.mkdtemp()
     original_upload_dir = settings.upload_dir
     original_results_dir = settings.results_dir
+    original_analytics_dir = settings.analytics_dir
+    original_artifacts_dir = settings.artifacts_dir
     
     settings.upload_dir = temp_dir
     settings.results_dir = temp_dir
+    settings.analytics_dir = str(Path(temp_dir) / "analytics")
+    settings.artifacts_dir = str(Path(temp_dir) / "artifacts")
     
     yield temp_dir
     
@@ -59,3 +74,5 @@ def temp_upload_dir():
     shutil.rmtree(temp_dir, ignore_errors=True)
     settings.upload_dir = original_upload_dir
     settings.results_dir = original_results_dir
+    settings.analytics_dir = original_analytics_dir
+    settings.artifacts_dir = original_artifacts_dir
@@ -1,6 +1,31 @@
 import pytest
+import zipfile
+import openpyxl
+import polars as pl
 from io import BytesIO
+from pathlib import Path
+from datetime import datetime, timedelta
 from app.models import UserSettings, ClassificationHistory
+from app.config import settings
+
+
+def make_report_workbook() -> bytes:
+    """일보 형식(3행 헤더, 4행부터 데이터, 병합 셀)의 엑셀 파일 생성"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["B1"] = "일보"
+    ws["B3"] = "Model"
+    ws["C3"] = "Issue"
+    ws["B4"] = "M1"
+    ws["C4"] = "라인 정지"
+    ws["C5"] = "설비 점검"
+    ws["B6"] = "M2"
+    ws["C6"] = "스크래치 발생"
+    ws.merge_cells("B4:B5")
+    
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
 
 
 def test_root_endpoint(client):
@@ -122,3 +147,1043 @@ def test_get_history_by_id_not_found(client, test_db):
     """Test getting non-existent history"""
     response = client.get("/api/history/9999")
     assert response.status_code == 404
+
+
+def test_upload_batch_with_zip(client, temp_upload_dir):
+    """Test batch upload with plain files and a ZIP archive"""
+    workbook = make_report_workbook()
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("reports/day1.xlsx", workbook)
+        zf.writestr("reports/day2.xlsx", workbook)
+        zf.writestr("reports/readme.txt", b"ignored")
+    
+    files = [
+        ("files", ("day0.xlsx", BytesIO(workbook), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")),
+        ("files", ("reports.zip", BytesIO(archive.getvalue()), "application/zip")),
+    ]
+    response = client.post("/api/upload/batch", files=files)
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(f["filename"] for f in data["files"]) == ["day0.xlsx", "day1.xlsx", "day2.xlsx"]
+    assert data["errors"] == []
+    for f in data["files"]:
+        assert Path(f["file_path"]).name.startswith("processed_")
+        assert Path(f["file_path"]).exists()
+
+
+def test_upload_batch_rejects_oversized_zip(client, temp_upload_dir, monkeypatch):
+    """Test ZIP uploads over the uncompressed size or member count limits are rejected before extracting"""
+    monkeypatch.setattr(settings, "max_upload_size", 100_000)
+    
+    bomb = BytesIO()
+    with zipfile.ZipFile(bomb, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("day1.xlsx", b"\0" * 60_000)
+        zf.writestr("day2.xlsx", b"\0" * 60_000)
+    assert len(bomb.getvalue()) < 100_000
+    
+    files = [("files", ("bomb.zip", BytesIO(bomb.getvalue()), "application/zip"))]
+    response = client.post("/api/upload/batch", files=files)
+    assert response.status_code == 413
+    assert list(Path(temp_upload_dir).iterdir()) == []
+    
+    monkeypatch.setattr(settings, "max_archive_members", 2)
+    many = BytesIO()
+    with zipfile.ZipFile(many, "w") as zf:
+        for idx in range(3):
+            zf.writestr(f"notes_{idx}.txt", b"ignored")
+    files = [("files", ("many.zip", BytesIO(many.getvalue()), "application/zip"))]
+    assert client.post("/api/upload/batch", files=files).status_code == 413
+    
+    files = {"file": ("big.xlsx", BytesIO(b"\0" * 100_001), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    assert client.post("/api/upload", files=files).status_code == 413
+    assert list(Path(temp_upload_dir).iterdir()) == []
+
+
+def test_upload_batch_invalid_file(client):
+    """Test batch upload rejects unsupported file types"""
+    files = [("files", ("test.txt", BytesIO(b"fake"), "text/plain"))]
+    response = client.post("/api/upload/batch", files=files)
+    assert response.status_code == 400
+
+
+def test_classify_batch(client, test_db, temp_upload_dir, monkeypatch):
+    """Test batch classification keeps one result file per input file"""
+    monkeypatch.setattr(settings, "mock_llm", True)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    file_paths = []
+    for idx in range(2):
+        path = Path(temp_upload_dir) / f"report_{idx}.xlsx"
+        pl.DataFrame({"Issue": [f"Issue {idx}-1", "", f"Issue {idx}-2"]}).write_excel(str(path), worksheet="일보_Worst55")
+        file_paths.append(str(path))
+    
+    response = client.post("/api/classify/batch", json={"file_paths": file_paths})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "completed"
+    assert data["total_rows"] == 6
+    assert data["processed_rows"] == 4
+    assert len(data["results"]) == 2
+    assert len({r["result_path"] for r in data["results"]}) == 2
+    
+    histories = test_db.query(ClassificationHistory).filter(ClassificationHistory.batch_id == data["batch_id"]).all()
+    assert len(histories) == 2
+    assert all(h.status == "completed" for h in histories)
+    
+    response = client.get("/api/history", params={"batch_id": data["batch_id"]})
+    assert len(response.json()) == 2
+
+
+def test_classify_batch_records_cascade_usage(client, test_db, temp_upload_dir, monkeypatch):
+    """Test per-file escalation counts from the model cascade are stored on history"""
+    monkeypatch.setattr(settings, "mock_llm", True)
+    monkeypatch.setattr(settings, "llm_cascade_models", "local-small")
+    # mock 신뢰도는 1 이하이므로 모든 행이 마지막 모델로 넘어감
+    monkeypatch.setattr(settings, "llm_cascade_confidence", 1.01)
+    test_db.add(UserSettings(openai_api_key="test-key", model_name="gpt-4o-mini"))
+    test_db.commit()
+    
+    file_paths = []
+    for idx, issues in enumerate([["A", "B"], ["B", ""]]):
+        path = Path(temp_upload_dir) / f"cascade_{idx}.xlsx"
+        pl.DataFrame({"Issue": issues}).write_excel(str(path), worksheet="일보_Worst55")
+        file_paths.append(str(path))
+    
+    data = client.post("/api/classify/batch", json={"file_paths": file_paths}).json()
+    assert data["processed_rows"] == 3
+    
+    histories = {h["filename"]: h for h in client.get("/api/history", params={"batch_id": data["batch_id"]}).json()}
+    first, second = histories["cascade_0.xlsx"], histories["cascade_1.xlsx"]
+    assert first["escalated_rows"] == 2
+    assert second["escalated_rows"] == 1
+    assert first["model_usage"]["models"] == ["local-small", "gpt-4o-mini"]
+    assert first["model_usage"]["escalation_rate"] == 1.0
+    assert first["model_usage"]["escalations"] == {"low_confidence": 2}
+    assert first["model_usage"]["by_model"]["gpt-4o-mini"]["rows"] == 2
+
+
+def test_classify_normalizes_issue_text(client, test_db, temp_upload_dir, monkeypatch):
+    """Test whitespace/boilerplate variants share one LLM call and tokens saved are reported"""
+    monkeypatch.setattr(settings, "mock_llm", True)
+    monkeypatch.setattr(settings, "issue_boilerplate_pattern", r"\[자동입력\]")
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    calls = []
+    from app.services.llm_classifier import LLMClassifier
+    original = LLMClassifier.classify
+    
+    def record(self, issue_content, *args, **kwargs):
+        calls.append(issue_content)
+        return original(self, issue_content, *args, **kwargs)
+    
+    monkeypatch.setattr(LLMClassifier, "classify", record)
+    
+    file_path = Path(temp_upload_dir) / "normalize.xlsx"
+    issues = ["라인 정지", "  라인   정지 \n라인 정지", "[자동입력] 라인 정지", "[자동입력]", "모서리 깨짐"]
+    pl.DataFrame({"Issue": issues}).write_excel(str(file_path), worksheet="일보_Worst55")
+    
+    data = client.post("/api/classify", json={"file_path": str(file_path)}).json()
+    assert sorted(calls) == ["라인 정지", "모서리 깨짐"]
+    assert data["processed_rows"] == 4
+    
+    history = client.get(f"/api/history/{data['history_id']}").json()
+    assert history["issue_tokens_saved"] > 0
+    
+    # 배치 분류도 정리된 텍스트로 중복 제거
+    calls.clear()
+    response = client.post("/api/classify/batch", json={"file_paths": [str(file_path)]})
+    assert response.json()["processed_rows"] == 4
+    assert sorted(calls) == ["라인 정지", "모서리 깨짐"]
+
+
+def test_classify_pipeline(client, test_db, temp_upload_dir, monkeypatch):
+    """Test pipelined classification from a raw (not preprocessed) upload"""
+    monkeypatch.setattr(settings, "mock_llm", True)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    files = {"file": ("raw.xlsx", BytesIO(make_report_workbook()), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    response = client.post("/api/upload", files=files, data={"preprocess": "false"})
+    assert response.status_code == 200
+    raw_path = response.json()["file_path"]
+    assert not Path(raw_path).name.startswith("processed_")
+    
+    response = client.post("/api/classify/pipeline", json={"file_path": raw_path, "sheet_name": "Sheet"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "completed"
+    assert data["total_rows"] == 3
+    assert data["processed_rows"] == 2
+    
+    wb = openpyxl.load_workbook(data["result_path"])
+    ws = wb.active
+    assert ws["C4"].value == "라인 정지\n설비 점검"
+    assert "C4:C5" in {str(r) for r in ws.merged_cells.ranges}
+    assert ws["D3"].value == "불량명"
+    assert ws["D4"].value
+    assert not ws["D5"].value
+    assert ws["D6"].value
+
+
+def test_download_result_formats(client, test_db, tmp_path):
+    """Test a format not written during the job is built from stored rows in the row-level layout"""
+    import json
+    from app.models import ClassificationRow
+    
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["B3"] = "Issue"
+    ws["C3"] = "불량명"
+    ws["B4"] = "라인 정지"
+    ws["C4"] = "정지"
+    result_path = tmp_path / "classified_test.xlsx"
+    wb.save(result_path)
+    
+    history = ClassificationHistory(
+        filename="test.xlsx",
+        file_path=str(tmp_path / "test.xlsx"),
+        result_path=str(result_path),
+        sheet_name="Sheet",
+        column_name="Issue",
+        status="completed"
+    )
+    test_db.add(history)
+    test_db.commit()
+    test_db.add(ClassificationRow(
+        history_id=history.id, row_index=0, issue_text="라인 정지", defect_name="정지", status="success"
+    ))
+    test_db.commit()
+    
+    response = client.get(f"/api/classify/{history.id}/download", params={"format": "jsonl"})
+    assert response.status_code == 200
+    assert json.loads(response.text) == {
+        "row_index": 0, "Issue": "라인 정지", "불량명": "정지", "설비명": "", "조치내용": "", "status": "success"
+    }
+    
+    response = client.get(f"/api/classify/{history.id}/download", params={"format": "pdf"})
+    assert response.status_code == 400
+
+
+def test_classify_writes_row_exports(client, test_db, temp_upload_dir, monkeypatch):
+    """Test row-level exports are written during the job and served without re-reading the result"""
+    import json
+    from app.api import classification
+
+    monkeypatch.setattr(settings, "mock_llm", True)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+
+    file_path = Path(temp_upload_dir) / "exports.xlsx"
+    pl.DataFrame({"Issue": ["라인 정지", "", "모서리 깨짐"]}).write_excel(str(file_path), worksheet="일보_Worst55")
+
+    response = client.post("/api/classify", json={"file_path": str(file_path)})
+    assert response.status_code == 200
+    stem = Path(response.json()["result_path"]).stem
+    for suffix in (".csv", ".jsonl", ".parquet"):
+        assert (Path(temp_upload_dir) / f"{stem}{suffix}").exists()
+    assert not list(Path(temp_upload_dir).glob("*.part"))
+
+    def fail_export(*args, **kwargs):
+        raise AssertionError("작업 중 만든 파일을 그대로 반환해야 함")
+    monkeypatch.setattr(classification, "export_history_rows", fail_export)
+
+    history_id = response.json()["history_id"]
+    response = client.get(f"/api/classify/{history_id}/download", params={"format": "jsonl"})
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["row_index"], r["Issue"], r["status"]) for r in records] == [
+        (0, "라인 정지", "success"), (1, None, "empty"), (2, "모서리 깨짐", "success")
+    ]
+    assert records[0]["불량명"]
+    monkeypatch.undo()
+    
+    # 작업 중 만들지 않은 포맷은 저장된 행으로 같은 구성의 파일 생성
+    response = client.get(f"/api/classify/{history_id}/download", params={"format": "xlsx_flat"})
+    assert response.status_code == 200
+    ws = openpyxl.load_workbook(BytesIO(response.content)).active
+    assert [[c.value for c in row] for row in ws.iter_rows(max_row=2)] == [
+        ["row_index", "Issue", "불량명", "설비명", "조치내용", "status"],
+        [0, "라인 정지", records[0]["불량명"], records[0]["설비명"] or None, records[0]["조치내용"] or None, "success"],
+    ]
+
+    table = pl.read_parquet(Path(temp_upload_dir) / f"{stem}.parquet")
+    assert table.columns == ["row_index", "Issue", "불량명", "설비명", "조치내용", "status"]
+    assert table.height == 3
+
+
+def test_classify_incremental(client, test_db, temp_upload_dir, monkeypatch):
+    """Test incremental classification reuses unchanged rows from the previous job"""
+    monkeypatch.setattr(settings, "mock_llm", True)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    day1 = Path(temp_upload_dir) / "day1.xlsx"
+    day2 = Path(temp_upload_dir) / "day2.xlsx"
+    pl.DataFrame({"Model": ["M1", "M2", "M3"], "Issue": ["라인 정지", "스크래치", ""]}).write_excel(str(day1), worksheet="일보_Worst55")
+    pl.DataFrame({"Model": ["M1", "M2", "M4"], "Issue": ["라인 정지", "스크래치 재발", "기포"]}).write_excel(str(day2), worksheet="일보_Worst55")
+    
+    response = client.post("/api/classify", json={"file_path": str(day1)})
+    assert response.status_code == 200
+    baseline_id = response.json()["history_id"]
+    
+    # 기준 작업 자동 선택
+    response = client.post("/api/classify", json={"file_path": str(day2), "incremental": True})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["baseline_history_id"] == baseline_id
+    assert data["reused_rows"] == 1
+    assert data["classified_rows"] == 2
+    assert data["processed_rows"] == 3
+    
+    # 존재하지 않는 기준 작업 지정
+    response = client.post("/api/classify", json={"file_path": str(day2), "incremental": True, "baseline_history_id": 9999})
+    assert response.status_code == 404
+
+
+def test_get_history_keyset_pagination(client, test_db):
+    """Test cursor pagination walks history newest-first without duplicates"""
+    base = datetime(2024, 1, 1)
+    for idx in range(5):
+        test_db.add(ClassificationHistory(
+            filename=f"test_{idx}.xlsx",
+            file_path=f"/path/to/test_{idx}.xlsx",
+            sheet_name="일보_Worst55",
+            column_name="Issue",
+            status="completed",
+            # 두 건은 같은 시각 (id로 순서 결정)
+            created_at=base + timedelta(minutes=min(idx, 3))
+        ))
+    test_db.commit()
+    
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/history", params=params)
+        assert response.status_code == 200
+        seen.extend(item["filename"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    
+    assert seen == ["test_4.xlsx", "test_3.xlsx", "test_2.xlsx", "test_1.xlsx", "test_0.xlsx"]
+    
+    response = client.get("/api/history", params={"cursor": "invalid"})
+    assert response.status_code == 400
+    
+    for limit in (-1, 0, 1001):
+        assert client.get("/api/history", params={"limit": limit}).status_code == 422
+
+
+def test_get_history_rows(client, test_db, temp_upload_dir, monkeypatch):
+    """Test per-row results are stored and paged with filters"""
+    monkeypatch.setattr(settings, "mock_llm", True)
+    monkeypatch.setattr(settings, "row_insert_batch_size", 2)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    file_path = Path(temp_upload_dir) / "rows.xlsx"
+    pl.DataFrame({"Issue": ["라인 정지", "", "모서리 깨짐", "기포", "얼룩"]}).write_excel(str(file_path), worksheet="일보_Worst55")
+    
+    response = client.post("/api/classify", json={"file_path": str(file_path)})
+    assert response.status_code == 200
+    history_id = response.json()["history_id"]
+    
+    rows = []
+    after = None
+    while True:
+        params = {"limit": 2}
+        if after is not None:
+            params["after"] = after
+        response = client.get(f"/api/history/{history_id}/rows", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert page["total"] == 5
+        rows.extend(page["items"])
+        after = page["next_cursor"]
+        if after is None:
+            break
+    
+    assert [row["row_index"] for row in rows] == [0, 1, 2, 3, 4]
+    assert rows[1]["status"] == "empty"
+    assert rows[1]["issue_hash"] is None
+    assert rows[0]["status"] == "success"
+    assert rows[0]["불량명"]
+    
+    response = client.get(f"/api/history/{history_id}/rows", params={"status": "empty"})
+    assert [row["row_index"] for row in response.json()["items"]] == [1]
+    
+    response = client.get(f"/api/history/{history_id}/rows", params={"q": "모서리"})
+    assert [row["row_index"] for row in response.json()["items"]] == [2]
+    
+    response = client.get("/api/history/9999/rows")
+    assert response.status_code == 404
+
+
+def test_analytics_after_classify(client, test_db, temp_upload_dir, monkeypatch):
+    """Test completed jobs are visible through analytics endpoints"""
+    monkeypatch.setattr(settings, "mock_llm", True)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    response = client.get("/api/analytics/top-defects")
+    assert response.status_code == 200
+    assert response.json() == []
+    
+    file_path = Path(temp_upload_dir) / "analytics.xlsx"
+    pl.DataFrame({"Issue": ["라인 정지", "스크래치", ""]}).write_excel(str(file_path), worksheet="일보_Worst55")
+    response = client.post("/api/classify", json={"file_path": str(file_path)})
+    assert response.status_code == 200
+    
+    response = client.get("/api/analytics/top-defects", params={"days": 1})
+    assert response.status_code == 200
+    assert sum(item["count"] for item in response.json()) == 2
+    
+    response = client.get("/api/analytics/equipment", params={"days": 1})
+    assert sum(item["count"] for item in response.json()) == 2
+    
+    response = client.get("/api/analytics/timeseries", params={"days": 1})
+    assert [item["count"] for item in response.json()] == [2]
+    
+    response = client.post("/api/analytics/rebuild")
+    assert response.json()["histories"] == 1
+
+
+def test_search_rows(client, test_db):
+    """Test full-text search ranks completed rows and falls back to LIKE for short Korean terms"""
+    from app.services.row_store import save_classification_rows
+    
+    histories = []
+    for status in ["completed", "processing"]:
+        history = ClassificationHistory(
+            filename=f"{status}.xlsx", file_path=f"/path/to/{status}.xlsx", sheet_name="일보_Worst55",
+            column_name="Issue", status=status
+        )
+        test_db.add(history)
+        test_db.flush()
+        histories.append(history)
+        save_classification_rows(test_db, history.id, [
+            (0, "프레스 D-4 금형에서 스크래치 발생", {"불량명": "스크래치", "설비명": "프레스 D-4", "조치내용": "금형 점검"}, "success"),
+            (1, "코팅기 B-2 기포 다수", {"불량명": "기포 발생", "설비명": "코팅기 B-2", "조치내용": "필터 교체"}, "success"),
+            (2, "라인 정지", None, "failed"),
+        ])
+    test_db.commit()
+    completed_id = histories[0].id
+    
+    response = client.get("/api/search", params={"q": "스크래치"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 1
+    hit = data["items"][0]
+    assert (hit["history_id"], hit["row_index"]) == (completed_id, 0)
+    assert hit["설비명"] == "프레스 D-4"
+    assert hit["score"] is not None
+    
+    # 여러 단어는 모두 포함하는 행만
+    response = client.get("/api/search", params={"q": "코팅기 필터"})
+    assert [item["row_index"] for item in response.json()["items"]] == [1]
+    
+    # 2글자 검색어는 LIKE로 검색
+    response = client.get("/api/search", params={"q": "기포"})
+    data = response.json()
+    assert [item["row_index"] for item in data["items"]] == [1]
+    assert data["items"][0]["score"] is None
+    
+    # 행 재저장 시 인덱스도 갱신
+    save_classification_rows(test_db, completed_id, [(0, "라인 정지", None, "failed")])
+    test_db.commit()
+    response = client.get("/api/search", params={"q": "스크래치"})
+    assert response.json()["total"] == 0
+    
+    response = client.get("/api/search", params={"q": ""})
+    assert response.status_code == 422
+
+
+def test_classify_stream(client, test_db, temp_upload_dir, monkeypatch):
+    """Test SSE classification reports progress and records the completed job"""
+    import json
+    
+    monkeypatch.setattr(settings, "mock_llm", True)
+    monkeypatch.setattr(settings, "progress_commit_rows", 2)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    file_path = Path(temp_upload_dir) / "stream.xlsx"
+    pl.DataFrame({"Issue": ["라인 정지", "스크래치", "", "기포"]}).write_excel(str(file_path), worksheet="일보_Worst55")
+    
+    # 행 결과가 한 구간 안에 끝나면 progress 이벤트 하나로 묶임
+    monkeypatch.setattr(settings, "stream_event_interval_ms", 60000)
+    
+    def parse(text):
+        return [json.loads(line[len("data: "):]) for line in text.splitlines() if line.startswith("data: ")]
+    
+    response = client.post("/api/classify/stream", json={"file_path": str(file_path)})
+    assert response.status_code == 200
+    events = parse(response.text)
+    ids = [int(line[len("id: "):]) for line in response.text.splitlines() if line.startswith("id: ")]
+    assert ids == list(range(1, len(events) + 1))
+    
+    history_id = events[0]["history_id"]
+    assert events[0] == {"type": "start", "history_id": history_id, "total": 4, "reused": 0}
+    progress = [e for e in events if e["type"] == "progress"]
+    assert len(progress) == 1
+    assert progress[0]["current"] == 4 and progress[0]["processed_rows"] == 3
+    assert [(r["row"], r["status"]) for r in progress[0]["rows"]] == [(0, "success"), (1, "success"), (2, "empty"), (3, "success")]
+    complete = events[-1]
+    assert complete["type"] == "complete"
+    assert complete["processed_rows"] == 3
+    
+    response = client.get(f"/api/history/{history_id}")
+    assert response.json()["status"] == "completed"
+    assert response.json()["total_rows"] == 4
+    
+    # 재연결: Last-Event-ID 다음 이벤트부터 다시 받음 (작업은 다시 실행하지 않음)
+    response = client.get(f"/api/classify/stream/{history_id}", headers={"Last-Event-ID": "1"})
+    assert response.status_code == 200
+    assert parse(response.text) == events[1:]
+    assert parse(client.get(f"/api/classify/stream/{history_id}", params={"last_event_id": len(events)}).text) == []
+    
+    # 이 프로세스에 이벤트 기록이 없으면 DB 이력 상태로 응답
+    from app.services.progress import progress_broker
+    monkeypatch.setattr(progress_broker, "_channels", {})
+    resumed = parse(client.get(f"/api/classify/stream/{history_id}", headers={"Last-Event-ID": "1"}).text)
+    assert [e["type"] for e in resumed] == ["complete"]
+    assert resumed[0]["processed_rows"] == 3
+    assert client.get("/api/classify/stream/99999").status_code == 404
+
+
+def test_storage_sweep_endpoint(client, test_db, temp_upload_dir):
+    """Test storage usage and sweep endpoints expire histories whose files are gone"""
+    history = ClassificationHistory(
+        filename="gone.xlsx",
+        file_path=str(Path(temp_upload_dir) / "gone.xlsx"),
+        result_path=str(Path(temp_upload_dir) / "classified_gone.xlsx"),
+        sheet_name="일보_Worst55",
+        column_name="Issue",
+        status="completed"
+    )
+    test_db.add(history)
+    test_db.commit()
+    
+    response = client.get("/api/storage")
+    assert response.status_code == 200
+    assert "used_bytes" in response.json()
+    
+    response = client.post("/api/storage/sweep")
+    assert response.status_code == 200
+    assert response.json()["expired_histories"] == 1
+    
+    response = client.get(f"/api/classify/{history.id}/download")
+    assert response.status_code == 410
+
+
+def test_download_compressed_artifact(client, test_db, temp_upload_dir, monkeypatch):
+    """Test results are stored as artifacts and served transparently after compression"""
+    from app.models import Artifact
+    from app.services.artifact_store import compress_artifact
+    
+    monkeypatch.setattr(settings, "mock_llm", True)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    file_path = Path(temp_upload_dir) / "artifact.xlsx"
+    pl.DataFrame({"Issue": ["라인 정지", "모서리 깨짐"]}).write_excel(str(file_path), worksheet="일보_Worst55")
+    
+    response = client.post("/api/classify", json={"file_path": str(file_path)})
+    assert response.status_code == 200
+    history = test_db.get(ClassificationHistory, response.json()["history_id"])
+    assert history.source_artifact_id and history.result_artifact_id
+    assert response.json()["result_path"] == history.result_path
+    assert file_path.exists()
+    
+    artifact = test_db.get(Artifact, history.result_artifact_id)
+    assert compress_artifact(artifact) > 0
+    test_db.commit()
+    
+    response = client.get(f"/api/classify/{history.id}/download")
+    assert response.status_code == 200
+    assert "classified_artifact.xlsx" in response.headers["content-disposition"]
+    assert len(response.content) == artifact.size
+    ws = openpyxl.load_workbook(BytesIO(response.content)).active
+    assert ws.max_row >= 3
+    
+    response = client.get(f"/api/classify/{history.id}/download", params={"format": "csv"})
+    assert response.status_code == 200
+    assert "불량명" in response.text
+
+
+def test_metrics_endpoint(client, test_db, temp_upload_dir, monkeypatch):
+    """Test Prometheus metrics expose stage timings, route latency and LLM outcomes"""
+    monkeypatch.setattr(settings, "mock_llm", True)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    file_path = Path(temp_upload_dir) / "metrics.xlsx"
+    pl.DataFrame({"Issue": ["라인 정지"]}).write_excel(str(file_path), worksheet="일보_Worst55")
+    assert client.post("/api/classify", json={"file_path": str(file_path)}).status_code == 200
+    assert client.get("/api/history/9999").status_code == 404
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'dailyreport_stage_duration_seconds_count{stage="read_excel"}' in body
+    assert 'dailyreport_stage_duration_seconds_count{stage="llm_call"}' in body
+    assert 'dailyreport_stage_duration_seconds_count{stage="write_result"}' in body
+    assert 'dailyreport_llm_calls_total{outcome="mock"}' in body
+    assert 'route="/api/classify",status="200"' in body
+    assert 'route="/api/history/{history_id}",status="404"' in body
+    assert 'dailyreport_jobs_in_flight{kind="classify"} 0.0' in body
+
+
+def test_history_trace(client, test_db, temp_upload_dir, monkeypatch):
+    """Test each job stores a span trace served in Chrome trace event format"""
+    monkeypatch.setattr(settings, "mock_llm", True)
+    monkeypatch.setattr(settings, "progress_commit_rows", 1)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    file_path = Path(temp_upload_dir) / "trace.xlsx"
+    pl.DataFrame({"Issue": ["라인 정지", "라인 정지", "", "모서리 깨짐"]}).write_excel(str(file_path), worksheet="일보_Worst55")
+    history_id = client.post("/api/classify", json={"file_path": str(file_path)}).json()["history_id"]
+    
+    response = client.get(f"/api/history/{history_id}/trace")
+    assert response.status_code == 200
+    trace = response.json()
+    events = [e for e in trace["traceEvents"] if e["ph"] != "M"]
+    names = [e["name"] for e in events]
+    
+    job = events[0]
+    assert job["name"] == "classify" and job["ph"] == "X"
+    assert {"read_excel", "llm_call", "write_result", "save_rows", "db_commit"} <= set(names)
+    llm_calls = [e for e in events if e["name"] == "llm_call"]
+    # 같은 Issue("라인 정지")는 한 번만 호출
+    assert len(llm_calls) == 2
+    normalize = next(e for e in events if e["name"] == "normalize")
+    assert normalize["ph"] == "i" and normalize["args"]["tokens_saved"] == 0
+    assert all(e["args"]["attempt"] == 1 for e in llm_calls)
+    assert all(job["ts"] <= e["ts"] and e["ts"] + e["dur"] <= job["ts"] + job["dur"] for e in events if e["ph"] == "X")
+    assert trace["otherData"]["history_id"] == history_id
+    
+    # 증분 분류는 기준 작업 재사용(캐시 적중)을 순간 이벤트로 기록
+    response = client.post("/api/classify", json={"file_path": str(file_path), "incremental": True})
+    trace = client.get(f"/api/history/{response.json()['history_id']}/trace").json()
+    reuse = next(e for e in trace["traceEvents"] if e["name"] == "incremental_reuse")
+    assert reuse["ph"] == "i" and reuse["args"]["hits"] == 3
+    assert not any(e["name"] == "llm_call" for e in trace["traceEvents"])
+    
+    history = ClassificationHistory(
+        filename="old.xlsx", file_path="old.xlsx", sheet_name="일보_Worst55", column_name="Issue"
+    )
+    test_db.add(history)
+    test_db.commit()
+    assert client.get(f"/api/history/{history.id}/trace").status_code == 404
+    assert client.get("/api/history/9999/trace").status_code == 404
+
+
+def test_request_profiling(client, test_db, temp_upload_dir, monkeypatch):
+    """Test opt-in profiling stores a profile per flagged request, linked to its job"""
+    import pstats
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.profiling import ProfilingMiddleware
+    
+    monkeypatch.setattr(settings, "mock_llm", True)
+    monkeypatch.setattr(settings, "profiles_dir", str(Path(temp_upload_dir) / "profiles"))
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    file_path = Path(temp_upload_dir) / "profile.xlsx"
+    pl.DataFrame({"Issue": ["라인 정지", "모서리 깨짐"]}).write_excel(str(file_path), worksheet="일보_Worst55")
+    
+    # PROFILING_ENABLED일 때 main에서 추가되는 것과 같은 구성
+    profiled = TestClient(ProfilingMiddleware(app))
+    response = profiled.post("/api/classify", json={"file_path": str(file_path)}, headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    history_id = response.json()["history_id"]
+    
+    # 플래그가 없는 요청은 측정하지 않음
+    assert "x-profile-id" not in profiled.get("/health").headers
+    
+    profiles = client.get("/api/profiles", params={"history_id": history_id}).json()
+    assert [p["id"] for p in profiles] == [profile_id]
+    assert profiles[0]["path"] == "/api/classify"
+    assert profiles[0]["worker_profiles"] >= 1
+    assert client.get("/api/profiles", params={"history_id": 9999}).json() == []
+    
+    response = client.get(f"/api/profiles/{profile_id}", params={"format": "text"})
+    assert response.status_code == 200
+    assert "read_excel" in response.text
+    
+    response = client.get(f"/api/profiles/{profile_id}")
+    assert response.status_code == 200
+    prof_path = Path(temp_upload_dir) / "downloaded.prof"
+    prof_path.write_bytes(response.content)
+    assert pstats.Stats(str(prof_path)).total_calls > 0
+    
+    assert client.get("/api/profiles/..%2Fsecret").status_code == 404
+
+
+def test_app_startup_is_lazy(tmp_path):
+    """Test importing the app has no side effects or heavy imports; lifespan sets up DB/directories"""
+    import os
+    import subprocess
+    import sys
+    
+    script = (
+        "import sys\n"
+        "from fastapi.testclient import TestClient\n"
+        "from app.main import app\n"
+        "heavy = [m for m in ('polars', 'pandas', 'openpyxl', 'openai', 'xlsxwriter') if m in sys.modules]\n"
+        "assert not heavy, heavy\n"
+        "import os\n"
+        "assert not os.listdir(sys.argv[1])\n"
+        "with TestClient(app) as client:\n"
+        "    assert client.get('/health').status_code == 200\n"
+    )
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}",
+        UPLOAD_DIR=str(tmp_path / "uploads"),
+        RESULTS_DIR=str(tmp_path / "results"),
+        ANALYTICS_DIR=str(tmp_path / "analytics"),
+        ARTIFACTS_DIR=str(tmp_path / "artifacts"),
+        STORAGE_SWEEP_INTERVAL_MINUTES="0",
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script, str(tmp_path)],
+        cwd=Path(__file__).parent.parent, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    
+    # import 시점이 아니라 lifespan에서 DB 스키마와 디렉토리 생성
+    assert (tmp_path / "app.db").exists()
+    assert (tmp_path / "uploads").is_dir() and (tmp_path / "artifacts").is_dir()
+
+
+async def test_worker_processes_queued_jobs(client, test_db, temp_upload_dir, monkeypatch):
+    """Test jobs submitted to the queue are split across workers and each runs exactly once"""
+    import asyncio
+    from app.models import JobLease
+    from app.worker import Worker
+    from tests.conftest import TestingAsyncSessionLocal, TestingSessionLocal
+    
+    monkeypatch.setattr(settings, "mock_llm", True)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    history_ids = []
+    for idx in range(3):
+        file_path = Path(temp_upload_dir) / f"queued_{idx}.xlsx"
+        pl.DataFrame({"Issue": [f"라인 정지 {idx}", "", "모서리 깨짐"]}).write_excel(str(file_path), worksheet="일보_Worst55")
+        response = client.post("/api/classify/jobs", json={"file_path": str(file_path)})
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+        history_ids.append(response.json()["history_id"])
+    
+    assert client.post("/api/classify/jobs", json={"file_path": "missing.xlsx"}).status_code == 404
+    
+    workers = [
+        Worker(worker_id=f"worker-{idx}", concurrency=2, poll_interval=0.05,
+               session_factory=TestingSessionLocal, async_session_factory=TestingAsyncSessionLocal)
+        for idx in range(2)
+    ]
+    processed = await asyncio.gather(*(worker.run(once=True) for worker in workers))
+    assert sum(processed) == 3
+    
+    test_db.expire_all()
+    assert test_db.query(JobLease).count() == 0
+    for history_id in history_ids:
+        history = client.get(f"/api/history/{history_id}").json()
+        assert history["status"] == "completed"
+        assert history["total_rows"] == 3 and history["processed_rows"] == 2
+        rows = client.get(f"/api/history/{history_id}/rows").json()
+        assert len(rows["items"]) == 3
+
+
+async def test_worker_stop_does_not_lease_when_slots_busy():
+    """Test a stop requested while every slot is busy does not lease another job once a slot frees"""
+    import asyncio
+    from app.worker import Worker
+    
+    worker = Worker(worker_id="worker-stop", concurrency=1, poll_interval=0.01)
+    leased = []
+    started = asyncio.Event()
+    finish = asyncio.Event()
+    
+    async def lease(func, *args):
+        leased.append(func)
+        return object()
+    
+    async def run_job(job):
+        started.set()
+        await finish.wait()
+    
+    worker._lease = lease
+    worker._run_job = run_job
+    
+    runner = asyncio.create_task(worker.run())
+    await asyncio.wait_for(started.wait(), timeout=5)
+    worker.stop()
+    finish.set()
+    await asyncio.wait_for(runner, timeout=5)
+    assert len(leased) == 1
+
+
+async def test_cli_batch_classifies_directory_once(test_db, temp_upload_dir, tmp_path, monkeypatch):
+    """Test the CLI batch classifier writes history/rows like the API and skips files already done"""
+    from io import StringIO
+    from app.cli import BatchClassifier, find_workbooks
+    from app.models import ClassificationHistory, ClassificationRow
+    from tests.conftest import TestingAsyncSessionLocal
+    
+    monkeypatch.setattr(settings, "mock_llm", True)
+    user_settings = UserSettings(openai_api_key="test-key")
+    
+    source_dir = tmp_path / "reports"
+    source_dir.mkdir()
+    for idx in range(2):
+        pl.DataFrame({"Issue": [f"라인 정지 {idx}", "", "모서리 깨짐"]}).write_excel(
+            str(source_dir / f"report_{idx}.xlsx"), worksheet="일보_Worst55"
+        )
+    (source_dir / "~$report_0.xlsx").write_bytes(b"lock")
+    (source_dir / "notes.txt").write_text("skip")
+    paths = find_workbooks(source_dir)
+    assert [p.name for p in paths] == ["report_0.xlsx", "report_1.xlsx"]
+    
+    def make_runner(force=False, incremental=False):
+        return BatchClassifier(
+            user_settings, sheet_name="일보_Worst55", column_name="Issue", prompt="분류",
+            file_concurrency=2, row_concurrency=4, preprocess=False, force=force,
+            incremental=incremental, session_factory=TestingAsyncSessionLocal
+        )
+    
+    out = StringIO()
+    stats = await make_runner().run(paths, out=out)
+    assert stats["completed"] == 2 and stats["failed"] == 0
+    assert stats["rows"] == 6 and stats["classified_rows"] == 4
+    assert "report_0.xlsx: completed" in out.getvalue()
+    
+    histories = test_db.query(ClassificationHistory).all()
+    assert len(histories) == 2
+    assert all(h.status == "completed" and h.source_sha256 for h in histories)
+    assert all(Path(h.result_path).exists() for h in histories)
+    assert test_db.query(ClassificationRow).count() == 6
+    # 원본 디렉토리에는 결과 파일을 만들지 않음
+    assert sorted(p.name for p in source_dir.iterdir()) == ["notes.txt", "report_0.xlsx", "report_1.xlsx", "~$report_0.xlsx"]
+    
+    stats = await make_runner().run(paths, out=StringIO())
+    assert stats["skipped"] == 2 and stats["completed"] == 0
+    assert test_db.query(ClassificationHistory).count() == 2
+    
+    stats = await make_runner(force=True).run(paths[:1], out=StringIO())
+    assert stats["completed"] == 1
+    assert test_db.query(ClassificationHistory).count() == 3
+    
+    # API와 같은 작업 본문이므로 증분 분류도 같은 방식으로 기준 작업 결과를 재사용
+    stats = await make_runner(force=True, incremental=True).run(paths[1:], out=StringIO())
+    assert stats["completed"] == 1
+    latest = test_db.query(ClassificationHistory).order_by(ClassificationHistory.id.desc()).first()
+    # 기준 작업(가장 최근 완료된 report_0)과 같은 행은 "모서리 깨짐" 하나
+    assert latest.baseline_history_id is not None and latest.reused_rows == 1
+
+
+async def test_worker_runs_ingest_jobs_with_preprocessing(test_db, temp_upload_dir, tmp_path, monkeypatch):
+    """Test files registered by the drop folder watcher are preprocessed and classified by a worker"""
+    from app.models import ClassificationHistory
+    from app.watcher import DropFolderWatcher
+    from app.worker import Worker
+    from tests.conftest import TestingAsyncSessionLocal, TestingSessionLocal
+    
+    monkeypatch.setattr(settings, "mock_llm", True)
+    monkeypatch.setattr(settings, "upload_dir", temp_upload_dir)
+    test_db.add(UserSettings(openai_api_key="test-key"))
+    test_db.commit()
+    
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    pl.DataFrame({"Issue": ["라인 정지", "", "모서리 깨짐"]}).write_excel(str(inbox / "daily.xlsx"), worksheet="일보_Worst55")
+    watcher = DropFolderWatcher([inbox], settle_seconds=0, session_factory=TestingSessionLocal)
+    history_id = watcher.ingest(inbox / "daily.xlsx")
+    
+    worker = Worker(worker_id="worker-ingest", poll_interval=0.05,
+                    session_factory=TestingSessionLocal, async_session_factory=TestingAsyncSessionLocal)
+    assert await worker.run(once=True) == 1
+    
+    test_db.expire_all()
+    history = test_db.get(ClassificationHistory, history_id)
+    assert history.status == "completed"
+    assert history.filename.startswith("processed_daily")
+    assert history.total_rows == 3 and history.processed_rows == 2
+
+
+def test_history_and_settings_conditional_get(client, test_db):
+    """Test /history, /history/{id} and /settings return weak ETags and 304 on If-None-Match"""
+    history = ClassificationHistory(
+        filename="test.xlsx", file_path="test.xlsx", sheet_name="Sheet", column_name="Issue", status="processing"
+    )
+    test_db.add(history)
+    test_db.commit()
+    
+    for url in ("/api/history", f"/api/history/{history.id}", "/api/settings"):
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert etag.startswith('W/"')
+        assert response.headers["cache-control"] == "no-cache"
+        
+        cached = client.get(url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+    
+    # 내용이 바뀌면 ETag도 바뀜
+    etag = client.get(f"/api/history/{history.id}").headers["etag"]
+    history.status = "completed"
+    test_db.commit()
+    response = client.get(f"/api/history/{history.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert response.headers["etag"] != etag
+    
+    # 커서 헤더는 304에도 유지
+    response = client.get("/api/history", params={"limit": 1})
+    cached = client.get("/api/history", params={"limit": 1}, headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.headers["x-next-cursor"] == response.headers["x-next-cursor"]
+
+
+def test_download_etag_and_range(client, test_db, tmp_path):
+    """Test result downloads use a strong ETag from the file hash and honor Range / If-Range"""
+    import hashlib
+    
+    wb = openpyxl.Workbook()
+    wb.active["A1"] = "Issue"
+    result_path = tmp_path / "classified_test.xlsx"
+    wb.save(result_path)
+    content = result_path.read_bytes()
+    
+    history = ClassificationHistory(
+        filename="test.xlsx", file_path=str(tmp_path / "test.xlsx"), result_path=str(result_path),
+        sheet_name="Sheet", column_name="Issue", status="completed"
+    )
+    test_db.add(history)
+    test_db.commit()
+    url = f"/api/classify/{history.id}/download"
+    
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == content
+    etag = response.headers["etag"]
+    assert etag == f'"{hashlib.sha256(content).hexdigest()}"'
+    assert response.headers["accept-ranges"] == "bytes"
+    # xlsx는 이미 압축된 형식이므로 다시 압축하지 않음
+    assert "content-encoding" not in response.headers
+    
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    
+    response = client.get(url, headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(content)}"
+    
+    response = client.get(url, headers={"Range": "bytes=-5"})
+    assert response.status_code == 206 and response.content == content[-5:]
+    
+    response = client.get(url, headers={"Range": f"bytes={len(content)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(content)}"
+    
+    # 파일이 바뀌어 If-Range가 다르면 전체 전송
+    response = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"outdated"'})
+    assert response.status_code == 200 and response.content == content
+    
+    # 변환 포맷은 포맷별 ETag
+    response = client.get(url, params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["etag"].strip('W/"').endswith("-csv")
+
+
+def test_response_compression(client, test_db):
+    """Test JSON responses are brotli/gzip compressed above the size threshold"""
+    for idx in range(30):
+        test_db.add(ClassificationHistory(
+            filename=f"report_{idx}.xlsx", file_path=f"report_{idx}.xlsx",
+            sheet_name="Sheet", column_name="Issue", status="completed"
+        ))
+    test_db.commit()
+    
+    for encoding in ("br", "gzip"):
+        response = client.get("/api/history", headers={"Accept-Encoding": encoding})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == encoding
+        assert "accept-encoding" in response.headers["vary"].lower()
+        assert len(response.json()) == 30
+    
+    # 작은 응답 / 압축을 허용하지 않는 클라이언트는 그대로
+    response = client.get("/health", headers={"Accept-Encoding": "br, gzip"})
+    assert "content-encoding" not in response.headers
+    response = client.get("/api/history", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    response = client.get("/api/history", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+
+
+def test_progress_websocket_multiplexes_jobs(client, test_db, monkeypatch):
+    """Test one WebSocket receives snapshots, published progress and DB-polled completion for many jobs"""
+    from app.services.progress import progress_broker
+    
+    monkeypatch.setattr(settings, "ws_update_interval_ms", 10)
+    monkeypatch.setattr(settings, "ws_poll_seconds", 0.05)
+    done = ClassificationHistory(
+        filename="a.xlsx", file_path="a.xlsx", sheet_name="Sheet", column_name="Issue",
+        status="completed", total_rows=3, processed_rows=3, failed_rows=0
+    )
+    running = ClassificationHistory(
+        filename="b.xlsx", file_path="b.xlsx", sheet_name="Sheet", column_name="Issue",
+        status="processing", total_rows=10, processed_rows=0, failed_rows=0
+    )
+    test_db.add_all([done, running])
+    test_db.commit()
+    
+    def receive_updates(ws, count):
+        updates = {}
+        while len(updates) < count:
+            message = ws.receive_json()
+            assert message["type"] == "updates"
+            updates.update({u["id"]: u for u in message["updates"]})
+        return updates
+    
+    with client.websocket_connect("/api/progress/ws") as ws:
+        ws.send_json({"action": "subscribe", "ids": [done.id, running.id, 99999]})
+        updates = receive_updates(ws, 3)
+        assert updates[done.id] == {"id": done.id, "status": "completed", "total": 3, "processed": 3, "failed": 0}
+        assert updates[running.id]["status"] == "processing"
+        assert updates[99999] == {"id": 99999, "status": "missing"}
+        
+        # 작업 실행 코드가 발행한 진행상황
+        running.processed_rows = 4
+        progress_broker.publish(running)
+        assert receive_updates(ws, 1)[running.id]["processed"] == 4
+        
+        # 다른 프로세스의 작업: DB에 늦게 기록된 이전 진행상황은 보내지 않고 완료만 전달
+        running.processed_rows = 2
+        test_db.commit()
+        running.status = "completed"
+        running.processed_rows = 10
+        test_db.commit()
+        update = receive_updates(ws, 1)[running.id]
+        assert update["status"] == "completed" and update["processed"] == 10
+        
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"action": "subscribe", "ids": ["1"]})
+        assert ws.receive_json() == {"type": "error", "message": "ids는 정수 목록이어야 합니다."}
+    
+    assert not progress_broker._subscribers
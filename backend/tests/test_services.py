@@ -1,5 +1,13 @@
 import pytest
+import asyncio
+import random
+import time
+import openpyxl
+import zipfile
 from app.services.excel_handler import ExcelHandler
+from app.services.classification_runner import ClassificationPipeline, expand_group_results
+from app.services.result_writers import export_result_file
+from app.services.xlsx_patcher import patch_results_into_xlsx
 import polars as pl
 import tempfile
 from pathlib import Path
@@ -102,3 +110,807 @@ def test_write_excel():
         assert "불량명" in read_df.columns
     finally:
         Path(tmp_path).unlink(missing_ok=True)
+
+
+class FakeClassifier:
+    """입력 내용을 그대로 돌려주는 테스트용 Classifier (응답 지연은 랜덤)"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def classify(self, issue_content, prompt, few_shot_examples=None, max_retries=3):
+        self.calls.append(issue_content)
+        time.sleep(random.uniform(0, 0.02))
+        return {"불량명": issue_content, "설비명": "", "조치내용": ""}, True
+
+
+async def test_pipeline_preserves_order(tmp_path):
+    """Test pipelined classification yields groups in sheet order"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["B3"] = "Model"
+    ws["C3"] = "Issue"
+    for i in range(40):
+        ws.cell(row=4 + i, column=2, value=f"M{i}")
+        ws.cell(row=4 + i, column=3, value=f"Issue {i}" if i % 5 else None)
+    path = tmp_path / "report.xlsx"
+    wb.save(path)
+    
+    classifier = FakeClassifier()
+    pipeline = ClassificationPipeline(classifier, prompt="p", concurrency=4, queue_size=2)
+    outputs = [item async for item in pipeline.run(path, None, "Issue")]
+    
+    assert [group["start_row"] for group, _, _ in outputs] == list(range(4, 44))
+    assert [status for _, _, status in outputs].count("empty") == 8
+    assert all(result["불량명"] == group["text"] for group, result, status in outputs if status == "success")
+    assert len(classifier.calls) == 32
+    assert pipeline.workbook is not None
+
+
+async def test_pipeline_propagates_dispatch_error(tmp_path):
+    """Test a failure while dispatching groups is raised instead of blocking the consumer"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["B3"] = "Model"
+    ws["C3"] = "Issue"
+    for i in range(10):
+        ws.cell(row=4 + i, column=2, value=f"M{i}")
+        ws.cell(row=4 + i, column=3, value=f"Issue {i}")
+    path = tmp_path / "report.xlsx"
+    wb.save(path)
+    
+    class BrokenNormalizer:
+        def normalize(self, text):
+            raise RuntimeError("normalize failed")
+    
+    pipeline = ClassificationPipeline(FakeClassifier(), prompt="p", queue_size=2, normalizer=BrokenNormalizer())
+    
+    async def collect():
+        return [item async for item in pipeline.run(path, None, "Issue")]
+    
+    with pytest.raises(RuntimeError, match="normalize failed"):
+        await asyncio.wait_for(collect(), timeout=10)
+
+
+def test_preprocessed_groups_fill_merged_cells_while_walking(tmp_path):
+    """Test unmerging while walking the sheet gives the same groups and sheet as unmerging up front"""
+    from app.core.preprocessor import preprocess_structure, iter_preprocessed_groups
+    
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["B3"] = "Model"
+    ws["C3"] = "Layer"
+    ws["D3"] = "Issue"
+    ws["B4"] = "M1"
+    ws["C4"] = "L1"
+    ws["D4"] = "라인 정지"
+    ws["D5"] = "설비 점검"
+    ws["C6"] = "L2"
+    ws["D6"] = "모서리 깨짐"
+    ws["B7"] = "M2"
+    ws["C7"] = "L1"
+    ws["D7"] = "스크래치"
+    ws["D9"] = "외관 불량"
+    ws.merge_cells("B4:B6")
+    ws.merge_cells("C4:C5")
+    ws.merge_cells("B7:C9")
+    path = tmp_path / "merged.xlsx"
+    wb.save(path)
+    
+    eager = preprocess_structure(path)
+    eager_groups = list(iter_preprocessed_groups(eager, None, "Issue"))
+    lazy = preprocess_structure(path, fill_merged=False)
+    lazy_groups = list(iter_preprocessed_groups(lazy, None, "Issue", fill_merged=True))
+    
+    assert lazy_groups == eager_groups
+    assert [(g["start_row"], g["end_row"], g["text"]) for g in lazy_groups] == [
+        (4, 5, "라인 정지\n설비 점검"), (6, 6, "모서리 깨짐"), (7, 9, "스크래치\n외관 불량")
+    ]
+    assert {str(r) for r in lazy.active.merged_cells.ranges} == {str(r) for r in eager.active.merged_cells.ranges}
+    assert [[c.value for c in row] for row in lazy.active.iter_rows()] == [
+        [c.value for c in row] for row in eager.active.iter_rows()
+    ]
+
+
+def test_expand_group_results():
+    """Test expanding group results to row results"""
+    groups = [
+        ({"start_row": 4, "end_row": 5}, {"불량명": "A"}),
+        ({"start_row": 6, "end_row": 6}, {"불량명": "B"}),
+    ]
+    rows = expand_group_results(groups)
+    assert [r.get("불량명") for r in rows] == ["A", "", "B"]
+
+
+def make_report_file(path):
+    """3행 헤더, 4행부터 데이터가 있는 일보 형식 파일 생성"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "일보_Worst55"
+    ws["B1"] = "일보"
+    ws["B3"] = "Model"
+    ws["C3"] = "Issue"
+    ws["B4"] = "M1"
+    ws["C4"] = "라인 정지"
+    ws["B5"] = "M2"
+    ws["C5"] = "스크래치"
+    wb.save(path)
+    return path
+
+
+CLASSIFICATIONS = [
+    {"불량명": "정지", "설비명": "라인", "조치내용": "재가동"},
+    {"불량명": "스크래치", "설비명": "컨베이어", "조치내용": "청소"},
+]
+
+
+def test_write_results_streaming(tmp_path):
+    """Test constant-memory result writer keeps layout and adds result columns"""
+    original = make_report_file(tmp_path / "report.xlsx")
+    output = tmp_path / "result.xlsx"
+    
+    ExcelHandler.write_results_streaming(str(original), str(output), CLASSIFICATIONS, "일보_Worst55")
+    
+    ws = openpyxl.load_workbook(output)["일보_Worst55"]
+    assert ws["B1"].value == "일보"
+    assert ws["C4"].value == "라인 정지"
+    assert [ws.cell(row=3, column=c).value for c in (4, 5, 6)] == ["불량명", "설비명", "조치내용"]
+    assert ws["D5"].value == "스크래치"
+    assert ws["F4"].value == "재가동"
+
+
+@pytest.mark.parametrize("export_format", ["csv", "jsonl", "parquet", "xlsx_flat"])
+def test_export_result_file(tmp_path, export_format):
+    """Test exporting a classified workbook to the streaming formats"""
+    original = make_report_file(tmp_path / "report.xlsx")
+    result = tmp_path / "result.xlsx"
+    ExcelHandler.append_results_to_file(str(original), str(result), CLASSIFICATIONS, "일보_Worst55")
+    
+    output = tmp_path / f"export.{export_format}"
+    export_result_file(str(result), str(output), export_format, "일보_Worst55")
+    
+    if export_format == "csv":
+        df = pl.read_csv(output)
+    elif export_format == "jsonl":
+        df = pl.read_ndjson(output)
+    elif export_format == "parquet":
+        df = pl.read_parquet(output)
+    else:
+        df = pl.read_excel(output)
+    
+    assert df.columns == ["Model", "Issue", "불량명", "설비명", "조치내용"]
+    assert df["Issue"].to_list() == ["라인 정지", "스크래치"]
+    assert df["설비명"].to_list() == ["라인", "컨베이어"]
+
+
+def test_patch_results_into_xlsx_matches_openpyxl(tmp_path):
+    """Test zip-level XML patching produces the same cells as the openpyxl writer"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "일보_Worst55"
+    ws["B1"] = "일보"
+    ws["B1"].font = openpyxl.styles.Font(bold=True)
+    ws["B3"] = "Model"
+    ws["C3"] = "Issue"
+    ws["B4"] = "M1"
+    ws["C4"] = "라인 정지 & <점검>"
+    ws.merge_cells("C4:C5")
+    ws["B7"] = "M2"
+    ws["C7"] = "스크래치"
+    wb.create_sheet("기타")["A1"] = "other"
+    original = tmp_path / "report.xlsx"
+    wb.save(original)
+    
+    classifications = [
+        {"불량명": "정지", "설비명": "라인", "조치내용": "재가동"},
+        {"불량명": "", "설비명": "", "조치내용": ""},
+        {"불량명": "", "설비명": "", "조치내용": ""},
+        {"불량명": "스크래치", "설비명": "컨베이어 <A>", "조치내용": "청소\n완료"},
+        {"불량명": "빈행", "설비명": "", "조치내용": ""},
+    ]
+    patched = tmp_path / "patched.xlsx"
+    expected = tmp_path / "expected.xlsx"
+    patch_results_into_xlsx(str(original), str(patched), classifications, "일보_Worst55")
+    ExcelHandler.append_results_to_file(str(original), str(expected), classifications, "일보_Worst55")
+    
+    patched_ws = openpyxl.load_workbook(patched)["일보_Worst55"]
+    expected_ws = openpyxl.load_workbook(expected)["일보_Worst55"]
+    
+    def values(sheet):
+        return [[c.value or None for c in row] for row in sheet.iter_rows(min_row=1, max_row=8, max_col=6)]
+    
+    assert values(patched_ws) == values(expected_ws)
+    assert {str(r) for r in patched_ws.merged_cells.ranges} == {"C4:C5"}
+    assert patched_ws["B1"].font.bold
+    
+    # 다른 파트는 그대로 복사
+    with zipfile.ZipFile(original) as src, zipfile.ZipFile(patched) as dst:
+        assert src.namelist() == dst.namelist()
+        for name in src.namelist():
+            if name != "xl/worksheets/sheet1.xml":
+                assert src.read(name) == dst.read(name)
+
+
+def test_sqlite_engine_pragmas_and_migrations(tmp_path):
+    """Test SQLite engine uses WAL/busy_timeout and migrations add history indexes"""
+    from sqlalchemy import inspect, text
+    from app.database import Base, create_db_engine, migrate_schema
+    
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    migrate_schema(engine)
+    migrate_schema(engine)  # 두 번 실행해도 안전
+    
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+    
+    indexes = {index["name"] for index in inspect(engine).get_indexes("classification_history")}
+    assert "ix_classification_history_created_at_id" in indexes
+    assert "ix_classification_history_status_created_at" in indexes
+    assert inspect(engine).has_table("classification_rows_fts")
+    engine.dispose()
+
+
+def test_analytics_store_rollups(tmp_path, monkeypatch):
+    """Test completed jobs land in date partitions and rollups answer top-N queries"""
+    from datetime import date, datetime
+    from sqlalchemy.orm import sessionmaker
+    from app.config import settings
+    from app.database import Base, create_db_engine
+    from app.models import ClassificationHistory
+    from app.services import analytics_store
+    from app.services.row_store import save_classification_rows
+    
+    monkeypatch.setattr(settings, "analytics_dir", str(tmp_path / "analytics"))
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    
+    jobs = [
+        (datetime(2024, 3, 1, 9), [("스크래치", "프레스 D-4"), ("스크래치", "프레스 D-4"), ("기포 발생", "코팅기 B-2")]),
+        (datetime(2024, 3, 2, 9), [("스크래치", "코팅기 B-2"), ("기포 발생", "코팅기 B-2"), (None, None)]),
+        (datetime(2023, 1, 1, 9), [("치수 불량", "프레스 D-4")]),  # 기간 밖
+    ]
+    for completed_at, results in jobs:
+        history = ClassificationHistory(
+            filename="report.xlsx", file_path="/tmp/report.xlsx", sheet_name="Sheet1",
+            column_name="Issue", status="completed", completed_at=completed_at
+        )
+        db.add(history)
+        db.flush()
+        save_classification_rows(db, history.id, [
+            (idx, f"issue {idx}", {"불량명": defect, "설비명": equipment}, "success" if defect else "failed")
+            for idx, (defect, equipment) in enumerate(results)
+        ])
+        db.commit()
+        assert analytics_store.append_history_rows(db, history) == len(results)
+    
+    # 같은 작업을 다시 반영해도 중복 집계되지 않음
+    analytics_store.append_history_rows(db, history)
+    
+    today = date(2024, 3, 2)
+    assert analytics_store.top_defects(days=90, today=today) == [
+        {"defect_name": "스크래치", "count": 3},
+        {"defect_name": "기포 발생", "count": 2},
+    ]
+    assert analytics_store.top_defects(days=90, equipment="코팅기 B-2", limit=1, today=today) == [
+        {"defect_name": "기포 발생", "count": 2},
+    ]
+    
+    summary = analytics_store.equipment_summary(days=90, top_n=1, today=today)
+    assert [(item["equipment_name"], item["count"]) for item in summary] == [("코팅기 B-2", 3), ("프레스 D-4", 2)]
+    assert summary[0]["top_defects"] == [{"defect_name": "기포 발생", "count": 2}]
+    
+    series = analytics_store.defect_time_series(days=90, defect="스크래치", today=today)
+    assert series == [{"date": date(2024, 3, 1), "count": 2}, {"date": date(2024, 3, 2), "count": 1}]
+    
+    assert analytics_store.top_defects(days=7, today=date(2025, 1, 1)) == []
+    db.close()
+    engine.dispose()
+
+
+async def test_progress_recorder_coalesces_commits(tmp_path):
+    """Test progress writes commit every N rows instead of per row"""
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    from app.database import Base, create_async_db_engine
+    from app.models import ClassificationHistory
+    from app.services.progress import ProgressRecorder
+    
+    engine = create_async_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    
+    async with session_factory() as db:
+        history = ClassificationHistory(
+            filename="report.xlsx", file_path="/tmp/report.xlsx",
+            sheet_name="Sheet1", column_name="Issue", total_rows=25
+        )
+        db.add(history)
+        await db.commit()
+        
+        progress = ProgressRecorder(db, history, every_rows=10, interval_ms=60000)
+        for row in range(1, 26):
+            await progress.update(processed_rows=row, failed_rows=0)
+        assert progress.commits == 2
+        
+        await progress.flush()
+        assert progress.commits == 3
+    
+    async with session_factory() as db:
+        saved = (await db.execute(select(ClassificationHistory))).scalars().one()
+        assert saved.processed_rows == 25
+    
+    await engine.dispose()
+
+
+def test_storage_sweep(tmp_path, monkeypatch):
+    """Test retention, orphan reconciliation and LRU quota eviction"""
+    import os
+    from datetime import datetime, timedelta
+    from sqlalchemy.orm import sessionmaker
+    from app.config import settings
+    from app.database import Base, create_db_engine
+    from app.models import ClassificationHistory
+    from app.services.storage import run_storage_sweep
+    
+    uploads = tmp_path / "uploads"
+    results = tmp_path / "results"
+    uploads.mkdir()
+    results.mkdir()
+    monkeypatch.setattr(settings, "upload_dir", str(uploads))
+    monkeypatch.setattr(settings, "results_dir", str(results))
+    monkeypatch.setattr(settings, "artifacts_dir", str(tmp_path / "artifacts"))
+    
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime(2024, 6, 1)
+    
+    def make_file(path, size=100, age_hours=0):
+        path.write_bytes(b"x" * size)
+        mtime = (now - timedelta(hours=age_hours)).timestamp()
+        os.utime(path, (mtime, mtime))
+        return str(path)
+    
+    def add_history(name, created_days_ago, accessed=None, status="completed", result=True):
+        history = ClassificationHistory(
+            filename=f"{name}.xlsx",
+            file_path=make_file(uploads / f"{name}.xlsx"),
+            result_path=make_file(results / f"classified_{name}.xlsx") if result else str(results / f"classified_{name}.xlsx"),
+            sheet_name="Sheet1", column_name="Issue", status=status,
+            created_at=now - timedelta(days=created_days_ago), last_accessed_at=accessed
+        )
+        db.add(history)
+        return history
+    
+    old = add_history("old", 40)
+    missing = add_history("missing", 1, result=False)
+    stale = add_history("stale", 2, accessed=now - timedelta(days=2))
+    recent = add_history("recent", 3, accessed=now - timedelta(hours=1))
+    running = add_history("running", 50, status="processing")
+    db.commit()
+    make_file(results / "classified_stale.csv", size=50)  # 다운로드 캐시
+    make_file(uploads / "orphan_old.xlsx", age_hours=48)
+    make_file(uploads / "orphan_new.xlsx", age_hours=1)
+    
+    # dry-run은 아무것도 삭제하지 않음
+    report = run_storage_sweep(db, retention_days=30, quota_bytes=0, orphan_grace_hours=24, dry_run=True, now=now)
+    assert report["orphan_files"] == 1
+    assert (uploads / "orphan_old.xlsx").exists()
+    
+    # missing(원본 100) + stale(250) + recent(200) + running(200) + orphan_new(100) = 850 → 700 이하로
+    report = run_storage_sweep(db, retention_days=30, quota_bytes=700, orphan_grace_hours=24, now=now)
+    assert report["orphan_files"] == 1
+    assert report["retention_files"] == 2
+    assert report["evicted_files"] == 3
+    assert report["used_bytes"] == 600
+    
+    assert not (uploads / "orphan_old.xlsx").exists()
+    assert (uploads / "orphan_new.xlsx").exists()
+    assert not (results / "classified_stale.csv").exists()
+    assert (results / "classified_recent.xlsx").exists()
+    assert (results / "classified_running.xlsx").exists()
+    
+    for history in (old, missing, stale):
+        db.refresh(history)
+        assert history.result_path is None
+        assert history.expired_at == now
+    db.refresh(recent)
+    assert recent.expired_at is None
+    
+    db.close()
+    engine.dispose()
+
+
+def test_artifact_store(tmp_path, monkeypatch):
+    """Test content-addressed dedup, ref counting and transparent zstd compression"""
+    from datetime import datetime, timedelta
+    from sqlalchemy.orm import sessionmaker
+    from app.config import settings
+    from app.database import Base, create_db_engine
+    from app.models import Artifact, ClassificationHistory
+    from app.services import artifact_store
+    
+    monkeypatch.setattr(settings, "artifacts_dir", str(tmp_path / "artifacts"))
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    
+    content = b"Issue,\xeb\xb6\x88\xeb\x9f\x89\xeb\xaa\x85\n" * 5000
+    source = tmp_path / "source.xlsx"
+    source.write_bytes(content)
+    results = []
+    for name in ("result_1.xlsx", "result_2.xlsx"):
+        (tmp_path / name).write_bytes(content)
+        results.append(tmp_path / name)
+    
+    histories = []
+    for result in results:
+        history = ClassificationHistory(
+            filename="source.xlsx", file_path=str(source), result_path=str(result),
+            sheet_name="Sheet1", column_name="Issue", status="completed"
+        )
+        db.add(history)
+        db.flush()
+        artifact_store.register_history_artifacts(db, history)
+        histories.append(history)
+    db.commit()
+    
+    # 같은 내용은 하나의 아티팩트로 저장, 원본 업로드 파일은 유지, 결과 파일은 이동
+    assert db.query(Artifact).count() == 1
+    artifact = db.query(Artifact).one()
+    assert artifact.ref_count == 4
+    assert source.exists()
+    assert not any(result.exists() for result in results)
+    blob = Path(histories[0].result_path)
+    assert blob == artifact_store.artifact_path(artifact)
+    assert histories[1].file_path == str(blob)
+    
+    # 오래 사용하지 않은 아티팩트는 같은 경로에 압축 저장, 읽을 때 투명하게 해제
+    count, saved = artifact_store.compress_cold_artifacts(db, older_than_days=7, now=datetime.utcnow() + timedelta(days=8))
+    assert count == 1 and saved > 0
+    assert artifact.compressed and artifact.stored_size < artifact.size
+    assert artifact_store.is_compressed_file(blob)
+    assert b"".join(artifact_store.iter_file_bytes(blob)) == content
+    with artifact_store.materialize(str(blob)) as local_path:
+        assert local_path != blob
+        assert local_path.read_bytes() == content
+    assert not local_path.exists()
+    
+    # 참조 수는 이력 기준으로 재계산되고, 파일이 없어진 레코드는 정리됨
+    histories[0].source_artifact_id = None
+    histories[0].result_artifact_id = None
+    artifact_store.reconcile_artifacts(db)
+    assert artifact.ref_count == 2
+    blob.unlink()
+    assert artifact_store.reconcile_artifacts(db)["removed_artifacts"] == 1
+    db.commit()
+    db.refresh(histories[1])
+    assert histories[1].result_artifact_id is None
+    
+    db.close()
+    engine.dispose()
+
+
+def test_structured_log_sampling_and_context():
+    """행 단위 로그 샘플링, 지연 포맷, 컨텍스트 필드가 포함된 JSON 출력"""
+    import contextvars
+    import json
+    import logging
+    import queue
+    from app.services import structured_log
+    
+    log_queue = queue.Queue()
+    handler = structured_log.NonBlockingQueueHandler(log_queue, logging.NullHandler())
+    handler.addFilter(structured_log.ContextFilter())
+    handler.addFilter(structured_log.RowSamplingFilter(5))
+    logger = logging.getLogger("test.structured_log")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    
+    def run_job():
+        structured_log.bind_log_context(history_id=7, job="classify")
+        for row in range(1, 11):
+            logger.info("분류 성공 %s", row, extra=structured_log.row_extra(row))
+        logger.warning("분류 실패", extra=structured_log.row_extra(11))
+        logger.info("분류 작업 종료", extra=structured_log.job_extra(total_rows=11))
+    
+    try:
+        contextvars.copy_context().run(run_job)
+    finally:
+        logger.removeHandler(handler)
+    
+    records = [log_queue.get_nowait() for _ in range(log_queue.qsize())]
+    # 행 단위 INFO는 5건 중 1건, WARNING과 작업 요약은 모두 기록
+    assert [record.levelname for record in records] == ["INFO", "INFO", "WARNING", "INFO"]
+    # 메시지 포맷은 큐에 넣을 때가 아니라 출력할 때 수행
+    assert records[0].args == (1,)
+    
+    lines = [json.loads(structured_log.JsonFormatter().format(record)) for record in records]
+    assert lines[1]["msg"] == "분류 성공 6"
+    assert lines[1]["row"] == 6 and lines[1]["history_id"] == 7 and lines[1]["job"] == "classify"
+    assert lines[3]["total_rows"] == 11
+    # 컨텍스트는 작업(요청) 단위로 분리됨
+    assert structured_log._log_context.get() == {}
+
+
+def test_job_leases(tmp_path):
+    """Test a job is leased by one worker at a time and re-leased after its lease expires"""
+    from datetime import datetime, timedelta
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base, create_db_engine
+    from app.models import ClassificationHistory, JobLease
+    from app.services import job_queue
+    
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    
+    history = ClassificationHistory(filename="a.xlsx", file_path="a.xlsx", sheet_name="일보_Worst55", column_name="Issue")
+    db.add(history)
+    db.flush()
+    job_queue.enqueue_job(db, history, {"file_path": "a.xlsx"})
+    db.commit()
+    assert history.status == "queued"
+    
+    # 다른 세션(워커)에서 동시에 임대해도 한 곳만 가져감
+    now = datetime.utcnow()
+    first = job_queue.claim_job(Session(), "worker-a", lease_seconds=60, now=now)
+    assert first is not None and first.payload == {"file_path": "a.xlsx"} and first.attempts == 1
+    assert job_queue.claim_job(Session(), "worker-b", lease_seconds=60, now=now) is None
+    assert job_queue.heartbeat_job(Session(), first, lease_seconds=60, now=now + timedelta(seconds=30))
+    assert job_queue.claim_job(Session(), "worker-b", lease_seconds=60, now=now + timedelta(seconds=61)) is None
+    
+    # heartbeat가 끊기면 만료 후 다른 워커가 가져가고, 이전 워커의 연장/완료는 무시됨
+    later = now + timedelta(seconds=91)
+    second = job_queue.claim_job(Session(), "worker-b", lease_seconds=60, now=later)
+    assert second is not None and second.id == first.id and second.attempts == 2
+    assert not job_queue.heartbeat_job(Session(), first, now=later)
+    assert not job_queue.complete_job(Session(), first)
+    
+    # 반납하면 바로 다시 가져갈 수 있고 임대 횟수는 늘지 않음
+    assert job_queue.release_job(Session(), second)
+    third = job_queue.claim_job(Session(), "worker-c", lease_seconds=60, now=later)
+    assert third.attempts == 2
+    assert job_queue.complete_job(Session(), third)
+    assert db.query(JobLease).count() == 0
+    
+    db.close()
+    engine.dispose()
+
+
+def test_drop_folder_watcher_settles_and_ingests_once(tmp_path, monkeypatch):
+    """Test the watcher waits for files to stop changing and registers each content hash once"""
+    import polars as pl
+    from sqlalchemy.orm import sessionmaker
+    from app.config import settings
+    from app.database import Base, create_db_engine
+    from app.models import ClassificationHistory, JobLease, WatchedFile
+    from app.watcher import DropFolderWatcher
+    
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    monkeypatch.setattr(settings, "upload_dir", str(upload_dir))
+    
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    report = inbox / "daily.xlsx"
+    pl.DataFrame({"Issue": ["라인 정지"]}).write_excel(str(report), worksheet="일보_Worst55")
+    (inbox / "~$daily.xlsx").write_bytes(b"lock")
+    (inbox / "readme.txt").write_text("skip")
+    
+    watcher = DropFolderWatcher([inbox], settle_seconds=5, session_factory=Session)
+    watcher.scan()
+    assert list(watcher.pending) == [report]
+    
+    # 처음 본 시점부터 settle_seconds 동안 바뀌지 않아야 가져감
+    assert watcher.settled(now=100.0) == []
+    assert watcher.settled(now=103.0) == []
+    report.write_bytes(report.read_bytes() + b"\0")
+    report.write_bytes(report.read_bytes()[:-1])
+    watcher.observe(report)
+    assert watcher.settled(now=104.0) == []
+    assert watcher.settled(now=108.0) == []
+    assert watcher.settled(now=109.0) == [report]
+    assert watcher.pending == {}
+    
+    history_id = watcher.ingest(report)
+    assert history_id is not None
+    db = Session()
+    history = db.get(ClassificationHistory, history_id)
+    assert history.status == "queued" and history.sheet_name == settings.default_sheet_name
+    assert Path(history.file_path).parent == upload_dir
+    assert db.query(JobLease).one().kind == "ingest"
+    assert db.query(WatchedFile).one().path == str(report)
+    
+    # 재시작 후 다시 스캔하거나 다른 이름으로 복사해도 같은 내용은 다시 등록하지 않음
+    copied = inbox / "daily_copy.xlsx"
+    copied.write_bytes(report.read_bytes())
+    restarted = DropFolderWatcher([inbox], settle_seconds=0, session_factory=Session)
+    restarted.scan()
+    restarted.settled(now=0.0)
+    assert sorted(restarted.settled(now=1.0)) == [report, copied]
+    assert restarted.ingest(report) is None and restarted.ingest(copied) is None
+    assert db.query(WatchedFile).count() == 1
+    assert len(list(upload_dir.iterdir())) == 1
+    
+    # 쓰는 중인(zip이 아닌) xlsx는 건너뜀
+    partial_file = inbox / "partial.xlsx"
+    partial_file.write_bytes(b"PK\x03")
+    assert restarted.ingest(partial_file) is None
+
+
+def test_parse_range_and_compression_streaming():
+    """Test Range header parsing and that streamed responses are flushed per chunk except SSE"""
+    import gzip
+    import pytest
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+    from fastapi.testclient import TestClient
+    from app.services.compression import CompressionMiddleware
+    from app.services.http_cache import parse_range
+    
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=95-200", 100) == (95, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+    # 여러 범위 / 잘못된 형식은 무시하고 전체 응답
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("bytes=9-0", 100) is None
+    assert parse_range("items=0-9", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+    
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=10)
+    
+    @app.get("/ndjson")
+    def ndjson():
+        return StreamingResponse((f'{{"row": {i}}}\n' for i in range(50)), media_type="application/x-ndjson")
+    
+    @app.get("/events")
+    def events():
+        return StreamingResponse((f"data: {i}\n\n" for i in range(50)), media_type="text/event-stream")
+    
+    client = TestClient(app)
+    with client.stream("GET", "/ndjson", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw).decode().count("\n") == 50
+    
+    response = client.get("/events", headers={"Accept-Encoding": "br, gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text.count("data:") == 50
+
+
+async def test_job_channel_coalesces_rows_and_resumes():
+    """Test row results are merged into time-bucketed progress events and subscribers resume by event id"""
+    import asyncio
+    import json
+    from app.services.progress import JobChannel
+    
+    channel = JobChannel(history_id=1, interval_ms=50)
+    channel.publish({"type": "start", "total": 6})
+    
+    received = []
+    
+    async def consume(last_event_id):
+        async for item in channel.subscribe(last_event_id, heartbeat=5):
+            received.append(item)
+    
+    consumer = asyncio.create_task(consume(0))
+    for idx in range(3):
+        channel.add_row({"row": idx}, current=idx + 1, total=6)
+    # 구간이 끝나면 요청 없이도 전송됨
+    await asyncio.sleep(0.1)
+    assert [json.loads(data)["type"] for _, data in received] == ["start", "progress"]
+    for idx in range(3, 6):
+        channel.add_row({"row": idx}, current=idx + 1, total=6)
+    channel.close({"type": "complete"})
+    await asyncio.wait_for(consumer, timeout=1)
+    
+    events = [json.loads(data) for _, data in received]
+    assert [e["type"] for e in events] == ["start", "progress", "progress", "complete"]
+    assert [r["row"] for r in events[1]["rows"]] == [0, 1, 2]
+    assert [r["row"] for r in events[2]["rows"]] == [3, 4, 5] and events[2]["current"] == 6
+    assert [event_id for event_id, _ in received] == [1, 2, 3, 4]
+    
+    # 끊긴 뒤 재연결: 마지막으로 받은 id 다음부터
+    resumed = [item async for item in channel.subscribe(2)]
+    assert [event_id for event_id, _ in resumed] == [3, 4]
+
+
+def test_model_cascade_escalates_and_records_usage():
+    """Cheap model first, escalate on bad JSON / empty fields / low confidence"""
+    from types import SimpleNamespace
+    from app.services.llm_classifier import LLMClassifier, CascadeUsage
+
+    # Issue 내용별 저렴한 모델(small)의 응답
+    small_answers = {
+        "쉬움": '{"불량명": "스크래치", "설비명": "A-1", "조치내용": "청소", "신뢰도": 0.95}',
+        "애매함": '{"불량명": "기포", "설비명": "", "조치내용": "", "신뢰도": 0.3}',
+        "빈값": '{"불량명": "", "설비명": "", "조치내용": "", "신뢰도": 0.9}',
+        "깨짐": 'not json',
+    }
+    calls = []
+
+    def create(model, messages, **kwargs):
+        issue = messages[1]["content"].rsplit("Issue 내용: ", 1)[1]
+        calls.append((model, issue))
+        if model == "small":
+            content = small_answers[issue]
+        else:
+            content = '{"불량명": "정밀", "설비명": "B-2", "조치내용": "교체"}'
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(total_tokens=1000),
+        )
+
+    classifier = LLMClassifier(api_key="", mock_mode=True, models=["small", "large"], confidence_threshold=0.7)
+    classifier.mock_mode = False
+    classifier.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    classifier.usage = CascadeUsage(classifier.models, prices={"small": 0.0, "large": 10.0})
+
+    result, success = classifier.classify("쉬움", "prompt")
+    assert success and result == {"불량명": "스크래치", "설비명": "A-1", "조치내용": "청소"}
+    for issue in ("애매함", "빈값", "깨짐"):
+        result, success = classifier.classify(issue, "prompt")
+        assert success and result["불량명"] == "정밀"
+    # 중간 단계는 재시도 없이 바로 다음 모델로 넘김
+    assert [model for model, _ in calls] == ["small", "small", "large", "small", "large", "small", "large"]
+
+    summary = classifier.usage.summary()
+    assert summary["rows"] == 4
+    assert summary["escalated_rows"] == 3
+    assert summary["escalation_rate"] == 0.75
+    assert summary["escalations"] == {"low_confidence": 1, "empty": 1, "json_error": 1}
+    assert summary["by_model"]["small"] == {"calls": 4, "rows": 1, "tokens": 4000, "cost": 0.0}
+    assert summary["by_model"]["large"]["rows"] == 3
+    # 전부 large로 보냈다면 4행 × 1000토큰 × $10/1M
+    assert summary["baseline_cost"] == 0.04
+    assert summary["cost"] == 0.03
+    assert summary["cost_saved"] == pytest.approx(0.01)
+    assert classifier.usage.summary(keys=["쉬움"])["escalated_rows"] == 0
+
+    # 단일 모델이면 신뢰도를 요구하지 않고 빈 결과도 그대로 채택 (기존 동작)
+    single = LLMClassifier(api_key="", mock_mode=True, models=["small"])
+    single.mock_mode = False
+    single.client = classifier.client
+    assert "신뢰도" not in single._build_system_prompt()
+    result, success = single.classify("빈값", "prompt")
+    assert success and result == {"불량명": "", "설비명": "", "조치내용": ""}
+    assert single.usage.summary()["escalated_rows"] == 0
+
+
+def test_issue_normalizer():
+    """Collapse whitespace, drop duplicate/boilerplate lines, truncate to token budget"""
+    from app.services.issue_normalizer import IssueNormalizer, estimate_tokens
+
+    normalizer = IssueNormalizer(boilerplate_pattern=r"※ ?담당자 확인 요망|\[자동입력\]", token_budget=0, enabled=True)
+    text = "  라인   정지\t발생 \n\n라인 정지 발생\n[자동입력] 설비 A-1 점검\n※ 담당자 확인 요망\n"
+    assert normalizer.normalize(text) == "라인 정지 발생\n설비 A-1 점검"
+    assert normalizer.normalize("※담당자 확인 요망") == ""
+    assert normalizer.normalize(None) == ""
+
+    stats = normalizer.token_stats([text, "라인 정지 발생\n설비 A-1 점검", "", None])
+    assert stats["prompt_tokens"] == estimate_tokens("라인 정지 발생\n설비 A-1 점검")
+    assert stats["tokens_saved"] == stats["issue_tokens"] - stats["prompt_tokens"] > 0
+
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("가나다") == 3
+    truncated = IssueNormalizer(token_budget=10, enabled=True).normalize("가" * 30)
+    assert truncated.endswith("…") and estimate_tokens(truncated) <= 10
+
+    # 비활성화하면 앞뒤 공백만 제거
+    assert IssueNormalizer(enabled=False).normalize("  a  b \n a  b ") == "a  b \n a  b"
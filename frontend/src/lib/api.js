@@ -29,11 +29,12 @@ export async function checkModels(baseUrl, apiKey) {
 }
 
 // Upload API
-export async function uploadFile(file, sheetName, columnName) {
+export async function uploadFile(file, sheetName, columnName, preprocess = true) {
     const formData = new FormData();
     formData.append('file', file);
     if (sheetName) formData.append('sheet_name', sheetName);
     if (columnName) formData.append('column_name', columnName);
+    if (!preprocess) formData.append('preprocess', 'false');
 
     const response = await api.post('/upload', formData, {
         headers: {
@@ -43,82 +44,214 @@ export async function uploadFile(file, sheetName, columnName) {
     return response.data;
 }
 
+// Batch Upload API (여러 파일 또는 ZIP)
+export async function uploadFiles(files, sheetName, columnName) {
+    const formData = new FormData();
+    for (const file of files) {
+        formData.append('files', file);
+    }
+    if (sheetName) formData.append('sheet_name', sheetName);
+    if (columnName) formData.append('column_name', columnName);
+
+    const response = await api.post('/upload/batch', formData, {
+        headers: {
+            'Content-Type': 'multipart/form-data'
+        }
+    });
+    return response.data;
+}
+
 // Classification API
 export async function classifyFile(data) {
     const response = await api.post('/classify', data);
     return response.data;
 }
 
+// 전처리와 분류를 함께 진행 (uploadFile(..., preprocess=false) 로 올린 원본 파일 사용)
+export async function classifyFilePipelined(data) {
+    const response = await api.post('/classify/pipeline', data);
+    return response.data;
+}
+
+export async function classifyBatch(data) {
+    const response = await api.post('/classify/batch', data);
+    return response.data;
+}
+
 // Classification API with SSE progress
+// 분류는 서버에서 연결과 별도로 실행되므로, 연결이 끊기면 마지막으로 받은 이벤트 id로 재연결하여 이어서 받음
+const STREAM_MAX_RECONNECTS = 5;
+const STREAM_RECONNECT_DELAY_MS = 1000;
+
 export async function classifyFileWithProgress(data, onProgress) {
-    return new Promise((resolve, reject) => {
+    let historyId = null;
+    let lastEventId = null;
+    let finished = false;
+    let outcome = null;
+
+    function handleEvent(event) {
+        if (event.type === 'start' || event.type === 'snapshot') {
+            historyId = event.history_id;
+            if (event.type === 'snapshot') {
+                onProgress({
+                    current: event.processed_rows + event.failed_rows,
+                    total: event.total,
+                    rows: []
+                });
+            }
+        } else if (event.type === 'progress') {
+            onProgress({
+                current: event.current,
+                total: event.total,
+                rows: event.rows || []
+            });
+        } else if (event.type === 'complete') {
+            finished = true;
+            outcome = {
+                history_id: event.history_id,
+                filename: event.filename,
+                status: event.status,
+                total_rows: event.total_rows,
+                processed_rows: event.processed_rows,
+                failed_rows: event.failed_rows,
+                result_path: event.result_path,
+                message: event.message
+            };
+        } else if (event.type === 'error') {
+            finished = true;
+            outcome = new Error(event.message);
+        }
+    }
+
+    async function readStream(response) {
         // Use fetch for SSE since axios doesn't support it well
-        fetch(`${API_BASE_URL}/classify/stream`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(data)
-        })
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error('Network response was not ok');
-                }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
 
-                const reader = response.body.getReader();
-                const decoder = new TextDecoder();
-                let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) {
+                return;
+            }
 
-                function processStream({ done, value }) {
-                    if (done) {
-                        return;
-                    }
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop() || '';
 
-                    buffer += decoder.decode(value, { stream: true });
-                    const lines = buffer.split('\n');
-                    buffer = lines.pop() || '';
-
-                    for (const line of lines) {
-                        if (line.startsWith('data: ')) {
-                            try {
-                                const data = JSON.parse(line.slice(6));
-
-                                if (data.type === 'progress') {
-                                    onProgress({
-                                        current: data.current,
-                                        total: data.total
-                                    });
-                                } else if (data.type === 'complete') {
-                                    resolve({
-                                        history_id: data.history_id,
-                                        filename: data.filename,
-                                        status: data.status,
-                                        total_rows: data.total_rows,
-                                        processed_rows: data.processed_rows,
-                                        failed_rows: data.failed_rows,
-                                        result_path: data.result_path,
-                                        message: data.message
-                                    });
-                                } else if (data.type === 'error') {
-                                    reject(new Error(data.message));
-                                }
-                            } catch (e) {
-                                console.error('Error parsing SSE data:', e);
-                            }
-                        }
+            for (const line of lines) {
+                if (line.startsWith('id: ')) {
+                    lastEventId = line.slice(4);
+                } else if (line.startsWith('data: ')) {
+                    try {
+                        handleEvent(JSON.parse(line.slice(6)));
+                    } catch (e) {
+                        console.error('Error parsing SSE data:', e);
                     }
-
-                    return reader.read().then(processStream);
                 }
+            }
+        }
+    }
+
+    const response = await fetch(`${API_BASE_URL}/classify/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(data)
+    });
+    if (!response.ok) {
+        throw new Error('Network response was not ok');
+    }
+
+    let attempts = 0;
+    let current = response;
+    while (true) {
+        if (current) {
+            try {
+                await readStream(current);
+            } catch (e) {
+                console.warn('SSE connection lost:', e);
+            }
+        }
+        if (finished) {
+            break;
+        }
+        if (historyId === null || attempts >= STREAM_MAX_RECONNECTS) {
+            throw new Error('분류 진행상황 연결이 끊어졌습니다.');
+        }
+
+        attempts += 1;
+        await new Promise(resolve => setTimeout(resolve, STREAM_RECONNECT_DELAY_MS));
+        current = null;
+        try {
+            const resumed = await fetch(`${API_BASE_URL}/classify/stream/${historyId}`, {
+                headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {}
+            });
+            if (resumed.ok) {
+                current = resumed;
+            }
+        } catch (e) {
+            console.warn('SSE reconnect failed:', e);
+        }
+    }
+
+    if (outcome instanceof Error) {
+        throw outcome;
+    }
+    return outcome;
+}
 
-                return reader.read().then(processStream);
-            })
-            .catch(reject);
+// 여러 작업의 진행상황을 WebSocket 하나로 구독
+// onUpdate: [{ id, status, total, processed, failed, error? }, ...]
+export function connectProgress(onUpdate) {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${protocol}//${window.location.host}${API_BASE_URL}/progress/ws`);
+    const subscribed = new Set();
+
+    function send(action, ids) {
+        if (socket.readyState === WebSocket.OPEN && ids.length) {
+            socket.send(JSON.stringify({ action, ids }));
+        }
+    }
+
+    socket.addEventListener('open', () => send('subscribe', [...subscribed]));
+    socket.addEventListener('message', (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'updates') {
+            onUpdate(message.updates);
+        } else if (message.type === 'error') {
+            console.error('Progress WebSocket error:', message.message);
+        }
     });
+
+    return {
+        subscribe(ids) {
+            ids.forEach(id => subscribed.add(id));
+            send('subscribe', ids);
+        },
+        unsubscribe(ids) {
+            ids.forEach(id => subscribed.delete(id));
+            send('unsubscribe', ids);
+        },
+        close() {
+            socket.close();
+        }
+    };
 }
 
-export async function downloadResult(historyId) {
+// format: xlsx (원본 서식), xlsx_flat, csv, jsonl, parquet
+const DOWNLOAD_EXTENSIONS = {
+    xlsx: 'xlsx',
+    xlsx_flat: 'xlsx',
+    csv: 'csv',
+    jsonl: 'jsonl',
+    parquet: 'parquet'
+};
+
+export async function downloadResult(historyId, format = 'xlsx') {
     const response = await api.get(`/classify/${historyId}/download`, {
+        params: { format },
         responseType: 'blob'
     });
 
@@ -126,7 +259,7 @@ export async function downloadResult(historyId) {
     const url = window.URL.createObjectURL(new Blob([response.data]));
     const link = document.createElement('a');
     link.href = url;
-    link.setAttribute('download', `classified_result_${historyId}.xlsx`);
+    link.setAttribute('download', `classified_result_${historyId}.${DOWNLOAD_EXTENSIONS[format] || format}`);
     document.body.appendChild(link);
     link.click();
     link.remove();
@@ -139,7 +272,59 @@ export async function getHistory() {
     return response.data;
 }
 
+// 커서 기반 페이지 조회 (nextCursor가 null이면 마지막 페이지)
+export async function getHistoryPage(cursor = null, limit = 50) {
+    const params = { limit };
+    if (cursor) params.cursor = cursor;
+    const response = await api.get('/history', { params });
+    return {
+        items: response.data,
+        nextCursor: response.headers['x-next-cursor'] || null
+    };
+}
+
 export async function getHistoryById(historyId) {
     const response = await api.get(`/history/${historyId}`);
     return response.data;
 }
+
+// 행 단위 분류 결과 조회 (nextCursor를 다음 요청의 after로 전달)
+export async function getHistoryRows(historyId, { after = null, limit = 100, status = null, q = null } = {}) {
+    const params = { limit };
+    if (after !== null) params.after = after;
+    if (status) params.status = status;
+    if (q) params.q = q;
+    const response = await api.get(`/history/${historyId}/rows`, { params });
+    return {
+        items: response.data.items,
+        total: response.data.total,
+        nextCursor: response.data.next_cursor
+    };
+}
+
+// 분석 (최근 days일 집계)
+export async function getTopDefects(days = 90, equipment = null, limit = 10) {
+    const params = { days, limit };
+    if (equipment) params.equipment = equipment;
+    const response = await api.get('/analytics/top-defects', { params });
+    return response.data;
+}
+
+export async function getEquipmentSummary(days = 90, limit = 20, topN = 3) {
+    const response = await api.get('/analytics/equipment', { params: { days, limit, top_n: topN } });
+    return response.data;
+}
+
+export async function getDefectTimeSeries(days = 90, defect = null, equipment = null) {
+    const params = { days };
+    if (defect) params.defect = defect;
+    if (equipment) params.equipment = equipment;
+    const response = await api.get('/analytics/timeseries', { params });
+    return response.data;
+}
+
+// 과거 Issue/분류 결과 검색
+export async function searchRows(q, page = 1, limit = 20) {
+    const response = await api.get('/search', { params: { q, page, limit } });
+    return response.data;
+}